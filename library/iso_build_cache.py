@@ -0,0 +1,212 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: iso_build_cache
+short_description: Reuse ISO files built from the same inputs in a local cache
+description:
+  - The cache key of an ISO build is the SHA-256 hash of the build recipe and the content
+    of its input files. Names of input files are hashed together with their content, but
+    their parent directories are not, so the same files rendered in different temporary
+    directories have the same key.
+  - Strings in 'ignore_strings' are removed from input files before hashing, e.g., password
+    hashes with random salts, so the same input files rendered with different salts have the
+    same key. The values these strings are generated from should be in 'recipe' instead.
+  - With 'state=query', return the cache key, and link or copy the cached ISO file of the
+    key to 'dest' when it exists.
+  - With 'state=present', save the built ISO file 'dest' as the cached ISO file of 'key'.
+  - Cached ISO files are in sub-directories named by cache keys in cache directory, which
+    can be evicted by local_cache_lru module.
+options:
+  path:
+    description: Cache directory path.
+    type: path
+    required: true
+  state:
+    description: Query the cached ISO file, or save the built ISO file to cache.
+    type: str
+    choices: ['query', 'present']
+    default: query
+  src:
+    description:
+      - Paths of input files or directories of the ISO build, e.g., rendered unattend install
+        config files, and the task files of the build steps.
+      - Required when 'state=query'.
+    type: list
+    elements: path
+    default: []
+  recipe:
+    description:
+      - Build parameters which affect the built ISO file besides input files, e.g., ISO volume
+        identity, and checksum of source ISO file.
+    type: dict
+    default: {}
+  ignore_strings:
+    description:
+      - Strings in input files which are not hashed into cache key, e.g., password hashes with
+        random salts. Only input files not larger than 1MB are searched for these strings.
+    type: list
+    elements: str
+    default: []
+  key:
+    description: Cache key returned by 'state=query'. Required when 'state=present'.
+    type: str
+  dest:
+    description:
+      - With 'state=query', path to link or copy the cached ISO file to when it exists.
+      - With 'state=present', path of the built ISO file to be saved to cache.
+    type: path
+'''
+
+EXAMPLES = '''
+- name: "Query unattend install ISO file built from the same config file"
+  iso_build_cache:
+    path: "{{ local_cache }}/iso_build_cache"
+    src: ["{{ new_unattend_install_conf }}"]
+    recipe:
+      vol_ident: "OEMDRV"
+    dest: "{{ generated_unattend_iso }}"
+  register: iso_build_cache_result
+
+- name: "Save built unattend install ISO file to cache"
+  iso_build_cache:
+    path: "{{ local_cache }}/iso_build_cache"
+    state: present
+    key: "{{ iso_build_cache_result.key }}"
+    dest: "{{ generated_unattend_iso }}"
+  when: not iso_build_cache_result.hit
+'''
+
+RETURN = '''
+key:
+  description: Cache key of the ISO build.
+  returned: always
+  type: str
+hit:
+  description: Whether the cached ISO file of the key exists.
+  returned: always
+  type: bool
+cached_iso:
+  description: Path of the cached ISO file of the key.
+  returned: always
+  type: str
+'''
+
+import os
+import json
+import shutil
+import hashlib
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_bytes, to_native
+
+CACHED_ISO_FILE_NAME = 'image.iso'
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(key_hash, path, ignore_strings=None):
+    if ignore_strings and os.path.getsize(path) <= READ_CHUNK_SIZE:
+        with open(path, 'rb') as fd:
+            content = fd.read()
+        for ignore_string in ignore_strings:
+            content = content.replace(ignore_string, b'')
+        key_hash.update(content)
+        return
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(READ_CHUNK_SIZE), b''):
+            key_hash.update(chunk)
+
+
+def get_cache_key(src, recipe, ignore_strings=None):
+    key_hash = hashlib.sha256(to_bytes(json.dumps(recipe, sort_keys=True)))
+    for path in src:
+        path = path.rstrip(os.sep)
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    key_hash.update(b'\0' + to_bytes(os.path.relpath(file_path, os.path.dirname(path))) + b'\0')
+                    hash_file(key_hash, file_path, ignore_strings)
+        else:
+            key_hash.update(b'\0' + to_bytes(os.path.basename(path)) + b'\0')
+            hash_file(key_hash, path, ignore_strings)
+    return key_hash.hexdigest()
+
+
+def link_or_copy(src, dest):
+    """
+    Hard link src to dest through a temporary file, or copy it when hard link is not
+    supported, e.g., they are in different file systems
+    """
+    tmp_dest = dest + '.tmp'
+    if os.path.lexists(tmp_dest):
+        os.remove(tmp_dest)
+    try:
+        os.link(src, tmp_dest)
+    except OSError:
+        shutil.copyfile(src, tmp_dest)
+    os.rename(tmp_dest, dest)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            path=dict(type='path', required=True),
+            state=dict(type='str', choices=['query', 'present'], default='query'),
+            src=dict(type='list', elements='path', default=[]),
+            recipe=dict(type='dict', default={}),
+            ignore_strings=dict(type='list', elements='str', default=[], no_log=True),
+            key=dict(type='str', no_log=False),
+            dest=dict(type='path'),
+        ),
+        required_if=[
+            ('state', 'query', ['src']),
+            ('state', 'present', ['key', 'dest']),
+        ],
+        supports_check_mode=True,
+    )
+    cache_dir = module.params['path']
+    dest = module.params['dest']
+
+    if module.params['state'] == 'query':
+        missing = [path for path in module.params['src'] if not os.path.exists(path)]
+        if missing:
+            module.fail_json(msg="Input files of ISO build don't exist: {}".format(missing))
+        try:
+            ignore_strings = [to_bytes(string) for string in module.params['ignore_strings'] if string]
+            key = get_cache_key(module.params['src'], module.params['recipe'], ignore_strings)
+        except (IOError, OSError) as e:
+            module.fail_json(msg="Failed to read input files of ISO build: {}".format(to_native(e)))
+    else:
+        key = module.params['key']
+    cached_iso = os.path.join(cache_dir, key, CACHED_ISO_FILE_NAME)
+    hit = os.path.isfile(cached_iso)
+
+    changed = False
+    try:
+        if module.params['state'] == 'query':
+            if hit and dest:
+                changed = True
+                if not module.check_mode:
+                    link_or_copy(cached_iso, dest)
+        elif not hit:
+            if not os.path.isfile(dest):
+                module.fail_json(msg="Built ISO file '{}' doesn't exist".format(dest))
+            changed = True
+            if not module.check_mode:
+                if not os.path.isdir(os.path.dirname(cached_iso)):
+                    os.makedirs(os.path.dirname(cached_iso))
+                link_or_copy(dest, cached_iso)
+    except (IOError, OSError) as e:
+        module.fail_json(msg="Failed to {} cached ISO file '{}': {}".format(
+            'restore' if module.params['state'] == 'query' else 'save', cached_iso, to_native(e)))
+
+    module.exit_json(changed=changed, key=key, hit=hit, cached_iso=cached_iso)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/python
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: linux_guest_probe
+short_description: Collect Linux guest OS information in one module execution
+description:
+  - Run in Linux guest OS to collect the information of specified sections, which
+    are collected by separate commands in guest OS before.
+  - C(os_release) is the key value pairs in '/etc/os-release'.
+  - C(release_files) is the contents of '/etc/redhat-release', '/etc/system-release'
+    and '/etc/debian_version' if they exist.
+  - C(packages) is the information of installed packages queried by 'rpm -qi' or 'dpkg -s'.
+  - C(modules) is the information of kernel modules queried by 'modinfo'.
+  - C(services) is the information of system services in the same format of service_facts module.
+  - C(devices) is the list of block devices got by 'lsblk'.
+  - C(cpu) is the vCPU number and cores per socket in the same way of setup module.
+  - C(memory) is the total size in MB of online memory blocks after onlining all memory blocks.
+options:
+  sections:
+    description: Sections of guest OS information to collect.
+    type: list
+    elements: str
+    choices: ['os_release', 'release_files', 'packages', 'modules', 'services', 'devices', 'cpu', 'memory']
+    required: true
+  package_names:
+    description: Names of packages to query in C(packages) section.
+    type: list
+    elements: str
+    default: []
+  package_manager:
+    description:
+      - Package manager of guest OS, e.g., yum, dnf, zypper or apt.
+      - Packages are queried by 'rpm -qi' for yum, dnf and zypper, or 'dpkg -s' for apt.
+    type: str
+  module_names:
+    description: Names of kernel modules to query in C(modules) section.
+    type: list
+    elements: str
+    default: []
+  service_names:
+    description: Names of services to query in C(services) section.
+    type: list
+    elements: str
+    default: []
+  device_type:
+    description: Only list block devices with this type in C(devices) section, e.g., disk, pmem, rom.
+    type: str
+'''
+
+EXAMPLES = '''
+- name: "Get guest OS release info and memory size"
+  linux_guest_probe:
+    sections: ['os_release', 'release_files', 'memory']
+  register: linux_guest_probe_result
+  delegate_to: "{{ vm_guest_ip }}"
+'''
+
+RETURN = '''
+guest_probe:
+  description: Guest OS information of each specified section.
+  returned: always
+  type: dict
+  sample: {"os_release": {"NAME": "Ubuntu", "VERSION_ID": "22.04"},
+           "release_files": {"/etc/debian_version": "bookworm/sid"},
+           "packages": {"open-vm-tools": {"Package": "open-vm-tools", "Version": "2:12.1.5-3~ubuntu0.22.04.1"}},
+           "modules": {"vmw_pvrdma": {"filename": "/lib/modules/5.15.0-25-generic/kernel/drivers/infiniband/hw/vmw_pvrdma/vmw_pvrdma.ko"}},
+           "services": {"sshd.service": {"name": "sshd.service", "state": "running", "status": "enabled", "source": "systemd"}},
+           "devices": [{"name": "sda", "type": "disk", "size": "17179869184", "fstype": ""}],
+           "cpu": {"vcpus": 2, "cores": 1},
+           "memory": {"total_mb": 4096}}
+errors:
+  description: Error messages of the sections failed to collect, which are not in C(guest_probe).
+  returned: always
+  type: dict
+  sample: {"os_release": "[Errno 2] No such file or directory: '/etc/os-release'"}
+'''
+
+import os
+import re
+import glob
+import time
+import platform
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.facts.hardware.linux import LinuxHardware
+
+SECTIONS = ['os_release', 'release_files', 'packages', 'modules', 'services', 'devices', 'cpu', 'memory']
+RELEASE_FILES = ['/etc/redhat-release', '/etc/system-release', '/etc/debian_version']
+# Same as the lines selected from 'rpm -qi', 'dpkg -s' and 'modinfo' outputs before
+INFO_LINE_PATTERN = re.compile(r'^\w+\s*:.*[^:]$')
+
+
+def read_file(path):
+    with open(path, 'r') as fd:
+        return fd.read()
+
+
+def parse_info_lines(output):
+    """
+    Return key value pairs in 'key: value' lines of command output
+    """
+    info = {}
+    for line in output.splitlines():
+        if INFO_LINE_PATTERN.match(line):
+            key, value = line.split(':', 1)
+            info[key.strip()] = value.strip()
+    return info
+
+
+class LinuxGuestProbe(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.errors = {}
+
+    def get_os_release(self):
+        os_release = {}
+        for line in read_file('/etc/os-release').splitlines():
+            if '=' not in line or line.lstrip().startswith('#'):
+                continue
+            key, value = line.split('=', 1)
+            os_release[key.strip()] = value.strip().strip('"\'')
+        return os_release
+
+    def get_release_files(self):
+        return dict([(path, read_file(path).strip()) for path in RELEASE_FILES if os.path.isfile(path)])
+
+    def get_packages(self):
+        if self.params['package_manager'] in ['yum', 'dnf', 'zypper']:
+            query_cmd = [self.module.get_bin_path('rpm'), '-qi']
+        elif self.params['package_manager'] == 'apt':
+            query_cmd = [self.module.get_bin_path('dpkg'), '-s']
+        else:
+            return {}
+        if not query_cmd[0]:
+            return {}
+
+        packages = {}
+        for package_name in self.params['package_names']:
+            rc, stdout, stderr = self.module.run_command(query_cmd + [package_name])
+            if rc != 0 or not stdout:
+                packages[package_name] = {}
+                continue
+            package_info = parse_info_lines(stdout)
+            # In the output of querying packages on Ubuntu/Debian, it is using 'Package' parameter for package name
+            if 'Package' in package_info:
+                package_info['Name'] = package_info['Package']
+            packages[package_name] = package_info
+        return packages
+
+    def get_modules(self):
+        modules = {}
+        modinfo = self.module.get_bin_path('modinfo')
+        for module_name in self.params['module_names']:
+            rc, stdout, stderr = self.module.run_command([modinfo, module_name]) if modinfo else (1, '', '')
+            modules[module_name] = parse_info_lines(stdout) if rc == 0 else {}
+        return modules
+
+    def get_services(self):
+        services = {}
+        systemctl = self.module.get_bin_path('systemctl', opt_dirs=['/usr/bin', '/usr/local/bin'])
+        service = self.module.get_bin_path('service')
+        for service_name in self.params['service_names']:
+            if systemctl and os.path.isdir('/run/systemd/system'):
+                if not service_name.endswith('.service'):
+                    service_name += '.service'
+                rc, stdout, stderr = self.module.run_command(
+                    [systemctl, 'show', service_name, '--property=LoadState,ActiveState,SubState,UnitFileState'])
+                props = dict([line.split('=', 1) for line in stdout.splitlines() if '=' in line])
+                if rc != 0 or props.get('LoadState') == 'not-found':
+                    continue
+                # Service status and state are the same as service_facts module
+                if props.get('LoadState') == 'masked' or props.get('ActiveState') == 'failed':
+                    status = props.get('LoadState') if props.get('LoadState') == 'masked' else 'failed'
+                else:
+                    status = props.get('UnitFileState') or props.get('ActiveState', 'unknown')
+                services[service_name] = {'name': service_name,
+                                          'state': 'running' if props.get('SubState') == 'running' else 'stopped',
+                                          'status': status,
+                                          'source': 'systemd'}
+            elif service:
+                rc, stdout, stderr = self.module.run_command([service, service_name, 'status'])
+                if 'unrecognized service' in stdout + stderr or rc == 4:
+                    continue
+                services[service_name] = {'name': service_name,
+                                          'state': 'running' if rc == 0 else 'stopped',
+                                          'status': 'unknown',
+                                          'source': 'sysv'}
+        return services
+
+    def get_devices(self):
+        lsblk = self.module.get_bin_path('lsblk')
+        if not lsblk:
+            raise OSError('lsblk is not found')
+        rc, stdout, stderr = self.module.run_command([lsblk, '-o', 'NAME,TYPE,SIZE,FSTYPE', '-b', '--nodeps'])
+        if rc != 0:
+            raise OSError(stderr.strip() or 'lsblk failed with rc {}'.format(rc))
+        devices = []
+        for line in stdout.splitlines():
+            if self.params['device_type'] and self.params['device_type'] not in line:
+                continue
+            fields = line.split()
+            device = dict(zip(['name', 'type', 'size', 'fstype'], fields + [''] * (4 - len(fields))))
+            if line.strip() and device not in devices:
+                devices.append(device)
+        return devices
+
+    def get_cpu(self):
+        cpu_facts = LinuxHardware(self.module).get_cpu_facts(
+            collected_facts={'ansible_architecture': platform.machine()})
+        return {'vcpus': cpu_facts.get('processor_vcpus'), 'cores': cpu_facts.get('processor_cores')}
+
+    def get_memory(self):
+        for state_file in glob.glob('/sys/devices/system/memory/memory*/state'):
+            try:
+                with open(state_file, 'w') as fd:
+                    fd.write('online')
+            except (IOError, OSError):
+                pass
+
+        total_mb = 0
+        for retry in range(3):
+            block_size = int(read_file('/sys/devices/system/memory/block_size_bytes').strip(), 16)
+            online_blocks = 0
+            for online_file in glob.glob('/sys/devices/system/memory/memory*/online'):
+                if read_file(online_file).strip() == '1':
+                    online_blocks += 1
+            total_mb = online_blocks * block_size // (1024 ** 2)
+            if total_mb > 0:
+                break
+            time.sleep(1)
+        return {'total_mb': total_mb}
+
+    def run(self):
+        guest_probe = {}
+        for section in self.params['sections']:
+            try:
+                guest_probe[section] = getattr(self, 'get_' + section)()
+            except (IOError, OSError, ValueError) as e:
+                self.errors[section] = str(e)
+
+        self.module.exit_json(changed=False, guest_probe=guest_probe, errors=self.errors)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            sections=dict(type='list', elements='str', choices=SECTIONS, required=True),
+            package_names=dict(type='list', elements='str', default=[]),
+            package_manager=dict(type='str'),
+            module_names=dict(type='list', elements='str', default=[]),
+            service_names=dict(type='list', elements='str', default=[]),
+            device_type=dict(type='str'),
+        ),
+        supports_check_mode=True,
+    )
+    LinuxGuestProbe(module).run()
+
+
+if __name__ == '__main__':
+    main()
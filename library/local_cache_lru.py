@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: local_cache_lru
+short_description: Evict least recently used entries of a local cache directory
+description:
+  - Each sub-directory or file in the cache directory is a cache entry. Last used time of
+    entries are recorded in '.lru_index.json' file in the cache directory.
+  - Mark specified entries as used just now, then remove least recently used entries until
+    the total size of cache directory is not larger than the max size. Specified entries
+    are never removed.
+options:
+  path:
+    description: Cache directory path.
+    type: path
+    required: true
+  max_size:
+    description:
+      - Max total size of cache directory, e.g., '50GB', '512MB'. Integer without unit is in bytes.
+      - When it's 0, no entry is removed.
+    type: str
+    required: true
+  keep:
+    description: Paths of cache entries which are used just now.
+    type: list
+    elements: path
+    default: []
+'''
+
+EXAMPLES = '''
+- name: "Evict least recently used ISO files in local cache"
+  local_cache_lru:
+    path: "{{ local_cache }}/iso_cache"
+    max_size: "50GB"
+    keep: ["{{ iso_cache_dir }}"]
+'''
+
+RETURN = '''
+evicted:
+  description: Paths of removed cache entries.
+  returned: always
+  type: list
+size:
+  description: Total size in bytes of cache directory after eviction.
+  returned: always
+  type: int
+'''
+
+import os
+import json
+import time
+import shutil
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.common.text.formatters import human_to_bytes
+
+LRU_INDEX_FILE = '.lru_index.json'
+
+
+def get_size(path):
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            path=dict(type='path', required=True),
+            max_size=dict(type='str', required=True),
+            keep=dict(type='list', elements='path', default=[]),
+        ),
+        supports_check_mode=True,
+    )
+    cache_dir = module.params['path']
+    try:
+        max_size = human_to_bytes(module.params['max_size'])
+    except ValueError as e:
+        module.fail_json(msg="Invalid max_size '{}': {}".format(module.params['max_size'], to_native(e)))
+    if not os.path.isdir(cache_dir):
+        module.exit_json(changed=False, evicted=[], size=0)
+
+    index_file = os.path.join(cache_dir, LRU_INDEX_FILE)
+    try:
+        with open(index_file, 'r') as fd:
+            last_used = json.load(fd)
+    except (IOError, OSError, ValueError):
+        last_used = {}
+
+    now = time.time()
+    keep = set()
+    for path in module.params['keep']:
+        entry = os.path.relpath(os.path.abspath(path), cache_dir).split(os.sep)[0]
+        if entry not in ('.', '..'):
+            keep.add(entry)
+            last_used[entry] = now
+
+    # Entries not in index are used when they were modified last time
+    entries = {}
+    for entry in os.listdir(cache_dir):
+        if entry == LRU_INDEX_FILE:
+            continue
+        entry_path = os.path.join(cache_dir, entry)
+        entries[entry] = (last_used.get(entry, os.lstat(entry_path).st_mtime), get_size(entry_path))
+    total_size = sum([size for used, size in entries.values()])
+
+    evicted = []
+    if max_size:
+        for entry, (used, size) in sorted(entries.items(), key=lambda e: e[1][0]):
+            if total_size <= max_size:
+                break
+            if entry in keep:
+                continue
+            entry_path = os.path.join(cache_dir, entry)
+            if not module.check_mode:
+                try:
+                    if os.path.isdir(entry_path) and not os.path.islink(entry_path):
+                        shutil.rmtree(entry_path)
+                    else:
+                        os.remove(entry_path)
+                except OSError as e:
+                    module.warn("Failed to remove cache entry {}: {}".format(entry_path, to_native(e)))
+                    continue
+            evicted.append(entry_path)
+            total_size -= size
+            entries.pop(entry)
+
+    if not module.check_mode:
+        try:
+            with open(index_file, 'w') as fd:
+                json.dump(dict([(entry, used) for entry, (used, size) in entries.items()]), fd)
+        except (IOError, OSError) as e:
+            module.warn("Failed to save cache index {}: {}".format(index_file, to_native(e)))
+
+    module.exit_json(changed=bool(evicted), evicted=evicted, size=total_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/python
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: parallel_testcase_run
+short_description: Run test cases in parallel on base VM and its clones
+description:
+  - Run test cases in a test case list file by launching the main playbook in worker
+    processes, each of which runs test cases on one VM, and collect their results from
+    the events log files of worker processes.
+  - Test cases are planned by 'testcase_run_mode' variable of each test case in the test case
+    list file. C(setup) test cases run one by one on base VM before it's cloned, e.g., the
+    test cases deploying VM or resetting base snapshot. C(serial) test cases run one by one
+    on base VM in one worker process, e.g., the test cases using exclusive host resources.
+    Other test cases are C(parallel), and each of them runs in one worker process on the
+    first idle VM of base VM and its clones.
+  - When all setup test cases deploy VM, the first parallel test case runs in setup phase
+    to take base snapshot before base VM is cloned.
+  - Parallel test cases are scheduled by their durations in previous test runs, which are
+    recorded in 'history_file' by the log plugin. Test cases failed in the last run are
+    scheduled firstly from the shortest one to fail fast, then the other test cases are
+    scheduled from the longest one, so that no long test case is left to the end of test run.
+    Test cases without history are estimated with the median duration of other test cases.
+  - When 'resume_log_path' is set, test cases not Failed, Blocked or No Run in the test run
+    of 'resume_log_path' are not run again, and their results are returned in the first phase.
+  - Logs of each worker process are in '<log_path>/<VM name>/<test case name>', or
+    '<log_path>/<VM name>/setup', '<log_path>/<VM name>/serial' and '<log_path>/<VM name>/all'
+    for test cases run in setup, serial and all phases.
+options:
+  playbook:
+    description: Path of the main playbook.
+    type: path
+    required: true
+  testcase_file:
+    description: Path of the test case list file.
+    type: path
+    required: true
+  log_path:
+    description: Log files path of this test run.
+    type: path
+  phase:
+    description:
+      - C(plan) to return planned test cases of each phase without running them.
+      - C(setup) to run setup test cases on 'base_vm_name'.
+      - C(parallel) to run serial test cases on 'base_vm_name', and parallel test cases on
+        'base_vm_name' and 'clone_vm_names'.
+      - C(all) to run all test cases in the order of test case list file on 'base_vm_name'
+        in one worker process.
+    type: str
+    choices: ['plan', 'setup', 'parallel', 'all']
+    default: plan
+  base_vm_name:
+    description: Name of the VM to run setup and serial test cases.
+    type: str
+  clone_vm_names:
+    description: Names of the cloned VMs to run parallel test cases.
+    type: list
+    elements: str
+    default: []
+  extra_vars:
+    description: Extra variables passed to each worker process.
+    type: dict
+    default: {}
+  testing_vars_file:
+    description: Testing vars file passed to each worker process.
+    type: path
+  history_file:
+    description:
+      - Test case history file written by the log plugin, which contains durations and
+        status of test cases in previous test runs of 'base_vm_name'.
+      - If not set, it is '~/.ansible/tmp/gosv_testcase_history.json', which is the default
+        test case history file of the log plugin.
+    type: path
+  resume_log_path:
+    description:
+      - Log files path of a previous test run to resume, which contains 'test_results.yml',
+        and 'events.jsonl' for test case durations.
+      - If deploy_vm test case is not run again, the VM deployed in previous test run is used.
+    type: path
+'''
+
+EXAMPLES = '''
+- name: "Run test cases in parallel on VM and its clones"
+  parallel_testcase_run:
+    playbook: "{{ main_playbook_path }}/main.yml"
+    testcase_file: "{{ parallel_testcase_file }}"
+    log_path: "{{ testrun_log_path }}"
+    phase: parallel
+    base_vm_name: "{{ vm_name }}"
+    clone_vm_names: "{{ parallel_clone_vm_names }}"
+    extra_vars:
+      new_vm: false
+  register: parallel_run_result
+'''
+
+RETURN = '''
+plan:
+  description: Test case names of each phase.
+  returned: always
+  type: dict
+  sample: {"setup": ["deploy_vm", "ovt_verify_install"], "serial": ["nvdimm_cold_add_remove"],
+           "parallel": ["check_ip_address", "stat_balloon"]}
+testcase_results:
+  description:
+    - Results of test cases run in this phase, which are keyed by test case names in test case
+      list file. 'name' is the test case name in test results, which could be changed by deploy_vm
+      test case.
+  returned: always
+  type: dict
+  sample: {"check_ip_address": {"name": "check_ip_address", "status": "Passed", "vm_name": "test_vm_clone_1",
+           "started_at": 1684401010.2, "finished_at": 1684401134.9, "duration": 124,
+           "log_path": "/home/gosv/logs/test_vm/2023-05-18-10-01-03/test_vm_clone_1/check_ip_address"}}
+resumed:
+  description: Names of test cases whose results are from the test run of 'resume_log_path'.
+  returned: always
+  type: list
+runs:
+  description: Worker processes run in this phase.
+  returned: always
+  type: list
+schedule:
+  description:
+    - Schedule of test cases. 'order' is the order of parallel test cases to run, 'estimates'
+      are the estimated durations in seconds of test cases, 'assignments' are the predicted
+      test cases run on each VM, and 'eta' is the estimated time in seconds to finish the
+      test cases of this phase and the following phases.
+  returned: always
+  type: dict
+  sample: {"order": ["gosc_perl_dhcp", "check_ip_address"], "estimates": {"gosc_perl_dhcp": 1260, "check_ip_address": 95},
+           "assignments": {"test_vm": ["check_ip_address"], "test_vm_clone_1": ["gosc_perl_dhcp"]},
+           "no_history": [], "eta": 1260}
+'''
+
+import os
+import json
+import time
+import threading
+import subprocess
+from collections import OrderedDict, deque
+
+import yaml
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible.module_utils._text import to_native
+
+TESTCASE_RUN_MODES = ['setup', 'serial', 'parallel']
+
+
+def get_testcase_name(path):
+    return os.path.basename(path).replace('.yml', '')
+
+
+def load_testcases(testcase_file):
+    """
+    Return test cases in test case list file as a list of dicts with keys of
+    name, path, vars and mode
+    """
+    with open(testcase_file, 'r') as fd:
+        entries = yaml.safe_load(fd) or []
+    testcases = []
+    for entry in entries:
+        if not isinstance(entry, dict) or 'import_playbook' not in entry:
+            continue
+        path = entry['import_playbook']
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(testcase_file)), path)
+        play_vars = dict(entry.get('vars') or {})
+        mode = play_vars.pop('testcase_run_mode', 'parallel')
+        if mode not in TESTCASE_RUN_MODES:
+            raise ValueError("Invalid testcase_run_mode '{}' of test case '{}', valid values are {}".format(
+                mode, entry['import_playbook'], TESTCASE_RUN_MODES))
+        testcases.append({'name': get_testcase_name(path), 'path': path, 'vars': play_vars, 'mode': mode})
+    return testcases
+
+
+def plan_testcases(testcases):
+    plan = OrderedDict([(mode, [t for t in testcases if t['mode'] == mode]) for mode in TESTCASE_RUN_MODES])
+    # Base snapshot is taken by the first test case after VM deployment
+    if plan['parallel'] and not [t for t in plan['setup'] if not t['name'].startswith('deploy')]:
+        plan['setup'].append(plan['parallel'].pop(0))
+    return plan
+
+
+def load_testcase_history(history_file, vm_name):
+    """
+    Return test case history of VM in history file, which is keyed by test case names
+    with values of dicts with keys of duration and status
+    """
+    try:
+        with open(history_file, 'r') as fd:
+            history = json.load(fd)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(history, dict) or not isinstance(history.get(vm_name), dict):
+        return {}
+    return history[vm_name]
+
+
+def estimate_durations(testcases, history):
+    """
+    Return estimated durations of test cases and names of test cases without history,
+    which are estimated with the median duration of test cases with history
+    """
+    estimates = OrderedDict()
+    no_history = []
+    for testcase in testcases:
+        record = history.get(testcase['name'])
+        if record and record.get('duration') is not None:
+            estimates[testcase['name']] = int(record['duration'])
+        else:
+            no_history.append(testcase['name'])
+    known = sorted(estimates.values())
+    median = known[len(known) // 2] if known else 0
+    for name in no_history:
+        estimates[name] = median
+    return estimates, no_history
+
+
+def schedule_testcases(testcases, history, estimates):
+    """
+    Return test cases in scheduled order. Test cases failed in the last run are scheduled
+    firstly from the shortest one, then the others from the longest one.
+    """
+    failed = [t for t in testcases if (history.get(t['name']) or {}).get('status') in ['Failed', 'Blocked']]
+    others = [t for t in testcases if t not in failed]
+    return (sorted(failed, key=lambda t: estimates[t['name']]) +
+            sorted(others, key=lambda t: -estimates[t['name']]))
+
+
+def predict_assignments(testcases, estimates, vm_ready_at):
+    """
+    Return predicted test cases run on each VM and the time when all VMs are idle, by
+    assigning each test case to the VM which is idle firstly
+    """
+    vm_ready_at = OrderedDict(vm_ready_at)
+    assignments = OrderedDict([(vm_name, []) for vm_name in vm_ready_at])
+    for testcase in testcases:
+        vm_name = min(vm_ready_at, key=vm_ready_at.get)
+        assignments[vm_name].append(testcase['name'])
+        vm_ready_at[vm_name] += estimates[testcase['name']]
+    return assignments, max(vm_ready_at.values()) if vm_ready_at else 0
+
+
+def read_testcase_results(log_path):
+    """
+    Return test case results in events log file of a test run, or test case status in
+    test results file if there is no events log file
+    """
+    results = OrderedDict()
+    try:
+        with open(os.path.join(log_path, 'events.jsonl'), 'r') as fd:
+            for line in fd:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get('event') == 'testcase_result':
+                    results[event['test_case']] = event
+    except (IOError, OSError):
+        pass
+    if results:
+        return results
+
+    try:
+        with open(os.path.join(log_path, 'test_results.yml'), 'r') as fd:
+            test_results = yaml.safe_load(fd) or {}
+    except (IOError, OSError, yaml.YAMLError):
+        return results
+    if isinstance(test_results, dict):
+        for name, status in test_results.items():
+            results[name] = {'test_case': name, 'status': status, 'started_at': None, 'finished_at': None, 'duration': 0}
+    return results
+
+
+def match_testcase_results(names, results):
+    """
+    Return test case results keyed by test case names in test case list file.
+    deploy_vm test case could be renamed in test results.
+    """
+    renamed = [name for name in results if name not in names]
+    matched = OrderedDict()
+    for name in names:
+        if name not in results and name.startswith('deploy') and renamed:
+            matched[name] = results[renamed.pop(0)]
+        elif name in results:
+            matched[name] = results[name]
+    return matched
+
+
+class ParallelTestcaseRun(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.ansible_playbook = module.get_bin_path('ansible-playbook', required=True)
+        self.lock = threading.Lock()
+        self.results = OrderedDict()
+        self.runs = []
+        self.queue = deque()
+        self.requeued = set()
+        self.resumed = []
+
+    def run_testcases(self, vm_name, testcases, run_name):
+        """
+        Run test cases on VM in one worker process, and return whether the worker
+        process is able to run test cases on this VM
+        """
+        run_dir = os.path.join(self.params['log_path'], vm_name, run_name)
+        if not os.path.isdir(run_dir):
+            os.makedirs(run_dir)
+        testcase_file = os.path.join(run_dir, 'testcase_list.yml')
+        with open(testcase_file, 'w') as fd:
+            yaml.safe_dump([dict([('import_playbook', t['path'])] + ([('vars', t['vars'])] if t['vars'] else []))
+                            for t in testcases], fd, default_flow_style=False)
+
+        extra_vars = dict(self.params['extra_vars'])
+        extra_vars.update(vm_name=vm_name, testrun_log_path=run_dir, parallel_testing_workers=1)
+        # Log plugin of worker process estimates test cases by the history of base VM
+        cmd = [self.ansible_playbook, self.params['playbook'], '-e', 'testing_testcase_file=' + testcase_file,
+               '-e', 'parallel_testing_base_vm=' + self.params['base_vm_name']]
+        if self.params['testing_vars_file']:
+            cmd += ['-e', 'testing_vars_file=' + self.params['testing_vars_file']]
+        cmd += ['-e', json.dumps(extra_vars)]
+
+        started_at = time.time()
+        with open(os.path.join(run_dir, 'console.log'), 'w') as console:
+            rc = subprocess.call(cmd, cwd=os.path.dirname(self.params['playbook']),
+                                 stdin=subprocess.DEVNULL, stdout=console, stderr=subprocess.STDOUT)
+        finished_at = time.time()
+
+        names = [t['name'] for t in testcases]
+        worker_results = match_testcase_results(names, read_testcase_results(run_dir))
+        ran = False
+        with self.lock:
+            for name in names:
+                result = worker_results.get(name)
+                if result is None:
+                    result = {'test_case': name, 'status': 'No Run', 'started_at': None, 'finished_at': None, 'duration': 0}
+                else:
+                    ran = True
+                self.results[name] = {'name': result['test_case'],
+                                      'status': result['status'],
+                                      'started_at': result['started_at'],
+                                      'finished_at': result['finished_at'],
+                                      'duration': result['duration'],
+                                      'vm_name': vm_name,
+                                      'log_path': run_dir}
+            self.runs.append({'vm_name': vm_name,
+                              'testcases': names,
+                              'rc': rc,
+                              'started_at': started_at,
+                              'duration': round(finished_at - started_at, 1),
+                              'log_path': run_dir})
+        return ran or rc == 0
+
+    def run_worker(self, vm_name, serial_testcases=None):
+        if serial_testcases:
+            self.run_testcases(vm_name, serial_testcases, 'serial')
+        while True:
+            with self.lock:
+                if not self.queue:
+                    return
+                testcase = self.queue.popleft()
+            if not self.run_testcases(vm_name, [testcase], testcase['name']):
+                # VM is not usable, leave its test case to other VMs
+                with self.lock:
+                    if testcase['name'] not in self.requeued:
+                        self.requeued.add(testcase['name'])
+                        self.queue.appendleft(testcase)
+                self.module.warn("Stopped running test cases on VM '{}' after it failed to run test case '{}'".format(
+                    vm_name, testcase['name']))
+                return
+
+    def resume_testcases(self, testcases):
+        """
+        Return test cases to run again in the test run of resume_log_path, and set results
+        of the other test cases
+        """
+        resume_log_path = self.params['resume_log_path']
+        prior_results = match_testcase_results([t['name'] for t in testcases], read_testcase_results(resume_log_path))
+        if not prior_results:
+            self.module.fail_json(msg="Not found test results in {}".format(resume_log_path))
+
+        rerun_testcases = []
+        for testcase in testcases:
+            result = prior_results.get(testcase['name'])
+            if not result or result['status'] in ['Failed', 'Blocked', 'No Run', 'Running']:
+                rerun_testcases.append(testcase)
+                continue
+            self.resumed.append(testcase['name'])
+            # Results of resumed test cases are returned in the first phase
+            if self.params['phase'] in ['setup', 'all']:
+                self.results[testcase['name']] = {'name': result['test_case'],
+                                                  'status': result['status'],
+                                                  'started_at': result['started_at'],
+                                                  'finished_at': result['finished_at'],
+                                                  'duration': result['duration'],
+                                                  'vm_name': self.params['base_vm_name'],
+                                                  'log_path': resume_log_path,
+                                                  'resumed': True}
+            # Use the VM deployed in previous test run
+            if testcase['name'].startswith('deploy'):
+                self.params['extra_vars']['new_vm'] = False
+        return rerun_testcases
+
+    def run(self):
+        try:
+            testcases = load_testcases(self.params['testcase_file'])
+        except (IOError, OSError, ValueError, yaml.YAMLError) as e:
+            self.module.fail_json(msg="Failed to load test cases in {}: {}".format(
+                self.params['testcase_file'], to_native(e)))
+        if self.params['resume_log_path']:
+            testcases = self.resume_testcases(testcases)
+        plan = plan_testcases(testcases)
+
+        phase = self.params['phase']
+        history_file = self.params['history_file'] or os.path.join(
+            os.path.expanduser('~'), '.ansible', 'tmp', 'gosv_testcase_history.json')
+        history = load_testcase_history(history_file, self.params['base_vm_name'])
+        estimates, no_history = estimate_durations(plan['setup'] + plan['serial'] + plan['parallel'], history)
+        plan['parallel'] = schedule_testcases(plan['parallel'], history, estimates)
+        vm_ready_at = [(self.params['base_vm_name'] or 'base_vm', sum([estimates[t['name']] for t in plan['serial']]))]
+        vm_ready_at += [(vm_name, 0) for vm_name in self.params['clone_vm_names']]
+        assignments, eta = predict_assignments(plan['parallel'], estimates, vm_ready_at)
+        if phase == 'all':
+            eta = sum(estimates.values())
+        elif phase != 'parallel':
+            eta += sum([estimates[t['name']] for t in plan['setup']])
+        schedule = {'order': [t['name'] for t in plan['parallel']],
+                    'estimates': estimates,
+                    'assignments': assignments,
+                    'no_history': no_history,
+                    'eta': eta}
+
+        if phase != 'plan' and not self.module.check_mode:
+            for param in ['log_path', 'base_vm_name']:
+                if not self.params[param]:
+                    self.module.fail_json(msg="{} is required to run test cases in {} phase".format(param, phase))
+            if phase == 'setup' and plan['setup']:
+                self.run_testcases(self.params['base_vm_name'], plan['setup'], 'setup')
+            elif phase == 'all' and testcases:
+                self.run_testcases(self.params['base_vm_name'], testcases, 'all')
+            elif phase == 'parallel':
+                self.queue.extend(plan['parallel'])
+                workers = [threading.Thread(target=self.run_worker, args=(self.params['base_vm_name'], plan['serial']))]
+                workers += [threading.Thread(target=self.run_worker, args=(vm_name,))
+                            for vm_name in self.params['clone_vm_names']]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+
+        self.module.exit_json(changed=bool(self.runs),
+                              plan=dict([(mode, [t['name'] for t in testcases]) for mode, testcases in plan.items()]),
+                              testcase_results=self.results,
+                              resumed=self.resumed,
+                              runs=self.runs,
+                              schedule=schedule)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            playbook=dict(type='path', required=True),
+            testcase_file=dict(type='path', required=True),
+            log_path=dict(type='path'),
+            phase=dict(type='str', choices=['plan', 'setup', 'parallel', 'all'], default='plan'),
+            base_vm_name=dict(type='str'),
+            clone_vm_names=dict(type='list', elements='str', default=[]),
+            extra_vars=dict(type='dict', default={}),
+            testing_vars_file=dict(type='path'),
+            history_file=dict(type='path', fallback=(env_fallback, ['GOSV_TESTCASE_HISTORY_FILE'])),
+            resume_log_path=dict(type='path'),
+        ),
+        supports_check_mode=True,
+    )
+    ParallelTestcaseRun(module).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/python
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_datastore_download
+short_description: Download a datastore file to local path, optionally compressed
+description:
+  - Download a datastore file through HTTP GET of datastore file, e.g., vmware.log in VM folder.
+  - The file content is streamed in chunks to local file, and compressed in gzip format on the
+    fly when C(compress) is true, so the whole file is neither kept in memory nor written to
+    local disk uncompressed.
+  - The local file is written to a temporary file and moved to C(dest) after downloading,
+    so C(dest) is not left with partial content when downloading fails.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  datacenter:
+    description: Datacenter name of the datastore.
+    type: str
+    required: true
+  datastore:
+    description: Datastore name.
+    type: str
+    required: true
+  path:
+    description: Relative file path in datastore, e.g., 'vm_name/vmware.log'.
+    type: str
+    required: true
+  dest:
+    description: Local file path to save the datastore file.
+    type: path
+    required: true
+  compress:
+    description: Whether to compress the local file in gzip format.
+    type: bool
+    default: false
+  timeout:
+    description: Timeout in seconds of each HTTP read.
+    type: int
+    default: 300
+'''
+
+EXAMPLES = '''
+- name: "Download vmware.log of VM compressed"
+  vsphere_datastore_download:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    datacenter: "{{ vsphere_host_datacenter }}"
+    datastore: "{{ datastore }}"
+    path: "{{ vm_dir_name }}/vmware.log"
+    dest: "{{ current_test_log_folder }}/vmware.log.gz"
+    compress: true
+  register: download_vm_log_result
+'''
+
+RETURN = '''
+dest:
+  description: Local file path of the downloaded datastore file.
+  returned: always
+  type: str
+bytes_downloaded:
+  description: Bytes of the datastore file downloaded.
+  returned: always
+  type: int
+size:
+  description: Bytes of the local file, which is less than C(bytes_downloaded) when compressed.
+  returned: always
+  type: int
+url:
+  description: URL of the datastore file.
+  returned: always
+  type: str
+elapsed:
+  description: Seconds of downloading the file.
+  returned: always
+  type: float
+'''
+
+import os
+import gzip
+import time
+import tempfile
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.datastore_file import DatastoreFile, datastore_file_argument_spec
+
+READ_CHUNK_SIZE = 1024 * 1024
+# Same as the default compression level of gzip command
+GZIP_LEVEL = 6
+
+
+class DatastoreDownload(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.dest = self.params['dest']
+        self.datastore_file = DatastoreFile(module, self.params['path'], timeout=self.params['timeout'])
+        self.url = self.datastore_file.url
+
+    def download(self, tmp_path):
+        """
+        Stream datastore file content to local file, and return bytes downloaded
+        """
+        size = 0
+        response = self.datastore_file.get(self.url)
+        try:
+            with open(tmp_path, 'wb') as fd:
+                writer = fd
+                if self.params['compress']:
+                    writer = gzip.GzipFile(fileobj=fd, mode='wb', compresslevel=GZIP_LEVEL)
+                try:
+                    while True:
+                        chunk = response.read(READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        writer.write(chunk)
+                        size += len(chunk)
+                finally:
+                    if writer is not fd:
+                        writer.close()
+        finally:
+            response.close()
+        return size
+
+    def run(self):
+        started_at = time.time()
+        dest_dir = os.path.dirname(os.path.abspath(self.dest))
+        if not os.path.isdir(dest_dir):
+            self.module.fail_json(msg="Local directory '{}' does not exist".format(dest_dir))
+
+        fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix='.' + os.path.basename(self.dest))
+        os.close(fd)
+        try:
+            bytes_downloaded = self.download(tmp_path)
+            self.module.atomic_move(tmp_path, self.dest)
+        except HTTPError as e:
+            self.module.fail_json(msg="Failed to download '{}' to '{}': HTTP {} {}".format(
+                self.url, self.dest, e.code, to_native(e.reason)), url=self.url)
+        except Exception as e:
+            self.module.fail_json(msg="Failed to download '{}' to '{}': {}".format(
+                self.url, self.dest, to_native(e)), url=self.url)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self.module.exit_json(changed=True,
+                              dest=self.dest,
+                              bytes_downloaded=bytes_downloaded,
+                              size=os.path.getsize(self.dest),
+                              url=self.url,
+                              elapsed=round(time.time() - started_at, 3))
+
+
+def main():
+    argument_spec = datastore_file_argument_spec()
+    argument_spec.update(
+        path=dict(type='str', required=True),
+        dest=dict(type='path', required=True),
+        compress=dict(type='bool', default=False),
+        timeout=dict(type='int', default=300),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=False)
+    DatastoreDownload(module).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_datastore_file_info
+short_description: Get size and checksums of a datastore file without downloading it
+description:
+  - Get size of a datastore file with HTTP Range request of its first byte, and its
+    checksums in the checksum file with '.checksum' suffix alongside, which is uploaded
+    by vsphere_datastore_upload module.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  datacenter:
+    description: Datacenter name of the datastore.
+    type: str
+    required: true
+  datastore:
+    description: Datastore name.
+    type: str
+    required: true
+  path:
+    description: Relative file path in datastore, e.g., 'ISO/ubuntu-22.04.1-live-server-amd64.iso'.
+    type: str
+    required: true
+  timeout:
+    description: Timeout in seconds of each HTTP request.
+    type: int
+    default: 30
+'''
+
+EXAMPLES = '''
+- name: "Get size and checksums of OS installation ISO file in datastore"
+  vsphere_datastore_file_info:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    datacenter: "{{ vsphere_host_datacenter }}"
+    datastore: "datastore1"
+    path: "ISO/ubuntu-22.04.1-live-server-amd64.iso"
+  register: iso_file_info
+'''
+
+RETURN = '''
+exists:
+  description: Whether the datastore file exists.
+  returned: always
+  type: bool
+size:
+  description: Datastore file size in bytes, which is -1 when the file doesn't exist.
+  returned: always
+  type: int
+last_modified:
+  description:
+    - Last-Modified HTTP header of datastore file, which is empty when the file doesn't exist
+      or the header is not returned.
+  returned: always
+  type: str
+checksums:
+  description:
+    - Checksums of datastore file in dict of algorithm and checksum, which are read from
+      its checksum file when it has the same size as the datastore file.
+  returned: always
+  type: dict
+complete:
+  description:
+    - Whether the datastore file exists and has checksum file of the same size, which
+      means it has been completely uploaded by vsphere_datastore_upload module.
+  returned: always
+  type: bool
+url:
+  description: URL of the datastore file.
+  returned: always
+  type: str
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+from ansible.module_utils.datastore_file import DatastoreFile, datastore_file_argument_spec
+
+
+def main():
+    argument_spec = datastore_file_argument_spec()
+    argument_spec.update(
+        path=dict(type='str', required=True),
+        timeout=dict(type='int', default=30),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+
+    datastore_file = DatastoreFile(module, module.params['path'], timeout=module.params['timeout'])
+    checksums = {}
+    try:
+        size, last_modified = datastore_file.get_stat()
+        if size is not None:
+            checksum_size, checksums = datastore_file.get_checksums()
+            if checksum_size != size:
+                checksums = {}
+    except HTTPError as e:
+        module.fail_json(msg="Failed to get datastore file '{}': HTTP {} {}".format(
+            datastore_file.url, e.code, to_native(e.reason)))
+    except (URLError, IOError, ValueError) as e:
+        module.fail_json(msg="Failed to get datastore file '{}': {}".format(datastore_file.url, to_native(e)))
+
+    module.exit_json(changed=False,
+                     exists=size is not None,
+                     size=size if size is not None else -1,
+                     last_modified=last_modified,
+                     checksums=checksums,
+                     complete=bool(checksums),
+                     url=datastore_file.url)
+
+
+if __name__ == '__main__':
+    main()
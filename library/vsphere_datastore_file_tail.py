@@ -0,0 +1,264 @@
+#!/usr/bin/python
+# Copyright 2022-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_datastore_file_tail
+short_description: Wait for a message appearing in a datastore file
+description:
+  - Wait for the regular expression matching lines in a datastore file, e.g., vmware.log
+    in VM folder, at least specified times.
+  - The file is read from the byte offset of last read with HTTP Range request at each
+    retry, so only the appended content is downloaded and matched. When the file is
+    truncated or replaced with a smaller one, it is read from the beginning again.
+  - The regular expression is matched in each line, and in the last line without line
+    break, which is matched again after more content is appended.
+  - Retries are done in the module instead of the task 'until' loop, and the attempts and
+    polling time are returned for the log plugin to account them as retried tasks.
+options:
+  url:
+    description: URL of datastore file, e.g., the 'url' returned by community.vmware.vsphere_file module.
+    type: str
+    required: true
+  username:
+    description: Username to access datastore file.
+    type: str
+    required: true
+  password:
+    description: Password to access datastore file.
+    type: str
+    required: true
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  regexp:
+    description: The regular expression of message to wait for.
+    type: str
+    required: true
+  times:
+    description: The at least times of the message appearing in datastore file.
+    type: int
+    default: 1
+  retries:
+    description: The times to read appended content of datastore file again to wait for the message.
+    type: int
+    default: 60
+  delay:
+    description: Seconds to delay before next retry.
+    type: int
+    default: 5
+  timeout:
+    description: Timeout in seconds of each HTTP request.
+    type: int
+    default: 30
+'''
+
+EXAMPLES = '''
+- name: "Wait for message 'Chipset: The guest has requested that the virtual machine be hard reset' in vmware.log"
+  vsphere_datastore_file_tail:
+    url: "{{ ds_file_result.url }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    regexp: "Chipset: The guest has requested that the virtual machine be hard reset"
+    times: 1
+  register: vm_log_tail_result
+'''
+
+RETURN = '''
+matches:
+  description: Matches of the regular expression in datastore file, the same as 'regex_findall' filter.
+  returned: always
+  type: list
+found:
+  description: Whether the message appears at least specified times.
+  returned: always
+  type: bool
+size:
+  description: Bytes read of datastore file.
+  returned: always
+  type: int
+bytes_downloaded:
+  description: Bytes downloaded by all requests.
+  returned: always
+  type: int
+requests:
+  description: Number of HTTP requests.
+  returned: always
+  type: int
+attempts:
+  description: Times of reading datastore file, the same as 'attempts' of task with 'until' loop.
+  returned: always
+  type: int
+poll_seconds:
+  description: Seconds from the first retry to the end of waiting, which is 0 when it's not retried.
+  returned: always
+  type: float
+'''
+
+import re
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native, to_text
+from ansible.module_utils.urls import Request
+from ansible.module_utils.six.moves.urllib.error import HTTPError, URLError
+
+CONTENT_RANGE_REGEXP = re.compile(r'bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)')
+
+
+def parse_content_range(content_range):
+    """
+    Return the first byte position and total size in Content-Range header,
+    which are None when unknown
+    """
+    match = CONTENT_RANGE_REGEXP.match(content_range or '')
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return (int(start) if start is not None else None,
+            int(total) if total != '*' else None)
+
+
+class DatastoreFileTail(object):
+    def __init__(self, module):
+        self.module = module
+        self.url = module.params['url']
+        self.request = Request(url_username=module.params['username'],
+                               url_password=module.params['password'],
+                               force_basic_auth=True,
+                               validate_certs=module.params['validate_certs'],
+                               timeout=module.params['timeout'])
+        try:
+            self.regexp = re.compile(module.params['regexp'])
+        except re.error as e:
+            module.fail_json(msg="Invalid regular expression '{}': {}".format(module.params['regexp'], to_native(e)))
+
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.carry = b''
+        self.matches = []
+
+    def read_appended(self):
+        """
+        Return content appended to datastore file since last read
+        """
+        headers = {}
+        if self.offset:
+            headers['Range'] = 'bytes={}-'.format(self.offset)
+
+        self.requests += 1
+        try:
+            response = self.request.open('GET', self.url, headers=headers)
+        except HTTPError as e:
+            if e.code != 416:
+                raise
+            # Requested range is not satisfiable when nothing is appended
+            start, total = parse_content_range(e.headers.get('Content-Range'))
+            if total is not None and total < self.offset:
+                self.reset()
+                return self.read_appended()
+            return b''
+
+        data = response.read()
+        self.bytes_downloaded += len(data)
+        if response.getcode() == 206:
+            start, total = parse_content_range(response.headers.get('Content-Range'))
+            if start is not None and start != self.offset:
+                self.reset()
+                if start != 0:
+                    return self.read_appended()
+        elif self.offset:
+            # Range request is not supported, or the file is replaced
+            if len(data) < self.offset:
+                self.reset()
+            else:
+                data = data[self.offset:]
+
+        self.offset += len(data)
+        return data
+
+    def scan(self, data):
+        """
+        Match complete lines of data together with the last line carried over
+        from previous data, and carry over the last line without line break
+        """
+        content = self.carry + data
+        end = content.rfind(b'\n') + 1
+        if end:
+            self.matches.extend(self.regexp.findall(to_text(content[:end], errors='surrogate_or_replace')))
+        self.carry = content[end:]
+
+    def get_matches(self):
+        if not self.carry:
+            return self.matches
+        return self.matches + self.regexp.findall(to_text(self.carry, errors='surrogate_or_replace'))
+
+    def run(self):
+        times = self.module.params['times']
+        retries = max(self.module.params['retries'], 0)
+        error = None
+        matches = []
+        attempts = 0
+        poll_started_at = None
+        for attempt in range(retries + 1):
+            if attempt:
+                if poll_started_at is None:
+                    poll_started_at = time.time()
+                time.sleep(self.module.params['delay'])
+            attempts += 1
+            try:
+                self.scan(self.read_appended())
+                error = None
+            except (HTTPError, URLError, IOError) as e:
+                # Retry on errors, e.g., file is not created yet
+                error = to_native(e)
+                continue
+            matches = self.get_matches()
+            if len(matches) >= times:
+                break
+
+        result = dict(changed=False,
+                      matches=matches,
+                      found=len(matches) >= times,
+                      size=self.offset,
+                      bytes_downloaded=self.bytes_downloaded,
+                      requests=self.requests,
+                      attempts=attempts,
+                      poll_seconds=round(time.time() - poll_started_at, 3) if poll_started_at else 0.0)
+        if not result['found']:
+            result['msg'] = ("Found message '{}' appearing {} times in datastore file, while expect at least {} times "
+                             "after {} retries".format(self.module.params['regexp'], len(matches), times, retries))
+            if error:
+                result['msg'] += ". Failed to read datastore file: {}".format(error)
+            self.module.fail_json(**result)
+        self.module.exit_json(**result)
+
+
+def main():
+    module = AnsibleModule(
+        argument_spec=dict(
+            url=dict(type='str', required=True),
+            username=dict(type='str', required=True),
+            password=dict(type='str', required=True, no_log=True),
+            validate_certs=dict(type='bool', default=True),
+            regexp=dict(type='str', required=True),
+            times=dict(type='int', default=1),
+            retries=dict(type='int', default=60),
+            delay=dict(type='int', default=5),
+            timeout=dict(type='int', default=30),
+        ),
+        supports_check_mode=True,
+    )
+    DatastoreFileTail(module).run()
+
+
+if __name__ == '__main__':
+    main()
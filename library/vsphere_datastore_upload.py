@@ -0,0 +1,311 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_datastore_upload
+short_description: Upload a local file to datastore unless the same file exists
+description:
+  - Upload a local file to datastore through HTTP PUT of datastore file, and upload a
+    checksum file with '.checksum' suffix alongside, which has file size and checksums.
+  - Upload is skipped when the datastore file has the same size and checksum as the local
+    file in its checksum file.
+  - Local file checksums are computed when uploading the file in the same pass of reading
+    the file, which are cached in a checksum file with '.checksum' suffix alongside the
+    local file. When the checksum of local file is specified, e.g., the one verified
+    by ansible.builtin.get_url module, local file is not read to compute checksum for
+    comparing.
+  - File is read in a thread ahead of uploading, so reading and hashing file content
+    are in parallel with sending it.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  datacenter:
+    description: Datacenter name of the datastore.
+    type: str
+    required: true
+  datastore:
+    description: Datastore name.
+    type: str
+    required: true
+  src:
+    description: Local file path.
+    type: path
+    required: true
+  path:
+    description: Relative file path in datastore, e.g., 'vm_name/uploaded_file_name'.
+    type: str
+    required: true
+  checksum:
+    description: Checksum of local file in the format of '<algorithm>:<checksum>', e.g., 'sha256:xxxxx'.
+    type: str
+  timeout:
+    description: Timeout in seconds of uploading file.
+    type: int
+    default: 300
+'''
+
+EXAMPLES = '''
+- name: "Upload OS installation ISO file to datastore"
+  vsphere_datastore_upload:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    datacenter: "{{ vsphere_host_datacenter }}"
+    datastore: "{{ datastore }}"
+    src: "{{ local_cache }}/CentOS-7-x86_64-Minimal-2009.iso"
+    path: "CentOS-7-x86_64-Minimal-2009.iso"
+    checksum: "md5:xxxxxxxxxx"
+    timeout: 1200
+  register: upload_iso_result
+'''
+
+RETURN = '''
+uploaded:
+  description: Whether the file is uploaded. It's false when the same file exists in datastore.
+  returned: always
+  type: bool
+size:
+  description: File size in bytes.
+  returned: always
+  type: int
+checksums:
+  description: Checksums of the file in dict of algorithm and checksum.
+  returned: always
+  type: dict
+url:
+  description: URL of the datastore file.
+  returned: always
+  type: str
+elapsed:
+  description: Seconds of checking and uploading the file.
+  returned: always
+  type: float
+'''
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_bytes, to_native
+from ansible.module_utils.six.moves import queue
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.datastore_file import CHECKSUM_FILE_SUFFIX, DatastoreFile, datastore_file_argument_spec
+
+# Checksum algorithm of the file besides the algorithm of specified checksum
+DEFAULT_CHECKSUM_ALGORITHM = 'sha256'
+READ_CHUNK_SIZE = 1024 * 1024
+READ_AHEAD_CHUNKS = 8
+
+
+class ChecksumReader(object):
+    """
+    File object to upload file, which computes checksums of the file content.
+    The file is read and hashed in a thread ahead of uploading.
+    """
+    def __init__(self, path, algorithms):
+        self.hashes = dict([(algorithm, hashlib.new(algorithm)) for algorithm in algorithms])
+        self.chunks = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+        self.chunk = b''
+        self.pos = 0
+        self.eof = False
+        self.error = None
+        self.thread = threading.Thread(target=self._read_chunks, args=(path,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _read_chunks(self, path):
+        try:
+            with open(path, 'rb') as fd:
+                while True:
+                    chunk = fd.read(READ_CHUNK_SIZE)
+                    for file_hash in self.hashes.values():
+                        file_hash.update(chunk)
+                    self.chunks.put(chunk)
+                    if not chunk:
+                        break
+        except (IOError, OSError) as e:
+            self.error = e
+            self.chunks.put(b'')
+
+    def read(self, size=-1):
+        if self.pos >= len(self.chunk):
+            if self.eof:
+                return b''
+            self.chunk = self.chunks.get()
+            self.pos = 0
+            if not self.chunk:
+                self.eof = True
+                if self.error:
+                    raise self.error
+                return b''
+        if size is None or size < 0:
+            size = len(self.chunk) - self.pos
+        data = self.chunk[self.pos:self.pos + size]
+        self.pos += len(data)
+        return data
+
+    def get_checksums(self):
+        self.thread.join()
+        return dict([(algorithm, file_hash.hexdigest()) for algorithm, file_hash in self.hashes.items()])
+
+
+def compute_checksums(path, algorithms):
+    reader = ChecksumReader(path, algorithms)
+    while reader.read():
+        pass
+    return reader.get_checksums()
+
+
+def checksums_match(checksums, other_checksums):
+    """
+    Return whether checksums of the same algorithms are all the same, and
+    there is at least one same algorithm
+    """
+    algorithms = set(checksums) & set(other_checksums)
+    return bool(algorithms) and all([checksums[a] == other_checksums[a] for a in algorithms])
+
+
+class DatastoreUpload(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.src = self.params['src']
+        if not os.path.isfile(self.src):
+            module.fail_json(msg="Local file '{}' does not exist".format(self.src))
+        self.size = os.path.getsize(self.src)
+
+        self.checksums = {}
+        self.algorithms = [DEFAULT_CHECKSUM_ALGORITHM]
+        if self.params['checksum']:
+            algorithm, sep, checksum = self.params['checksum'].partition(':')
+            algorithm = algorithm.strip().lower()
+            if not sep or algorithm not in hashlib.algorithms_available:
+                module.fail_json(msg="Invalid checksum '{}', it should be in the format of "
+                                     "'<algorithm>:<checksum>'".format(self.params['checksum']))
+            self.checksums[algorithm] = checksum.strip().lower()
+            if algorithm not in self.algorithms:
+                self.algorithms.append(algorithm)
+
+        self.datastore_file = DatastoreFile(module, self.params['path'], timeout=self.params['timeout'])
+        self.url = self.datastore_file.url
+        self.local_checksum_file = self.src + CHECKSUM_FILE_SUFFIX
+
+    def load_local_checksums(self):
+        """
+        Return cached checksums of local file when it's not changed
+        """
+        try:
+            with open(self.local_checksum_file, 'r') as fd:
+                cached = json.load(fd)
+        except (IOError, OSError, ValueError):
+            return {}
+        stat = os.stat(self.src)
+        if cached.get('size') != stat.st_size or cached.get('mtime') != stat.st_mtime:
+            return {}
+        return cached.get('checksums', {})
+
+    def save_local_checksums(self):
+        stat = os.stat(self.src)
+        try:
+            with open(self.local_checksum_file, 'w') as fd:
+                json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'checksums': self.checksums}, fd)
+        except (IOError, OSError) as e:
+            self.module.warn("Failed to save checksums of local file in {}: {}".format(
+                self.local_checksum_file, to_native(e)))
+
+    def is_uploaded(self):
+        remote_size, remote_checksums = self.datastore_file.get_checksums()
+        if remote_size != self.size or not remote_checksums:
+            return False
+        if not checksums_match(self.checksums, remote_checksums):
+            if set(self.checksums) & set(remote_checksums):
+                return False
+            # Compute local checksums of the algorithms in remote checksum file
+            self.checksums.update(compute_checksums(self.src, [a for a in remote_checksums
+                                                               if a in hashlib.algorithms_available]))
+            if not checksums_match(self.checksums, remote_checksums):
+                return False
+        return self.datastore_file.get_size() == self.size
+
+    def upload(self):
+        reader = ChecksumReader(self.src, self.algorithms)
+        self.datastore_file.put(self.url, reader, self.size)
+        checksums = reader.get_checksums()
+        for algorithm, checksum in self.checksums.items():
+            if checksums.get(algorithm, checksum) != checksum:
+                self.module.fail_json(msg="Checksum of local file '{}' is {}:{}, not the expected {}:{}".format(
+                    self.src, algorithm, checksums[algorithm], algorithm, checksum))
+        self.checksums.update(checksums)
+
+        remote_size = self.datastore_file.get_size()
+        if remote_size != self.size:
+            self.module.fail_json(msg="Size of uploaded datastore file is {}, not the size {} of local file '{}'".format(
+                remote_size, self.size, self.src))
+        checksum_data = to_bytes(json.dumps({'size': self.size, 'checksums': self.checksums}))
+        self.datastore_file.put(self.datastore_file.checksum_url, checksum_data, len(checksum_data))
+
+    def run(self):
+        started_at = time.time()
+        local_checksums = self.load_local_checksums()
+        self.checksums = dict(local_checksums, **self.checksums)
+        uploaded = False
+        try:
+            if not self.is_uploaded():
+                if not self.module.check_mode:
+                    self.upload()
+                uploaded = True
+        except HTTPError as e:
+            self.module.fail_json(msg="Failed to upload '{}' to '{}': HTTP {} {}".format(
+                self.src, self.url, e.code, to_native(e.reason)))
+        except Exception as e:
+            self.module.fail_json(msg="Failed to upload '{}' to '{}': {}".format(self.src, self.url, to_native(e)))
+
+        if not self.module.check_mode and self.checksums != local_checksums:
+            self.save_local_checksums()
+        self.module.exit_json(changed=uploaded,
+                              uploaded=uploaded,
+                              size=self.size,
+                              checksums=self.checksums,
+                              url=self.url,
+                              elapsed=round(time.time() - started_at, 3))
+
+
+def main():
+    argument_spec = datastore_file_argument_spec()
+    argument_spec.update(
+        src=dict(type='path', required=True),
+        path=dict(type='str', required=True),
+        checksum=dict(type='str'),
+        timeout=dict(type='int', default=300),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+    DatastoreUpload(module).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_session
+short_description: Manage the cached vSphere API session shared by tasks
+description:
+  - Log in vCenter Server or ESXi and cache the session on the controller, or log out
+    the cached session.
+  - Project modules connecting to vSphere reuse the cached session across tasks instead
+    of logging in for each task, and log in again when it has expired.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+    aliases: ['user', 'admin']
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+    aliases: ['pass', 'pwd']
+  port:
+    description: Port of vCenter Server or ESXi API.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  session_cache_dir:
+    description:
+      - Directory on the controller to cache vSphere sessions.
+      - Default is '~/.ansible/tmp/gosv_vsphere_sessions'.
+    type: path
+  session_keepalive:
+    description:
+      - Cached session idle for less than this number of seconds is reused without
+        checking whether it is still authenticated.
+    type: int
+    default: 300
+  state:
+    description:
+      - When it is 'present', reuse the cached session or log in a new session.
+      - When it is 'absent', log out the cached session and remove it from cache.
+    type: str
+    default: present
+    choices: ['present', 'absent']
+'''
+
+EXAMPLES = '''
+- name: "Log out the cached vSphere session"
+  vsphere_session:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    state: absent
+'''
+
+RETURN = '''
+session_reused:
+  description: Whether the cached session is reused.
+  returned: when state is present
+  type: bool
+logins:
+  description: Number of logins to vCenter Server or ESXi.
+  returned: always
+  type: int
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.vsphere_session import VsphereSession, vsphere_session_argument_spec
+
+
+def main():
+    argument_spec = vsphere_session_argument_spec()
+    argument_spec.update(state=dict(type='str', default='present', choices=['present', 'absent']))
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+
+    session = VsphereSession(module)
+    if module.params['state'] == 'absent':
+        logged_out = session.logout()
+        module.exit_json(changed=logged_out, logins=session.logins)
+
+    session.connect()
+    module.exit_json(changed=not session.reused,
+                     session_reused=session.reused,
+                     logins=session.logins)
+
+
+if __name__ == '__main__':
+    main()
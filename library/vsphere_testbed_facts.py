@@ -0,0 +1,510 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_testbed_facts
+short_description: Get static facts of vCenter Server and ESXi server from a cache
+description:
+  - Get facts of vCenter Server or ESXi server which don't change until it's upgraded,
+    e.g., version and build, ESXi server model, supported hardware versions and guest
+    OS config options, through the vSphere session cached by vsphere_session module.
+  - Facts are cached in a file on the controller keyed by vSphere hostname, port and ESXi
+    hostname. Facts cached for less than 'cache_ttl' seconds are returned without any
+    vSphere API call, except that ESXi server build number is checked with one
+    PropertyCollector call when ESXi server facts are cached.
+  - Stale or missing ESXi server facts are refreshed together in one PropertyCollector
+    call with ESXi server build number. When the build number is changed, e.g., ESXi
+    server is upgraded, all cached facts of the ESXi server are dropped. Supported hardware versions and guest OS config
+    options are queried from the environment browser of ESXi server only when they're
+    stale or missing.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi API.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  session_cache_dir:
+    description: Directory on the controller to cache vSphere sessions.
+    type: path
+  session_keepalive:
+    description: Cached session idle for less than this number of seconds is reused without checking.
+    type: int
+    default: 300
+  esxi_hostname:
+    description:
+      - ESXi hostname or IP address in vCenter Server inventory.
+      - Required when getting facts of ESXi server.
+    type: str
+  facts:
+    description:
+      - List of facts to get.
+      - C(about) is the about info of vCenter Server or ESXi server connected.
+      - C(esxi_product) is the version, build and update version of ESXi server.
+      - C(esxi_model) is the vendor, model and CPU model of ESXi server.
+      - C(hardware_versions) is the supported and default hardware versions of ESXi server.
+      - C(guest_os) is the supported guest IDs of I(hardware_version), and the config options
+        of I(guest_id) on I(hardware_version).
+    type: list
+    elements: str
+    choices: ['about', 'esxi_product', 'esxi_model', 'hardware_versions', 'guest_os']
+    default: ['about', 'esxi_product', 'esxi_model']
+  hardware_version:
+    description: Hardware version number, e.g., 19. Required when getting 'guest_os' facts.
+    type: int
+  guest_id:
+    description: Guest ID to get config options on 'hardware_version'.
+    type: str
+  cache_dir:
+    description:
+      - Directory on the controller to cache testbed facts.
+      - Default is '~/.ansible/tmp/gosv_testbed_facts'.
+    type: path
+  cache_ttl:
+    description:
+      - Seconds of cached facts being valid. When it's 0, cached facts are not used.
+    type: int
+    default: 86400
+  refresh:
+    description: Whether to drop all cached facts of the vCenter Server or ESXi server and get them again.
+    type: bool
+    default: false
+'''
+
+EXAMPLES = '''
+- name: "Get ESXi server version and model"
+  vsphere_testbed_facts:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    esxi_hostname: "{{ esxi_hostname }}"
+    facts: ['esxi_product', 'esxi_model']
+  register: testbed_facts_result
+
+- name: "Get config options of guest ID on hardware version 19"
+  vsphere_testbed_facts:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    esxi_hostname: "{{ esxi_hostname }}"
+    facts: ['guest_os']
+    hardware_version: 19
+    guest_id: "centos8_64Guest"
+  register: testbed_facts_result
+'''
+
+RETURN = '''
+testbed_facts:
+  description: Dict of requested facts.
+  returned: always
+  type: dict
+  sample: {
+    "about": {"api_type": "VirtualCenter", "build": "20395099", "full_name": "VMware vCenter Server 8.0.0 build-20395099",
+              "instance_uuid": "xxxxxxxx", "version": "8.0.0"},
+    "esxi_product": {"build": "20513097", "update_version": "N/A", "version": "8.0.0"},
+    "esxi_model": {"cpu_model": "Intel(R) Xeon(R) Gold 6148 CPU @ 2.40GHz", "model": "PowerEdge R740", "vendor": "Dell Inc."}
+  }
+cached_facts:
+  description: Facts returned from cache.
+  returned: always
+  type: list
+api_calls:
+  description: Number of vSphere API calls to refresh facts.
+  returned: always
+  type: int
+'''
+
+import os
+import json
+import time
+import hashlib
+
+from ansible.module_utils.basic import AnsibleModule, env_fallback
+from ansible.module_utils._text import to_bytes, to_native, to_text
+from ansible.module_utils.vsphere_session import HAS_PYVMOMI, VsphereSession, vsphere_session_argument_spec
+
+if HAS_PYVMOMI:
+    from pyVmomi import vim, vmodl
+
+TESTBED_FACTS = ['about', 'esxi_product', 'esxi_model', 'hardware_versions', 'guest_os']
+
+# ESXi server facts refreshed with the host properties in one PropertyCollector call
+HOST_FACTS = ['esxi_product', 'esxi_model']
+HOST_PROPERTIES = ['name', 'parent', 'config.product', 'configManager.advancedOption',
+                   'summary.hardware.vendor', 'summary.hardware.model', 'summary.hardware.cpuModel']
+
+# Device names of VM device types in guest OS descriptor
+VM_DEVICE_TYPES = {
+    'VirtualLsiLogicController': 'lsilogic',
+    'VirtualLsiLogicSASController': 'lsilogicsas',
+    'ParaVirtualSCSIController': 'paravirtual',
+    'VirtualBusLogicController': 'buslogic',
+    'VirtualAHCIController': 'sata',
+    'VirtualNVMEController': 'nvme',
+    'VirtualIDEController': 'ide',
+    'VirtualVmxnet3': 'vmxnet3',
+    'VirtualE1000e': 'e1000e',
+    'VirtualE1000': 'e1000',
+    'VirtualVmxnet3Vrdma': 'pvrdma',
+    'VirtualSriovEthernetCard': 'sriov',
+    'VirtualPCNet32': 'pcnet32',
+    'VirtualVmxnet2': 'vmxnet2',
+    'VirtualUSBController': 'usb2',
+    'VirtualUSBXHCIController': 'usb3',
+}
+
+# Guest config option names of guest OS descriptor properties, which are the same
+# as the ones got from ESXi server config option file
+GUEST_CONFIG_OPTIONS = {
+    'recommendedCdromController': 'default_cdrom_controller',
+    'numRecommendedCoresPerSocket': 'default_cpu_cores_per_socket',
+    'numRecommendedPhysicalSockets': 'default_cpu_socket',
+    'recommendedUSBController': 'default_usb_controller',
+    'recommendedDiskController': 'default_disk_controller',
+    'recommendedDiskSizeMB': 'default_disk_size_in_mb',
+    'recommendedFirmware': 'default_firmware',
+    'recommendedMemMB': 'default_memory_in_mb',
+    'recommendedEthernetCard': 'default_network_adapter',
+    'defaultSecureBoot': 'default_secure_boot',
+    'supportsSecureBoot': 'support_secure_boot',
+    'fullName': 'guest_fullname',
+    'recommendedPersistentMemoryMB': 'rec_persistent_memory',
+    'supportedMinPersistentMemoryMB': 'support_min_persistent_mem_mb',
+    'persistentMemorySupported': 'support_persistent_memory',
+    'supportsTPM20': 'support_tpm_20',
+}
+
+
+def get_device_name(device_type):
+    if device_type is None:
+        return None
+    type_name = getattr(device_type, '_wsdlName', to_text(device_type))
+    return VM_DEVICE_TYPES.get(type_name.split('.')[-1], type_name)
+
+
+def get_guest_config_options(guest_os_desc, hardware_version):
+    options = {}
+    for prop, option in GUEST_CONFIG_OPTIONS.items():
+        value = getattr(guest_os_desc, prop, None)
+        if prop.startswith('recommended') and prop.endswith(('Controller', 'EthernetCard')):
+            value = get_device_name(value)
+        options[option] = value
+    if guest_os_desc.vRAMSizeInKB is not None:
+        options['rec_vram_kb'] = guest_os_desc.vRAMSizeInKB.defaultValue
+    options['support_disk_controller'] = [get_device_name(t) for t in guest_os_desc.supportedDiskControllerList or []]
+    options['support_ethernet_card'] = [get_device_name(t) for t in guest_os_desc.supportedEthernetCard or []]
+    options['support_usb_controller'] = [get_device_name(t) for t in guest_os_desc.supportedUSBControllerList or []]
+    options['guest_id'] = guest_os_desc.id
+    options['hardware_version'] = 'vmx-{}'.format(hardware_version)
+    return options
+
+
+class TestbedFactsCache(object):
+    """
+    Cache of testbed facts in a file on the controller, in which each fact has
+    the time it's updated
+    """
+    def __init__(self, cache_dir, key, ttl):
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.ansible', 'tmp', 'gosv_testbed_facts')
+        self.cache_file = os.path.join(cache_dir, hashlib.sha1(to_bytes(key)).hexdigest() + '.json')
+        self.ttl = ttl
+        self.data = {}
+        self.updated = set()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as fd:
+                self.data = json.load(fd)
+        except (IOError, OSError, ValueError):
+            self.data = {}
+
+    def save(self):
+        cache_dir = os.path.dirname(self.cache_file)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, mode=0o700)
+        tmp_file = "{}.{}".format(self.cache_file, os.getpid())
+        with open(tmp_file, 'w') as fd:
+            json.dump(self.data, fd)
+        os.rename(tmp_file, self.cache_file)
+
+    def get(self, name):
+        """
+        Return cached fact value, or None when it's not cached, or it's expired and
+        not updated in this run
+        """
+        entry = self.data.get('facts', {}).get(name)
+        if not entry or (name not in self.updated and time.time() - entry.get('updated', 0) >= self.ttl):
+            return None
+        return entry.get('value')
+
+    def set(self, name, value):
+        self.data.setdefault('facts', {})[name] = {'updated': time.time(), 'value': value}
+        self.updated.add(name)
+
+
+class TestbedFacts(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.session = VsphereSession(module)
+        self.api_calls = 0
+
+        if set(self.params['facts']) - set(['about']) and not self.params['esxi_hostname']:
+            module.fail_json(msg="esxi_hostname is required to get ESXi server facts {}".format(self.params['facts']))
+        if 'guest_os' in self.params['facts'] and not self.params['hardware_version']:
+            module.fail_json(msg="hardware_version is required to get 'guest_os' facts")
+
+        cache_key = "{}:{}:{}".format(self.params['hostname'], self.params['port'], self.params['esxi_hostname'] or '')
+        self.cache = TestbedFactsCache(self.params['cache_dir'], cache_key, self.params['cache_ttl'])
+
+    def get_guest_os_fact_name(self):
+        return 'guest_os_vmx-{}'.format(self.params['hardware_version'])
+
+    def get_fact_names(self):
+        """
+        Return cache entry names of requested facts
+        """
+        return [self.get_guest_os_fact_name() if fact == 'guest_os' else fact
+                for fact in dict.fromkeys(self.params['facts'])]
+
+    def find_host(self, content):
+        """
+        Return host properties of ESXi server and environment browser of its compute
+        resource in one call, which are traversed from the cached host, or from all hosts
+        in a container view when host is not cached
+        """
+        pc = vmodl.query.PropertyCollector
+        to_parent = pc.TraversalSpec(name='toParent', type=vim.HostSystem, path='parent', skip=False)
+        prop_set = [pc.PropertySpec(type=vim.HostSystem, all=False, pathSet=HOST_PROPERTIES),
+                    pc.PropertySpec(type=vim.ComputeResource, all=False, pathSet=['environmentBrowser'])]
+
+        host_moid = self.cache.data.get('host_moid')
+        view = None
+        if host_moid:
+            obj_spec = pc.ObjectSpec(obj=vim.HostSystem(host_moid, content.propertyCollector._stub),
+                                     skip=False, selectSet=[to_parent])
+        else:
+            self.api_calls += 1
+            view = content.viewManager.CreateContainerView(content.rootFolder, [vim.HostSystem], True)
+            obj_spec = pc.ObjectSpec(obj=view, skip=True, selectSet=[
+                pc.TraversalSpec(name='toHosts', type=vim.view.ContainerView, path='view', skip=False,
+                                 selectSet=[pc.SelectionSpec(name='toParent')]),
+                to_parent])
+        try:
+            self.api_calls += 1
+            result = content.propertyCollector.RetrievePropertiesEx([pc.FilterSpec(objectSet=[obj_spec],
+                                                                                   propSet=prop_set)],
+                                                                    pc.RetrieveOptions())
+            objects = list(result.objects) if result else []
+            while result and result.token:
+                self.api_calls += 1
+                result = content.propertyCollector.ContinueRetrievePropertiesEx(result.token)
+                objects.extend(result.objects)
+        except vmodl.fault.ManagedObjectNotFound:
+            # Host has been removed and added again
+            self.cache.data.pop('host_moid', None)
+            return self.find_host(content)
+        finally:
+            if view is not None:
+                self.api_calls += 1
+                view.DestroyView()
+
+        hosts = {}
+        browsers = {}
+        for obj in objects:
+            props = dict([(prop.name, prop.val) for prop in obj.propSet])
+            if isinstance(obj.obj, vim.HostSystem):
+                hosts[obj.obj._moId] = (obj.obj, props)
+            else:
+                browsers[obj.obj._moId] = props.get('environmentBrowser')
+
+        esxi_hostname = self.params['esxi_hostname']
+        matched = [h for h in hosts.values() if h[1].get('name') == esxi_hostname]
+        if not matched and len(hosts) == 1 and content.about.apiType == 'HostAgent':
+            # ESXi hostname could be IP address, while host name is its FQDN
+            matched = list(hosts.values())
+        if not matched:
+            self.module.fail_json(msg="Unable to find ESXi server '{}'".format(esxi_hostname))
+        host, props = matched[0]
+        parent = props.get('parent')
+        return host, props, browsers.get(parent._moId) if parent is not None else None
+
+    def check_host_build(self, content):
+        """
+        Return whether build number of the cached host is the same as the cached one
+        """
+        host_moid = self.cache.data.get('host_moid')
+        if not host_moid or not self.cache.data.get('esxi_build'):
+            return False
+        pc = vmodl.query.PropertyCollector
+        obj_spec = pc.ObjectSpec(obj=vim.HostSystem(host_moid, content.propertyCollector._stub), skip=False)
+        prop_spec = pc.PropertySpec(type=vim.HostSystem, all=False, pathSet=['config.product.build'])
+        try:
+            self.api_calls += 1
+            result = content.propertyCollector.RetrievePropertiesEx([pc.FilterSpec(objectSet=[obj_spec],
+                                                                                   propSet=[prop_spec])],
+                                                                    pc.RetrieveOptions())
+        except vmodl.fault.ManagedObjectNotFound:
+            return False
+        build = None
+        if result and result.objects:
+            for prop in result.objects[0].propSet:
+                build = prop.val
+        return build == self.cache.data['esxi_build']
+
+    def refresh_host_facts(self, content, stale_facts):
+        host, props, browser = self.find_host(content)
+        product = props['config.product']
+
+        # Cached facts of ESXi server are dropped when it's upgraded
+        if self.cache.data.get('esxi_build') != product.build:
+            self.cache.data['facts'] = dict([(name, entry) for name, entry in self.cache.data.get('facts', {}).items()
+                                             if name == 'about'])
+            stale_facts = [name for name in self.get_fact_names() if name != 'about' or name in stale_facts]
+        self.cache.data['host_moid'] = host._moId
+        self.cache.data['esxi_build'] = product.build
+
+        update_version = 'N/A'
+        if 'esxi_product' in stale_facts and int(product.version.split('.')[0]) < 7:
+            try:
+                self.api_calls += 1
+                options = props['configManager.advancedOption'].QueryOptions('Misc.HostAgentUpdateLevel')
+                if options:
+                    update_version = to_text(options[0].value)
+            except vim.fault.InvalidName:
+                pass
+        if 'esxi_product' in stale_facts:
+            self.cache.set('esxi_product', {'version': product.version,
+                                            'build': product.build,
+                                            'update_version': update_version})
+        self.cache.set('esxi_model', {'vendor': props.get('summary.hardware.vendor'),
+                                      'model': props.get('summary.hardware.model'),
+                                      'cpu_model': props.get('summary.hardware.cpuModel')})
+
+        if 'hardware_versions' in stale_facts or self.get_guest_os_fact_name() in stale_facts:
+            if browser is None:
+                self.module.fail_json(msg="Unable to get environment browser of ESXi server '{}'".format(
+                    self.params['esxi_hostname']))
+
+        if 'hardware_versions' in stale_facts:
+            self.api_calls += 1
+            descriptors = browser.QueryConfigOptionDescriptor()
+            versions = []
+            default_version = None
+            for descriptor in descriptors or []:
+                if not descriptor.key.startswith('vmx-'):
+                    continue
+                version = int(descriptor.key[4:])
+                if descriptor.createSupported:
+                    versions.append(version)
+                if descriptor.defaultConfigOption:
+                    default_version = version
+            self.cache.set('hardware_versions', {'versions': sorted(versions),
+                                                 'default': default_version,
+                                                 'latest': max(versions) if versions else None})
+
+        guest_os_fact_name = self.get_guest_os_fact_name()
+        if guest_os_fact_name in stale_facts:
+            hardware_version = self.params['hardware_version']
+            spec = vim.EnvironmentBrowser.ConfigOptionQuerySpec(key='vmx-{}'.format(hardware_version), host=host)
+            self.api_calls += 1
+            config_option = browser.QueryConfigOptionEx(spec)
+            guest_os = {'guest_ids': [], 'config_options': {}}
+            for guest_os_desc in (config_option.guestOSDescriptor if config_option else None) or []:
+                guest_os['guest_ids'].append(guest_os_desc.id)
+                guest_os['config_options'][guest_os_desc.id] = get_guest_config_options(guest_os_desc,
+                                                                                       hardware_version)
+            self.cache.set(guest_os_fact_name, guest_os)
+
+    def refresh(self, content, stale_facts):
+        if 'about' in stale_facts:
+            about = content.about
+            self.cache.set('about', {'api_type': about.apiType,
+                                     'version': about.version,
+                                     'build': about.build,
+                                     'full_name': about.fullName,
+                                     'instance_uuid': about.instanceUuid})
+        if [fact for fact in stale_facts if fact != 'about']:
+            self.refresh_host_facts(content, stale_facts)
+
+    def run(self):
+        if self.params['cache_ttl'] > 0 and not self.params['refresh']:
+            self.cache.load()
+        fact_names = self.get_fact_names()
+        stale_facts = [name for name in fact_names if self.cache.get(name) is None]
+
+        # Cached ESXi server facts are refreshed when ESXi server has been upgraded
+        host_fact_names = [name for name in fact_names if name != 'about']
+        if host_fact_names and not [name for name in host_fact_names if name in stale_facts]:
+            try:
+                if not self.session.invoke(self.check_host_build):
+                    stale_facts = list(dict.fromkeys(stale_facts + host_fact_names))
+            except vmodl.MethodFault as e:
+                self.module.fail_json(msg="Failed to check ESXi server build number: {}".format(to_native(e.msg)))
+
+        if stale_facts:
+            try:
+                self.session.invoke(self.refresh, stale_facts)
+            except vmodl.MethodFault as e:
+                self.module.fail_json(msg="Failed to get testbed facts {}: {}".format(stale_facts, to_native(e.msg)))
+            if self.params['cache_ttl'] > 0:
+                try:
+                    self.cache.save()
+                except (IOError, OSError) as e:
+                    self.module.warn("Failed to cache testbed facts in {}: {}".format(self.cache.cache_file, to_native(e)))
+
+        cached_facts = [name for name in fact_names if name not in self.cache.updated]
+        testbed_facts = {}
+        for fact in dict.fromkeys(self.params['facts']):
+            if fact != 'guest_os':
+                testbed_facts[fact] = self.cache.get(fact)
+                continue
+            guest_os = self.cache.get(self.get_guest_os_fact_name())
+            guest_id = self.params['guest_id']
+            testbed_facts[fact] = {'hardware_version': self.params['hardware_version'],
+                                   'guest_ids': guest_os['guest_ids'],
+                                   'config_options': guest_os['config_options'].get(guest_id, {}) if guest_id else {}}
+
+        self.module.exit_json(changed=False,
+                              testbed_facts=testbed_facts,
+                              cached_facts=['guest_os' if name.startswith('guest_os_') else name for name in cached_facts],
+                              api_calls=self.api_calls)
+
+
+def main():
+    argument_spec = vsphere_session_argument_spec()
+    argument_spec.update(
+        esxi_hostname=dict(type='str'),
+        facts=dict(type='list', elements='str', choices=TESTBED_FACTS, default=['about', 'esxi_product', 'esxi_model']),
+        hardware_version=dict(type='int'),
+        guest_id=dict(type='str'),
+        cache_dir=dict(type='path', fallback=(env_fallback, ['GOSV_TESTBED_FACTS_CACHE_DIR'])),
+        cache_ttl=dict(type='int', default=86400),
+        refresh=dict(type='bool', default=False),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+    TestbedFacts(module).run()
+
+
+if __name__ == '__main__':
+    main()
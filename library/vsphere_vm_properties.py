@@ -0,0 +1,327 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_vm_properties
+short_description: Get specified properties of a VM in one PropertyCollector call
+description:
+  - Retrieve only the specified property paths of a VM with one PropertyCollector call,
+    through the vSphere session cached by vsphere_session module.
+  - Returned 'instance' has the same layout as community.vmware.vmware_guest_info module
+    with 'vsphere' schema and specified properties.
+  - VM managed object ID and values of 'config' properties are cached on the controller.
+    Cached values are dropped when VM is reconfigured, powered on or off, or its current
+    snapshot is changed, which are checked in the same call.
+  - The C(config.extraConfig) and C(config.tools) properties, and the whole C(config) property
+    including them, are not cached, because they are changed by guest, e.g., VMware Tools
+    install or upgrade in guest OS, without VM reconfiguration.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi API.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  session_cache_dir:
+    description: Directory on the controller to cache vSphere sessions.
+    type: path
+  session_keepalive:
+    description: Cached session idle for less than this number of seconds is reused without checking.
+    type: int
+    default: 300
+  datacenter:
+    description: Datacenter name of the VM.
+    type: str
+    required: true
+  folder:
+    description: VM folder path, e.g., '/datacenter/vm/folder'.
+    type: str
+  name:
+    description: VM name.
+    type: str
+    required: true
+  properties:
+    description: List of VM property paths, e.g., ['config.hardware.numCPU', 'runtime.powerState'].
+    type: list
+    elements: str
+    default: ['config']
+  cache:
+    description:
+      - Whether to use cached VM managed object ID and 'config' property values.
+      - The C(config.extraConfig) and C(config.tools) property values are never cached.
+    type: bool
+    default: true
+  cache_dir:
+    description:
+      - Directory on the controller to cache VM properties.
+      - Default is '~/.ansible/tmp/gosv_vm_properties'.
+    type: path
+'''
+
+EXAMPLES = '''
+- name: "Get VM CPU and power state"
+  vsphere_vm_properties:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    datacenter: "{{ vsphere_host_datacenter }}"
+    folder: "{{ vm_folder }}"
+    name: "{{ vm_name }}"
+    properties: ['config.hardware.numCPU', 'runtime.powerState']
+  register: vm_properties_result
+'''
+
+RETURN = '''
+instance:
+  description: VM properties in nested dict of property paths.
+  returned: always
+  type: dict
+  sample: {"config": {"hardware": {"numCPU": 2}}, "runtime": {"powerState": "poweredOn"}}
+moid:
+  description: VM managed object ID.
+  returned: always
+  type: str
+cached_properties:
+  description: Property paths whose values are from cache.
+  returned: always
+  type: list
+api_calls:
+  description: Number of vSphere API calls to find VM and retrieve properties.
+  returned: always
+  type: int
+'''
+
+import os
+import json
+import time
+import hashlib
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_bytes, to_native
+from ansible.module_utils.vsphere_session import HAS_PYVMOMI, VsphereSession, vsphere_session_argument_spec
+
+if HAS_PYVMOMI:
+    from pyVmomi import vim, vmodl
+    try:
+        from pyVmomi.VmomiJSONEncoder import VmomiJSONEncoder
+    except ImportError:
+        # pyVmomi earlier than 8.0.3.0
+        from pyVmomi.VmomiSupport import VmomiJSONEncoder
+
+# Changes of these properties drop cached VM properties
+VM_CACHE_STAMP_PROPERTIES = ['config.changeVersion', 'runtime.powerState', 'snapshot.currentSnapshot']
+# These properties are changed by guest without changing above properties
+VM_CACHE_EXCLUDED_PROPERTIES = ['config.extraConfig', 'config.tools']
+
+
+class VmPropertiesCache(object):
+    """
+    Cache of VM managed object ID and 'config' property values in a file on the controller
+    """
+    def __init__(self, cache_dir, key):
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.ansible', 'tmp', 'gosv_vm_properties')
+        self.cache_file = os.path.join(cache_dir, hashlib.sha1(to_bytes(key)).hexdigest() + '.json')
+        self.data = {}
+
+    @staticmethod
+    def is_cacheable(prop_path):
+        if not prop_path.startswith('config.'):
+            return False
+        for excluded in VM_CACHE_EXCLUDED_PROPERTIES:
+            if prop_path == excluded or prop_path.startswith(excluded + '.'):
+                return False
+        return True
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as fd:
+                self.data = json.load(fd)
+        except (IOError, OSError, ValueError):
+            self.data = {}
+        return self.data
+
+    def save(self):
+        cache_dir = os.path.dirname(self.cache_file)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, mode=0o700)
+        tmp_file = "{}.{}".format(self.cache_file, os.getpid())
+        with open(tmp_file, 'w') as fd:
+            json.dump(self.data, fd)
+        os.rename(tmp_file, self.cache_file)
+
+
+class VmPropertiesInfo(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.session = VsphereSession(module)
+        self.api_calls = 0
+
+        cache_key = "{}:{}:{}/{}".format(self.params['hostname'], self.params['datacenter'],
+                                         self.params['folder'] or '', self.params['name'])
+        self.cache = VmPropertiesCache(self.params['cache_dir'], cache_key)
+
+    def get_inventory_path(self):
+        datacenter = self.params['datacenter']
+        folder = (self.params['folder'] or '').strip('/')
+        if folder != datacenter and not folder.startswith(datacenter + '/'):
+            folder = '/'.join([p for p in [datacenter, 'vm', folder] if p])
+        return "{}/{}".format(folder, self.params['name'])
+
+    def find_vm(self, content):
+        inventory_path = self.get_inventory_path()
+        self.api_calls += 1
+        vm = content.searchIndex.FindByInventoryPath(inventory_path)
+        if not isinstance(vm, vim.VirtualMachine):
+            self.module.fail_json(msg="Unable to find VM '{}' with inventory path '{}'".format(
+                self.params['name'], inventory_path))
+        return vm
+
+    def retrieve_properties(self, content, vm, prop_paths):
+        """
+        Retrieve property paths of VM in one call, unset properties are None
+        """
+        prop_spec = vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine,
+                                                               all=False,
+                                                               pathSet=prop_paths)
+        obj_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=vm, skip=False)
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[obj_spec],
+                                                               propSet=[prop_spec])
+        self.api_calls += 1
+        result = content.propertyCollector.RetrievePropertiesEx([filter_spec],
+                                                                vmodl.query.PropertyCollector.RetrieveOptions())
+        values = dict([(prop_path, None) for prop_path in prop_paths])
+        if result and result.objects:
+            for prop in result.objects[0].propSet:
+                values[prop.name] = json.loads(json.dumps(prop.val,
+                                                          cls=VmomiJSONEncoder,
+                                                          sort_keys=True,
+                                                          strip_dynamic=True))
+        return values
+
+    def get_stamp(self, values):
+        return [values.get(prop_path) for prop_path in VM_CACHE_STAMP_PROPERTIES]
+
+    def get_properties(self, content):
+        prop_paths = list(dict.fromkeys(self.params['properties']))
+        use_cache = self.params['cache']
+        cached = self.cache.load() if use_cache else {}
+
+        vm = None
+        if cached.get('moid'):
+            vm = vim.VirtualMachine(cached['moid'], content.propertyCollector._stub)
+        cached_values = dict([(p, v) for p, v in cached.get('properties', {}).items()
+                              if self.cache.is_cacheable(p)])
+
+        # Retrieve properties not cached together with cache stamp properties
+        fetch_paths = [p for p in prop_paths if p not in cached_values] + VM_CACHE_STAMP_PROPERTIES
+        try:
+            if vm is None:
+                raise vmodl.fault.ManagedObjectNotFound()
+            values = self.retrieve_properties(content, vm, fetch_paths)
+        except vmodl.fault.ManagedObjectNotFound:
+            # VM is not cached, or has been removed and redeployed with the same name
+            vm = self.find_vm(content)
+            cached_values = {}
+            fetch_paths = prop_paths + VM_CACHE_STAMP_PROPERTIES
+            values = self.retrieve_properties(content, vm, fetch_paths)
+
+        stamp = self.get_stamp(values)
+        if cached_values and cached.get('stamp') != stamp:
+            # VM has been changed, retrieve cached properties again
+            values.update(self.retrieve_properties(content, vm, [p for p in prop_paths if p in cached_values]))
+            cached_values = {}
+
+        cached_properties = []
+        properties = {}
+        for prop_path in prop_paths:
+            if prop_path in values:
+                properties[prop_path] = values[prop_path]
+            else:
+                properties[prop_path] = cached_values[prop_path]
+                cached_properties.append(prop_path)
+
+        if use_cache:
+            for prop_path, value in properties.items():
+                if self.cache.is_cacheable(prop_path):
+                    cached_values[prop_path] = value
+            self.cache.data = {'moid': vm._moId,
+                               'stamp': stamp,
+                               'properties': cached_values,
+                               'updated_at': time.time()}
+            try:
+                self.cache.save()
+            except (IOError, OSError) as e:
+                self.module.warn("Failed to cache VM properties in {}: {}".format(self.cache.cache_file, to_native(e)))
+
+        return vm._moId, properties, cached_properties
+
+    @staticmethod
+    def to_instance(properties):
+        """
+        Convert property paths and values to nested dict
+        """
+        instance = {}
+        for prop_path, value in properties.items():
+            keys = prop_path.split('.')
+            node = instance
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            if isinstance(node.get(keys[-1]), dict) and isinstance(value, dict):
+                node[keys[-1]].update(value)
+            else:
+                node[keys[-1]] = value
+        return instance
+
+    def run(self):
+        try:
+            moid, properties, cached_properties = self.session.invoke(self.get_properties)
+        except vmodl.query.InvalidProperty as e:
+            self.module.fail_json(msg="Invalid VM property in {}: {}".format(self.params['properties'], to_native(e.msg)))
+        except vmodl.MethodFault as e:
+            self.module.fail_json(msg="Failed to get VM properties: {}".format(to_native(e.msg)))
+
+        self.module.exit_json(changed=False,
+                              instance=self.to_instance(properties),
+                              moid=moid,
+                              cached_properties=cached_properties,
+                              api_calls=self.api_calls)
+
+
+def main():
+    argument_spec = vsphere_session_argument_spec()
+    argument_spec.update(
+        datacenter=dict(type='str', required=True),
+        folder=dict(type='str'),
+        name=dict(type='str', required=True),
+        properties=dict(type='list', elements='str', default=['config']),
+        cache=dict(type='bool', default=True),
+        cache_dir=dict(type='path'),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+    VmPropertiesInfo(module).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/python
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: vsphere_vm_wait
+short_description: Wait for VM properties to meet conditions
+description:
+  - Wait for specified VM properties to meet all of the conditions before timeout, through
+    the vSphere session cached by vsphere_session module.
+  - The properties are watched with a property filter and WaitForUpdatesEx, so the module
+    returns as soon as the conditions are met, and no request is sent to vCenter Server or
+    ESXi while the properties are not changed.
+  - Besides VM property paths, below properties derived from VM properties can be watched,
+    'current_snapshot_name' is the name of VM current snapshot, 'guest_ipv4_addresses' is
+    the list of guest IPv4 addresses of VM network adapters reported by VMware Tools,
+    'guest_eth0_ipv4_addresses' is the list of guest IPv4 addresses of the first VM network
+    adapter, which is 'hw_eth0' in community.vmware.vmware_guest_info module result, and
+    'disconnected_network_adapters' is the list of labels of VM network adapters which are
+    connected at power on but not connected.
+options:
+  hostname:
+    description: vCenter Server or ESXi hostname or IP address.
+    type: str
+    required: true
+  username:
+    description: Username to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  password:
+    description: Password to log in vCenter Server or ESXi.
+    type: str
+    required: true
+  port:
+    description: Port of vCenter Server or ESXi API.
+    type: int
+    default: 443
+  validate_certs:
+    description: Whether to validate SSL certificate of vCenter Server or ESXi.
+    type: bool
+    default: true
+  session_cache_dir:
+    description: Directory on the controller to cache vSphere sessions.
+    type: path
+  session_keepalive:
+    description: Cached session idle for less than this number of seconds is reused without checking.
+    type: int
+    default: 300
+  datacenter:
+    description: Datacenter name of the VM.
+    type: str
+    required: true
+  folder:
+    description: VM folder path, e.g., '/datacenter/vm/folder'.
+    type: str
+  name:
+    description: VM name.
+    type: str
+    required: true
+  properties:
+    description:
+      - List of VM property paths or derived properties to return besides the properties
+        in conditions.
+    type: list
+    elements: str
+    default: []
+  conditions:
+    description:
+      - List of conditions to wait for. Each condition has 'property' key of VM property
+        path or derived property, and one of 'equals', 'not_equals', 'contains' or 'empty'
+        keys. 'contains' checks the value is in property of list type, and 'empty' checks
+        property is empty or not.
+      - Condition with 'enabled' key set to false is ignored.
+    type: list
+    elements: dict
+    required: true
+  timeout:
+    description: Timeout in seconds to wait for the conditions.
+    type: int
+    default: 300
+'''
+
+EXAMPLES = '''
+- name: "Wait for VM power state becomes 'poweredOff'"
+  vsphere_vm_wait:
+    hostname: "{{ vsphere_host_name }}"
+    username: "{{ vsphere_host_user }}"
+    password: "{{ vsphere_host_user_password }}"
+    validate_certs: "{{ validate_certs | default(false) }}"
+    datacenter: "{{ vsphere_host_datacenter }}"
+    folder: "{{ vm_folder }}"
+    name: "{{ vm_name }}"
+    conditions:
+      - property: runtime.powerState
+        equals: poweredOff
+    timeout: 120
+  register: vm_wait_result
+'''
+
+RETURN = '''
+instance:
+  description: Values of watched properties in nested dict of property paths, and derived properties.
+  returned: always
+  type: dict
+  sample: {"runtime": {"powerState": "poweredOff"}}
+satisfied:
+  description: Whether the conditions are met before timeout.
+  returned: always
+  type: bool
+elapsed:
+  description: Seconds waited for the conditions.
+  returned: always
+  type: float
+api_calls:
+  description: Number of vSphere API calls to find VM and wait for property updates.
+  returned: always
+  type: int
+'''
+
+import json
+import time
+import ipaddress
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils._text import to_native, to_text
+from ansible.module_utils.vsphere_session import HAS_PYVMOMI, VsphereSession, vsphere_session_argument_spec
+
+if HAS_PYVMOMI:
+    from pyVmomi import vim, vmodl
+    try:
+        from pyVmomi.VmomiJSONEncoder import VmomiJSONEncoder
+    except ImportError:
+        # pyVmomi earlier than 8.0.3.0
+        from pyVmomi.VmomiSupport import VmomiJSONEncoder
+
+# Maximum seconds of one WaitForUpdatesEx call, which keeps the connection from being
+# idle for too long
+MAX_WAIT_SECONDS = 60
+
+CONDITION_OPERATORS = ['equals', 'not_equals', 'contains', 'empty']
+
+
+def get_current_snapshot_name(snapshot_info):
+    if not snapshot_info or not snapshot_info.currentSnapshot:
+        return ''
+    snapshot_trees = list(snapshot_info.rootSnapshotList or [])
+    while snapshot_trees:
+        snapshot_tree = snapshot_trees.pop()
+        if snapshot_tree.snapshot._moId == snapshot_info.currentSnapshot._moId:
+            return snapshot_tree.name
+        snapshot_trees.extend(snapshot_tree.childSnapshotList or [])
+    return ''
+
+
+def get_ipv4_addresses(ip_addresses):
+    ipv4_addresses = []
+    for ip_address in ip_addresses or []:
+        try:
+            if ipaddress.ip_address(to_text(ip_address)).version == 4:
+                ipv4_addresses.append(ip_address)
+        except ValueError:
+            pass
+    return ipv4_addresses
+
+
+def get_guest_ipv4_addresses(guest_nics):
+    ipv4_addresses = []
+    for guest_nic in guest_nics or []:
+        # Skip NICs not backed by VM network adapters, e.g., virbr0
+        if guest_nic.deviceConfigId is None or guest_nic.deviceConfigId < 0:
+            continue
+        ipv4_addresses.extend(get_ipv4_addresses(guest_nic.ipAddress))
+    return ipv4_addresses
+
+
+def get_guest_eth0_ipv4_addresses(devices, guest_nics):
+    # Guest NIC of the first VM network adapter is matched by MAC address
+    # in the same way as 'hw_eth0' in vmware_guest_info module result
+    for device in devices or []:
+        if isinstance(device, vim.vm.device.VirtualEthernetCard):
+            for guest_nic in guest_nics or []:
+                if guest_nic.macAddress == device.macAddress:
+                    return get_ipv4_addresses(guest_nic.ipAddress)
+            break
+    return []
+
+
+def get_disconnected_network_adapters(devices):
+    return [device.deviceInfo.label for device in devices or []
+            if isinstance(device, vim.vm.device.VirtualEthernetCard) and
+            device.connectable and
+            device.connectable.startConnected and
+            not device.connectable.connected]
+
+
+# Derived property to its source VM property paths and the function to get its value
+DERIVED_PROPERTIES = {
+    'current_snapshot_name': (['snapshot'], get_current_snapshot_name),
+    'guest_ipv4_addresses': (['guest.net'], get_guest_ipv4_addresses),
+    'guest_eth0_ipv4_addresses': (['config.hardware.device', 'guest.net'], get_guest_eth0_ipv4_addresses),
+    'disconnected_network_adapters': (['config.hardware.device'], get_disconnected_network_adapters),
+}
+
+
+class VmWait(object):
+    def __init__(self, module):
+        self.module = module
+        self.params = module.params
+        self.session = VsphereSession(module)
+        self.api_calls = 0
+
+        self.conditions = []
+        for condition in self.params['conditions']:
+            if not condition.get('property'):
+                module.fail_json(msg="Condition {} has no 'property' key".format(condition))
+            operators = [op for op in CONDITION_OPERATORS if op in condition]
+            if len(operators) != 1:
+                module.fail_json(msg="Condition {} must have one of {} keys".format(condition, CONDITION_OPERATORS))
+            if module.boolean(condition.get('enabled', True)):
+                self.conditions.append((condition['property'], operators[0], condition[operators[0]]))
+
+        self.properties = list(dict.fromkeys(self.params['properties'] + [c[0] for c in self.conditions]))
+        self.prop_paths = []
+        for prop in self.properties:
+            self.prop_paths.extend(DERIVED_PROPERTIES[prop][0] if prop in DERIVED_PROPERTIES else [prop])
+        self.prop_paths = list(dict.fromkeys(self.prop_paths))
+
+    def get_inventory_path(self):
+        datacenter = self.params['datacenter']
+        folder = (self.params['folder'] or '').strip('/')
+        if folder != datacenter and not folder.startswith(datacenter + '/'):
+            folder = '/'.join([p for p in [datacenter, 'vm', folder] if p])
+        return "{}/{}".format(folder, self.params['name'])
+
+    def get_values(self, raw_values):
+        values = {}
+        for prop in self.properties:
+            if prop in DERIVED_PROPERTIES:
+                prop_paths, get_value = DERIVED_PROPERTIES[prop]
+                value = get_value(*[raw_values.get(prop_path) for prop_path in prop_paths])
+            else:
+                value = raw_values.get(prop)
+            values[prop] = json.loads(json.dumps(value, cls=VmomiJSONEncoder, sort_keys=True, strip_dynamic=True))
+        return values
+
+    def check_conditions(self, values):
+        for prop, operator, expected in self.conditions:
+            value = values.get(prop)
+            if operator == 'equals' and value != expected:
+                return False
+            if operator == 'not_equals' and value == expected:
+                return False
+            if operator == 'contains' and (not isinstance(value, list) or expected not in value):
+                return False
+            if operator == 'empty' and bool(value) == self.module.boolean(expected):
+                return False
+        return True
+
+    def wait(self, content):
+        inventory_path = self.get_inventory_path()
+        self.api_calls += 1
+        vm = content.searchIndex.FindByInventoryPath(inventory_path)
+        if not isinstance(vm, vim.VirtualMachine):
+            self.module.fail_json(msg="Unable to find VM '{}' with inventory path '{}'".format(
+                self.params['name'], inventory_path))
+
+        started_at = time.time()
+        deadline = started_at + self.params['timeout']
+
+        # Use a new property collector for the filter, which is destroyed with its filters
+        self.api_calls += 1
+        collector = content.propertyCollector.CreatePropertyCollector()
+        try:
+            prop_spec = vmodl.query.PropertyCollector.PropertySpec(type=vim.VirtualMachine,
+                                                                   all=False,
+                                                                   pathSet=self.prop_paths)
+            obj_spec = vmodl.query.PropertyCollector.ObjectSpec(obj=vm, skip=False)
+            filter_spec = vmodl.query.PropertyCollector.FilterSpec(objectSet=[obj_spec],
+                                                                   propSet=[prop_spec])
+            self.api_calls += 1
+            collector.CreateFilter(filter_spec, partialUpdates=False)
+
+            raw_values = {}
+            values = {}
+            version = ''
+            satisfied = False
+            while True:
+                # The first call returns current values immediately
+                max_wait = max(0, min(MAX_WAIT_SECONDS, int(deadline - time.time() + 0.999)))
+                self.api_calls += 1
+                update_set = collector.WaitForUpdatesEx(version, vmodl.query.PropertyCollector.WaitOptions(
+                    maxWaitSeconds=max_wait))
+                if update_set is not None:
+                    version = update_set.version
+                    for filter_update in update_set.filterSet or []:
+                        for object_update in filter_update.objectSet or []:
+                            if object_update.kind == 'leave':
+                                self.module.fail_json(msg="VM '{}' has been removed".format(self.params['name']))
+                            for change in object_update.changeSet or []:
+                                if change.op in ['remove', 'indirectRemove']:
+                                    raw_values[change.name] = None
+                                else:
+                                    raw_values[change.name] = change.val
+                    if update_set.truncated:
+                        continue
+                    values = self.get_values(raw_values)
+                    satisfied = self.check_conditions(values)
+                if satisfied or time.time() >= deadline:
+                    break
+        finally:
+            try:
+                collector.DestroyPropertyCollector()
+            except vmodl.MethodFault:
+                pass
+
+        return values, satisfied, time.time() - started_at
+
+    @staticmethod
+    def to_instance(values):
+        instance = {}
+        for prop, value in values.items():
+            if prop in DERIVED_PROPERTIES:
+                instance[prop] = value
+                continue
+            keys = prop.split('.')
+            node = instance
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[keys[-1]] = value
+        return instance
+
+    def run(self):
+        try:
+            values, satisfied, elapsed = self.session.invoke(self.wait)
+        except vmodl.query.InvalidProperty as e:
+            self.module.fail_json(msg="Invalid VM property in {}: {}".format(self.prop_paths, to_native(e.msg)))
+        except vmodl.MethodFault as e:
+            self.module.fail_json(msg="Failed to wait for VM properties: {}".format(to_native(e.msg)))
+
+        result = dict(changed=False,
+                      instance=self.to_instance(values),
+                      satisfied=satisfied,
+                      elapsed=round(elapsed, 3),
+                      api_calls=self.api_calls)
+        if not satisfied:
+            result['msg'] = "Timed out to wait for VM properties {} meeting conditions in {} seconds".format(
+                values, self.params['timeout'])
+            self.module.fail_json(**result)
+        self.module.exit_json(**result)
+
+
+def main():
+    argument_spec = vsphere_session_argument_spec()
+    argument_spec.update(
+        datacenter=dict(type='str', required=True),
+        folder=dict(type='str'),
+        name=dict(type='str', required=True),
+        properties=dict(type='list', elements='str', default=[]),
+        conditions=dict(type='list', elements='dict', required=True),
+        timeout=dict(type='int', default=300),
+    )
+    module = AnsibleModule(argument_spec=argument_spec, supports_check_mode=True)
+    VmWait(module).run()
+
+
+if __name__ == '__main__':
+    main()
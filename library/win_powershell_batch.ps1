@@ -0,0 +1,137 @@
+#!powershell
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+
+#AnsibleRequires -CSharpUtil Ansible.Basic
+
+$spec = @{
+    options = @{
+        commands = @{
+            type = "list"
+            elements = "dict"
+            required = $true
+            options = @{
+                name = @{ type = "str"; required = $true }
+                cmd = @{ type = "str"; required = $true }
+            }
+        }
+    }
+    supports_check_mode = $false
+}
+
+$module = [Ansible.Basic.AnsibleModule]::Create($args, $spec)
+
+# Convert output records of a command to stdout and stderr text. Output objects are
+# formatted together like in console, and host messages written by Write-Host are
+# kept in their order with output objects.
+Function Convert-OutputRecord {
+    param([Object[]]$Records)
+
+    $stdout = New-Object -TypeName System.Text.StringBuilder
+    $stderr = New-Object -TypeName System.Text.StringBuilder
+    $objects = New-Object -TypeName System.Collections.Generic.List[Object]
+
+    $flushObjects = {
+        if ($objects.Count -gt 0) {
+            $null = $stdout.Append(($objects | Out-String -Width 4096))
+            $objects.Clear()
+        }
+    }
+
+    foreach ($record in $Records) {
+        if ($record -is [System.Management.Automation.ErrorRecord]) {
+            $null = $stderr.AppendLine($record.ToString())
+        }
+        elseif ($record -is [System.Management.Automation.InformationRecord]) {
+            . $flushObjects
+            $message = $record.MessageData
+            if ($message -is [System.Management.Automation.HostInformationMessage]) {
+                $null = $stdout.Append($message.Message)
+                if (-not $message.NoNewLine) {
+                    $null = $stdout.AppendLine()
+                }
+            }
+            else {
+                $null = $stdout.AppendLine([String]$message)
+            }
+        }
+        else {
+            $objects.Add($record)
+        }
+    }
+    . $flushObjects
+
+    return $stdout.ToString(), $stderr.ToString()
+}
+
+# Split text to lines in the same way of stdout_lines in win_shell module result
+Function ConvertTo-Line {
+    param([String]$Text)
+
+    $lines = @($Text -split "\r?\n")
+    if ($lines[-1] -eq "") {
+        $lines = if ($lines.Count -gt 1) { $lines[0..($lines.Count - 2)] } else { @() }
+    }
+    return , [String[]]$lines
+}
+
+$batchStopwatch = [System.Diagnostics.Stopwatch]::StartNew()
+$cmdOutputs = New-Object -TypeName System.Collections.Generic.List[Object]
+foreach ($command in $module.Params.commands) {
+    $stopwatch = [System.Diagnostics.Stopwatch]::StartNew()
+    $global:LASTEXITCODE = 0
+    $records = @()
+    $terminatingError = $null
+    try {
+        $scriptBlock = [ScriptBlock]::Create($command.cmd)
+        # Commands run in child scopes of the same runspace, so their variables don't conflict.
+        # Non-terminating errors don't stop the command like in powershell.exe.
+        $ErrorActionPreference = "Continue"
+        $records = @(& $scriptBlock 2>&1 6>&1)
+    }
+    catch {
+        $terminatingError = $_
+    }
+    finally {
+        $ErrorActionPreference = "Stop"
+    }
+    $stopwatch.Stop()
+
+    $stdout, $stderr = Convert-OutputRecord -Records $records
+    if ($null -ne $terminatingError) {
+        $stderr += $terminatingError.ToString() + [System.Environment]::NewLine
+    }
+
+    # Same as powershell.exe exit code of the command in win_shell module
+    if ($null -ne $terminatingError) {
+        $rc = 1
+    }
+    elseif ($LASTEXITCODE -ne 0) {
+        $rc = $LASTEXITCODE
+    }
+    elseif ($stderr) {
+        $rc = 1
+    }
+    else {
+        $rc = 0
+    }
+
+    $cmdOutputs.Add(@{
+        name = $command.name
+        cmd = $command.cmd
+        stdout = $stdout
+        stdout_lines = ConvertTo-Line -Text $stdout
+        stderr = $stderr
+        stderr_lines = ConvertTo-Line -Text $stderr
+        rc = $rc
+        failed = ($rc -ne 0)
+        duration = [Math]::Round($stopwatch.Elapsed.TotalSeconds, 3)
+    })
+}
+$batchStopwatch.Stop()
+
+$module.Result.changed = $true
+$module.Result.cmd_outputs = $cmdOutputs
+$module.Result.duration = [Math]::Round($batchStopwatch.Elapsed.TotalSeconds, 3)
+$module.Result.failed_cmds = @($cmdOutputs | Where-Object { $_.rc -ne 0 } | ForEach-Object { $_.name })
+$module.ExitJson()
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+# This is the documentation of win_powershell_batch module, which is implemented in
+# win_powershell_batch.ps1 and runs in Windows guest OS.
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+module: win_powershell_batch
+short_description: Run several powershell commands in one module execution in Windows guest OS
+description:
+  - Run named powershell commands one by one in the same powershell session in Windows
+    guest OS, so only one WinRM shell is created for all of them instead of one for
+    each command with ansible.windows.win_shell module.
+  - Each command runs in its own script block scope. Its output objects are formatted
+    to text as in console, and messages written by Write-Host are in its stdout.
+  - The exit code of each command is the exit code of the last native command in it,
+    or 1 when it throws a terminating error or writes any error record.
+  - A failed command doesn't stop the following commands, and the module doesn't fail
+    for failed commands, whose names are returned in C(failed_cmds).
+options:
+  commands:
+    description: The list of named powershell commands to run in order.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      name:
+        description: The name of powershell command, which is used to get its result.
+        type: str
+        required: true
+      cmd:
+        description: The powershell command.
+        type: str
+        required: true
+'''
+
+EXAMPLES = '''
+- name: "Get memory size and disk number in guest OS"
+  win_powershell_batch:
+    commands:
+      - name: mem_size
+        cmd: "[int]((Get-WmiObject win32_OperatingSystem | % {$_.TotalVisibleMemorySize}) / 1MB)"
+      - name: disk_num
+        cmd: "(Get-Disk | measure).Count"
+  register: win_powershell_batch_result
+  delegate_to: "{{ vm_guest_ip }}"
+'''
+
+RETURN = '''
+cmd_outputs:
+  description:
+    - The results of powershell commands in the same order of C(commands).
+    - Besides C(name) and C(cmd), each result has C(stdout), C(stdout_lines), C(stderr), C(stderr_lines),
+      C(rc) and C(failed) as in the result of ansible.windows.win_shell module, and C(duration) in seconds.
+  returned: always
+  type: list
+  elements: dict
+  sample: [{"name": "mem_size", "cmd": "[int]((Get-WmiObject win32_OperatingSystem | % {$_.TotalVisibleMemorySize}) / 1MB)",
+            "stdout": "4\\r\\n", "stdout_lines": ["4"], "stderr": "", "stderr_lines": [],
+            "rc": 0, "failed": false, "duration": 0.412},
+           {"name": "disk_num", "cmd": "(Get-Disk | measure).Count",
+            "stdout": "1\\r\\n", "stdout_lines": ["1"], "stderr": "", "stderr_lines": [],
+            "rc": 0, "failed": false, "duration": 0.205}]
+duration:
+  description: Seconds to run all powershell commands.
+  returned: always
+  type: float
+  sample: 0.617
+failed_cmds:
+  description: The names of powershell commands with non-zero exit code.
+  returned: always
+  type: list
+  elements: str
+  sample: []
+'''
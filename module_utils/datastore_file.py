@@ -0,0 +1,109 @@
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+
+from ansible.module_utils.basic import env_fallback
+from ansible.module_utils._text import to_text
+from ansible.module_utils.six.moves.urllib.error import HTTPError
+from ansible.module_utils.six.moves.urllib.parse import quote, urlencode
+from ansible.module_utils.urls import Request
+
+# Suffix of the file alongside a datastore file, which has its size and checksums
+CHECKSUM_FILE_SUFFIX = '.checksum'
+
+
+def datastore_file_argument_spec():
+    """
+    Return argument spec of modules accessing datastore files through HTTP,
+    which is compatible with community.vmware modules connection parameters
+    """
+    return dict(
+        hostname=dict(type='str', required=True, fallback=(env_fallback, ['VMWARE_HOST'])),
+        username=dict(type='str', required=True, fallback=(env_fallback, ['VMWARE_USER'])),
+        password=dict(type='str', required=True, no_log=True, fallback=(env_fallback, ['VMWARE_PASSWORD'])),
+        port=dict(type='int', default=443, fallback=(env_fallback, ['VMWARE_PORT'])),
+        validate_certs=dict(type='bool', default=True, fallback=(env_fallback, ['VMWARE_VALIDATE_CERTS'])),
+        datacenter=dict(type='str', required=True),
+        datastore=dict(type='str', required=True),
+    )
+
+
+class DatastoreFile(object):
+    """
+    Datastore file accessed through HTTP GET and PUT of '/folder' URL, together with
+    its checksum file which has the file size and checksums
+    """
+    def __init__(self, module, path, timeout=300):
+        self.module = module
+        self.params = module.params
+        self.request = Request(url_username=self.params['username'],
+                               url_password=self.params['password'],
+                               force_basic_auth=True,
+                               validate_certs=self.params['validate_certs'],
+                               timeout=timeout)
+        self.url = self.get_url(path)
+        self.checksum_url = self.get_url(path.rstrip('/') + CHECKSUM_FILE_SUFFIX)
+
+    def get_url(self, path):
+        host = self.params['hostname']
+        if self.params['port'] != 443:
+            host = "{}:{}".format(host, self.params['port'])
+        return "https://{}/folder/{}?{}".format(host,
+                                                quote(path.strip('/')),
+                                                urlencode({'dcPath': self.params['datacenter'],
+                                                           'dsName': self.params['datastore']}))
+
+    def get_stat(self):
+        """
+        Return size and Last-Modified header of datastore file, or None and empty string
+        when it doesn't exist
+        """
+        try:
+            response = self.request.open('GET', self.url, headers={'Range': 'bytes=0-0'})
+        except HTTPError as e:
+            if e.code == 404:
+                return None, ''
+            raise
+        try:
+            last_modified = response.headers.get('Last-Modified') or ''
+            content_range = response.headers.get('Content-Range') or ''
+            if response.getcode() == 206 and '/' in content_range:
+                return int(content_range.rsplit('/', 1)[1]), last_modified
+            return int(response.headers.get('Content-Length')), last_modified
+        finally:
+            response.close()
+
+    def get_size(self):
+        """
+        Return size of datastore file, or None when it doesn't exist
+        """
+        return self.get_stat()[0]
+
+    def get_checksums(self):
+        """
+        Return size and checksums in checksum file of datastore file
+        """
+        try:
+            response = self.request.open('GET', self.checksum_url)
+            remote = json.loads(to_text(response.read()))
+            return remote.get('size'), remote.get('checksums', {})
+        except HTTPError as e:
+            if e.code == 404:
+                return None, {}
+            raise
+        except ValueError:
+            return None, {}
+
+    def get(self, url):
+        """
+        Return HTTP response of datastore file to read its content in chunks
+        """
+        return self.request.open('GET', url)
+
+    def put(self, url, data, size):
+        self.request.open('PUT', url, data=data,
+                          headers={'Content-Type': 'application/octet-stream',
+                                   'Content-Length': str(size)})
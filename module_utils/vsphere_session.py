@@ -0,0 +1,208 @@
+# Copyright 2021-2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import ssl
+import json
+import time
+import hashlib
+import traceback
+
+PYVMOMI_IMP_ERR = None
+try:
+    from pyVim.connect import SmartConnect
+    from pyVmomi import vim, vmodl, SoapStubAdapter
+    HAS_PYVMOMI = True
+except ImportError:
+    PYVMOMI_IMP_ERR = traceback.format_exc()
+    HAS_PYVMOMI = False
+
+from ansible.module_utils.basic import env_fallback, missing_required_lib
+from ansible.module_utils._text import to_bytes, to_native
+
+# Sessions idle for less than this number of seconds are reused without checking
+# they are still authenticated. vCenter Server and ESXi expire idle sessions in
+# 30 minutes by default.
+SESSION_KEEPALIVE_INTERVAL = 300
+
+
+def vsphere_session_argument_spec():
+    """
+    Return argument spec of modules connecting to vSphere through the session cache,
+    which is compatible with community.vmware modules connection parameters
+    """
+    return dict(
+        hostname=dict(type='str', required=True, fallback=(env_fallback, ['VMWARE_HOST'])),
+        username=dict(type='str', required=True, aliases=['user', 'admin'],
+                      fallback=(env_fallback, ['VMWARE_USER'])),
+        password=dict(type='str', required=True, aliases=['pass', 'pwd'], no_log=True,
+                      fallback=(env_fallback, ['VMWARE_PASSWORD'])),
+        port=dict(type='int', default=443, fallback=(env_fallback, ['VMWARE_PORT'])),
+        validate_certs=dict(type='bool', default=True, fallback=(env_fallback, ['VMWARE_VALIDATE_CERTS'])),
+        session_cache_dir=dict(type='path', fallback=(env_fallback, ['GOSV_VSPHERE_SESSION_CACHE_DIR'])),
+        session_keepalive=dict(type='int', default=SESSION_KEEPALIVE_INTERVAL),
+    )
+
+
+class VsphereSession(object):
+    """
+    Authenticated vSphere API session shared by modules across tasks.
+    The session ID and API version of the last login are cached in a file on the
+    controller, keyed by vSphere hostname, port and username. A module connects with
+    the cached session instead of a new login, and logs in again only when the cached
+    session has expired or been terminated.
+    """
+    def __init__(self, module):
+        self.module = module
+        if not HAS_PYVMOMI:
+            module.fail_json(msg=missing_required_lib('pyVmomi'), exception=PYVMOMI_IMP_ERR)
+
+        self.hostname = module.params['hostname']
+        self.username = module.params['username']
+        self.password = module.params['password']
+        self.port = module.params['port']
+        self.validate_certs = module.params['validate_certs']
+        self.keepalive = module.params['session_keepalive']
+
+        cache_dir = module.params['session_cache_dir']
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.ansible', 'tmp', 'gosv_vsphere_sessions')
+        cache_key = hashlib.sha1(to_bytes("{}:{}:{}".format(self.hostname, self.port, self.username))).hexdigest()
+        self.cache_file = os.path.join(cache_dir, cache_key + '.json')
+
+        self.si = None
+        self.content = None
+        self.reused = False
+        self.logins = 0
+
+    def _get_ssl_context(self):
+        if self.validate_certs:
+            return ssl.create_default_context()
+        return ssl._create_unverified_context()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r') as fd:
+                return json.load(fd)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _save_cache(self):
+        cache_dir = os.path.dirname(self.cache_file)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, mode=0o700)
+
+        # Write session ID readable only by current user and replace cache file atomically
+        tmp_file = "{}.{}".format(self.cache_file, os.getpid())
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'session_id': self.si._stub.GetSessionId(),
+                       'version': self.si._stub.version,
+                       'last_used': time.time()}, f)
+        os.rename(tmp_file, self.cache_file)
+
+    def _remove_cache(self):
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+    def _connect_cached(self, cache):
+        # Connect with the API version of cached session, which saves querying
+        # supported versions and retrieving service content twice
+        stub = SoapStubAdapter(host=self.hostname,
+                               port=self.port,
+                               version=cache['version'],
+                               sslContext=self._get_ssl_context(),
+                               sessionId=cache['session_id'])
+        si = vim.ServiceInstance('ServiceInstance', stub)
+        content = si.RetrieveContent()
+
+        # Check session is still authenticated when it has been idle for a while,
+        # which also keeps it alive
+        if time.time() - cache.get('last_used', 0) >= self.keepalive:
+            if content.sessionManager.currentSession is None:
+                return False
+
+        self.si = si
+        self.content = content
+        return True
+
+    def login(self):
+        """
+        Login to vSphere and cache the new session
+        """
+        try:
+            self.si = SmartConnect(host=self.hostname,
+                                   user=self.username,
+                                   pwd=self.password,
+                                   port=self.port,
+                                   sslContext=self._get_ssl_context())
+        except vim.fault.InvalidLogin as e:
+            self.module.fail_json(msg="Unable to log on to vCenter or ESXi API at {}:{} as {}: {}".format(
+                self.hostname, self.port, self.username, to_native(e.msg)))
+        except Exception as e:
+            self.module.fail_json(msg="Unable to connect to vCenter or ESXi API at {}:{}: {}".format(
+                self.hostname, self.port, to_native(e)))
+
+        self.content = self.si.RetrieveContent()
+        self.reused = False
+        self.logins += 1
+        try:
+            self._save_cache()
+        except (IOError, OSError) as e:
+            self.module.warn("Failed to cache vSphere session in {}: {}".format(self.cache_file, to_native(e)))
+        return self.content
+
+    def connect(self):
+        """
+        Return service content of vSphere with the cached session, or with a new
+        session when there is no valid cached session
+        """
+        if self.content is not None:
+            return self.content
+
+        cache = self._load_cache()
+        if cache:
+            try:
+                if self._connect_cached(cache):
+                    self.reused = True
+                    self._save_cache()
+                    return self.content
+            except vim.fault.NotAuthenticated:
+                pass
+            except (IOError, OSError):
+                pass
+
+        return self.login()
+
+    def invoke(self, func, *args, **kwargs):
+        """
+        Call func with service content as the first argument. When the session is
+        found not authenticated, login again and retry once.
+        """
+        content = self.connect()
+        try:
+            return func(content, *args, **kwargs)
+        except vim.fault.NotAuthenticated:
+            if not self.reused:
+                raise
+            return func(self.login(), *args, **kwargs)
+
+    def logout(self):
+        """
+        Logout the cached session and remove it from cache
+        """
+        cache = self._load_cache()
+        logged_out = False
+        if cache:
+            try:
+                if self._connect_cached(dict(cache, last_used=0)):
+                    self.content.sessionManager.Logout()
+                    logged_out = True
+            except (vim.fault.NotAuthenticated, vmodl.MethodFault, IOError, OSError):
+                pass
+            self._remove_cache()
+        self.si = None
+        self.content = None
+        return logged_out
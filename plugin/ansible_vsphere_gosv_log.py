@@ -9,6 +9,81 @@ DOCUMENTATION = '''
     short_description: Write Ansible output and test results to log files
     description:
       - This callback writes detail running log and test results to log file.
+    options:
+      log_queue_size:
+        description:
+          - Maximum number of log messages buffered in memory before they are written to log files.
+          - Set it to 0 for no limit.
+          - When the buffer is full, logging blocks until the background writer catches up.
+        type: int
+        default: 10000
+        env:
+          - name: GOSV_LOG_QUEUE_SIZE
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: log_queue_size
+      log_flush_interval:
+        description: Interval in seconds to flush buffered log messages to log files.
+        type: float
+        default: 1.0
+        env:
+          - name: GOSV_LOG_FLUSH_INTERVAL
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: log_flush_interval
+      result_max_size:
+        description:
+          - Maximum size in bytes of a task result written into full_debug.log.
+          - The largest fields of an oversized task result are saved in files under
+            'large_results' folder of log directory, and referenced by their paths and
+            SHA1 digests in full_debug.log. Files of identical contents are saved only once.
+          - Set it to 0 to write whole task results into full_debug.log.
+        type: int
+        default: 65536
+        env:
+          - name: GOSV_LOG_RESULT_MAX_SIZE
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: result_max_size
+      profile_top_n:
+        description:
+          - Number of the most time consuming tasks, included task files and test cases
+            listed in task profile at the end of full_debug.log.
+          - The whole task profile is written into 'task_profile.folded' file in log directory,
+            which is in collapsed stack format of flame graph tools.
+        type: int
+        default: 20
+        env:
+          - name: GOSV_LOG_PROFILE_TOP_N
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: profile_top_n
+      log_compression:
+        description:
+          - Compression of full_debug.log. When it is 'gzip', full_debug.log is written as
+            'full_debug.log.gz' in independent gzip frames, and an index file
+            'full_debug.log.index.json' is written at the end of test run, which maps each
+            play, test case and failed task to its frames and uncompressed offsets.
+        type: str
+        default: none
+        choices: ['none', 'gzip']
+        env:
+          - name: GOSV_LOG_COMPRESSION
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: log_compression
+      testcase_history_file:
+        description:
+          - File to record durations and status of test cases in test runs of each VM, which are
+            used to estimate the remaining time of test run when each test case starts, and to
+            schedule test cases in parallel testing.
+          - If not set, it is '~/.ansible/tmp/gosv_testcase_history.json'.
+        type: path
+        env:
+          - name: GOSV_TESTCASE_HISTORY_FILE
+        ini:
+          - section: callback_ansible_vsphere_gosv_log
+            key: testcase_history_file
 '''
 
 import os
@@ -20,8 +95,12 @@ import re
 import importlib
 import shutil
 import logging
+import hashlib
+import zlib
+import atexit
+import threading
 from datetime import datetime
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from textwrap import TextWrapper
 
 from ansible import context
@@ -29,6 +108,7 @@ from ansible import constants as C
 from ansible.playbook.task_include import TaskInclude
 from ansible.plugins.callback import CallbackBase
 from ansible.module_utils._text import to_bytes, to_native, to_text
+from ansible.vars.clean import module_response_deepcopy, strip_internal_keys
 
 if sys.version_info.major == 2:
     reload(sys)
@@ -36,10 +116,38 @@ if sys.version_info.major == 2:
 else:
     importlib.reload(sys)
 
+# Maximum characters of each stdout or stderr output kept in extracted error message
+ERROR_OUTPUT_MAX_SIZE = 8192
+
+
+"""_summary_
+Truncate text in the middle when it is longer than max_size characters
+"""
+def truncate_text(text, max_size=ERROR_OUTPUT_MAX_SIZE):
+    if not max_size or len(text) <= max_size:
+        return text
+
+    head_size = max_size // 2
+    tail_size = max_size - head_size
+    return "{}\n... [truncated {} characters] ...\n{}".format(text[:head_size],
+                                                               len(text) - max_size,
+                                                               text[-tail_size:])
+
+
+"""_summary_
+Join output lines without the first empty line and truncate it to max_size characters
+"""
+def join_output_lines(lines, max_size=ERROR_OUTPUT_MAX_SIZE):
+    if "" in lines:
+        lines = list(lines)
+        lines.remove("")
+    return truncate_text('\n'.join(lines).strip(), max_size)
+
+
 """_summary_
 Extract error message from task result
 """
-def extract_error_msg(json_obj):
+def extract_error_msg(json_obj, max_size=ERROR_OUTPUT_MAX_SIZE):
     message = ''
     try:
         for key, value in json_obj.items():
@@ -51,23 +159,19 @@ def extract_error_msg(json_obj):
                         if 'rc' in json_obj and str(json_obj['rc']) != '':
                             message += ': ' + str(json_obj['rc'])
                         if 'stderr_lines' in json_obj and len(json_obj['stderr_lines']) > 0:
-                            if "" in json_obj['stderr_lines']:
-                                json_obj['stderr_lines'].remove("")
-                            message += '\n' + '\n'.join(json_obj['stderr_lines']).strip()
+                            message += '\n' + join_output_lines(json_obj['stderr_lines'], max_size)
                         elif 'stdout_lines' in json_obj and len(json_obj['stdout_lines']) > 0:
-                            if "" in json_obj['stderr_lines']:
-                                json_obj['stdout_lines'].remove("")
-                            message += '\n' + '\n'.join(json_obj['stdout_lines']).strip()
+                            message += '\n' + join_output_lines(json_obj['stdout_lines'], max_size)
                     if 'MODULE FAILURE' in value:
                        if 'module_stderr' in json_obj and str(json_obj['module_stderr']) != '':
-                             message += '\n' + json_obj['module_stderr'].strip()
+                             message += '\n' + truncate_text(json_obj['module_stderr'].strip(), max_size)
                        elif 'module_stdout' in json_obj and str(json_obj['module_stdout']) != '':
-                             message += '\n' + json_obj['module_stdout'].strip()
+                             message += '\n' + truncate_text(json_obj['module_stdout'].strip(), max_size)
 
                 elif isinstance(value, list):
                     message += '\n'.join(value)
                 elif isinstance(value, dict):
-                    message += extract_error_msg(value)
+                    message += extract_error_msg(value, max_size)
                 else:
                     message += str(value).strip()
 
@@ -80,6 +184,20 @@ def extract_error_msg(json_obj):
 
     return message
 
+
+"""_summary_
+Estimate the serialized size of a task result value in characters
+"""
+def estimate_result_size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum([len(str(k)) + estimate_result_size(v) + 4 for k, v in value.items()]) + 2
+    if isinstance(value, (list, tuple)):
+        return sum([estimate_result_size(v) + 2 for v in value]) + 2
+    return 8
+
+
 class VmInfo(object):
     def __init__(self, vm_name):
         self.Name = vm_name
@@ -94,6 +212,7 @@ class VmInfo(object):
         self.GuestInfo_Guest_Full_Name = ''
         self.GuestInfo_Guest_Family = ''
         self.GuestInfo_Detailed_Data = ''
+        self.Unattend_ISO_Build = None
 
     def __str__(self):
         """
@@ -191,6 +310,561 @@ class VmInfo(object):
 
         return msg
 
+SET_FACT_ACTION = "ansible.builtin.set_fact"
+DEBUG_ACTION = "ansible.builtin.debug"
+
+# Rules of harvesting testbed and VM information from the variables set by set_fact tasks or
+# displayed by debug tasks with 'var' argument. Each rule is a tuple of
+# (task file or None for any task file, task action, variable name, target, field, update policy).
+# Target is 'vm_info' for VmInfo attribute, 'vcenter_info' or 'esxi_info' for testbed info key,
+# 'callback' for callback attribute, or 'handler' for callback method called with the variable
+# value, e.g., to update test case results of parallel testing.
+# Update policy is 'always' to always update the field, 'if_empty' to update the field when it
+# is empty, 'if_value' to update the field when the variable value is not empty, or
+# 'if_empty_value' to update the empty field when the variable value is not empty.
+FACT_HARVEST_RULES = [
+    ('get_windows_system_info.yml', SET_FACT_ACTION, 'vm_guest_os_distribution', 'vm_info', 'Guest_OS_Distribution', 'if_value'),
+    ('get_linux_system_info.yml', SET_FACT_ACTION, 'vm_guest_os_distribution', 'vm_info', 'Guest_OS_Distribution', 'if_value'),
+    ('vm_get_vm_info.yml', SET_FACT_ACTION, 'vm_guest_id', 'vm_info', 'Config_Guest_Id', 'always'),
+    ('vm_get_vm_info.yml', SET_FACT_ACTION, 'vm_hardware_version', 'vm_info', 'Hardware_Version', 'always'),
+    ('vm_upgrade_hardware_version.yml', SET_FACT_ACTION, 'vm_hardware_version', 'vm_info', 'Hardware_Version', 'always'),
+    ('vm_get_guest_info.yml', SET_FACT_ACTION, 'guestinfo_guest_id', 'vm_info', 'GuestInfo_Guest_Id', 'always'),
+    ('vm_get_guest_info.yml', SET_FACT_ACTION, 'guestinfo_guest_full_name', 'vm_info', 'GuestInfo_Guest_Full_Name', 'always'),
+    ('vm_get_guest_info.yml', SET_FACT_ACTION, 'guestinfo_guest_family', 'vm_info', 'GuestInfo_Guest_Family', 'always'),
+    ('vm_get_guest_info.yml', SET_FACT_ACTION, 'guestinfo_detailed_data', 'vm_info', 'GuestInfo_Detailed_Data', 'always'),
+    ('vm_get_guest_info.yml', SET_FACT_ACTION, 'guestinfo_vmtools_info', 'vm_info', 'VMTools_Version', 'always'),
+    ('check_guest_os_gui.yml', SET_FACT_ACTION, 'guest_os_with_gui', 'vm_info', 'GUI_Installed', 'if_value'),
+    ('create_unattend_install_iso.yml', DEBUG_ACTION, 'unattend_iso_build_summary', 'vm_info', 'Unattend_ISO_Build', 'if_value'),
+    (None, DEBUG_ACTION, 'testrun_log_path', 'callback', 'testrun_log_dir', 'if_empty'),
+    ('parallel_testing.yml', DEBUG_ACTION, 'parallel_testcase_results', 'handler', '_update_testcase_results', 'always'),
+    ('test_rescue.yml', DEBUG_ACTION, 'test_rescue_artifacts', 'handler', '_update_rescue_stats', 'always'),
+    ('vm_wait_async_snapshot.yml', DEBUG_ACTION, 'vm_async_snapshot_result', 'handler', '_update_snapshot_wait_stats', 'always'),
+    ('check_inbox_driver.yml', DEBUG_ACTION, 'os_release_info_file_path', 'callback', 'os_release_info_file', 'always'),
+    ('deploy_vm.yml', DEBUG_ACTION, 'vm_guest_ip', 'vm_info', 'IP', 'if_empty'),
+    ('test_setup.yml', DEBUG_ACTION, 'vm_guest_ip', 'vm_info', 'IP', 'if_empty'),
+    ('get_guest_ovt_version_build.yml', DEBUG_ACTION, 'vmtools_info_from_vmtoolsd', 'callback', 'os_ovt_version', 'if_empty_value'),
+    ('get_guest_ovt_version_build.yml', DEBUG_ACTION, 'vmtools_info_from_vmtoolsd', 'vm_info', 'VMTools_Version', 'if_value'),
+    ('win_get_vmtools_version_build.yml', DEBUG_ACTION, 'vmtools_info_from_vmtoolsd', 'vm_info', 'VMTools_Version', 'if_value'),
+    ('esxi_get_version_build.yml', DEBUG_ACTION, 'esxi_hostname', 'esxi_info', 'hostname', 'if_empty'),
+    ('esxi_get_version_build.yml', DEBUG_ACTION, 'esxi_version', 'esxi_info', 'version', 'if_empty'),
+    ('esxi_get_version_build.yml', DEBUG_ACTION, 'esxi_build', 'esxi_info', 'build', 'if_empty'),
+    ('esxi_get_version_build.yml', DEBUG_ACTION, 'esxi_update_version', 'esxi_info', 'update_version', 'if_empty'),
+    ('esxi_get_model.yml', DEBUG_ACTION, 'esxi_model_info', 'esxi_info', 'model', 'if_empty'),
+    ('esxi_get_model.yml', DEBUG_ACTION, 'esxi_cpu_model_info', 'esxi_info', 'cpu_model', 'if_empty'),
+    ('vcenter_get_version_build.yml', DEBUG_ACTION, 'vcenter_hostname', 'vcenter_info', 'hostname', 'if_empty'),
+    ('vcenter_get_version_build.yml', DEBUG_ACTION, 'vcenter_version', 'vcenter_info', 'version', 'if_empty'),
+    ('vcenter_get_version_build.yml', DEBUG_ACTION, 'vcenter_build', 'vcenter_info', 'build', 'if_empty'),
+    ('get_cloudinit_version.yml', DEBUG_ACTION, 'cloudinit_version', 'vm_info', 'CloudInit_Version', 'if_empty'),
+    ('get_cloudinit_version.yml', DEBUG_ACTION, 'cloudinit_version', 'callback', 'os_cloudinit_version', 'if_empty'),
+]
+
+
+"""_summary_
+Compile fact harvest rules into a table of {(task action, task file): {variable name: [(target, field, policy)]}}
+"""
+def compile_fact_harvest_rules(rules):
+    harvest_table = {}
+    for task_file, task_action, var_name, target, field, policy in rules:
+        var_rules = harvest_table.setdefault((task_action, task_file), {}).setdefault(var_name, [])
+        var_rules.append((target, field, policy))
+    return harvest_table
+
+
+"""_summary_
+Move all files and folders in src_dir into dst_dir and remove src_dir. Files are
+renamed without copying when src_dir and dst_dir are on the same file system, and
+existing files in dst_dir are replaced.
+"""
+def move_log_dir(src_dir, dst_dir):
+    if not os.path.exists(dst_dir):
+        shutil.move(src_dir, dst_dir)
+        return
+
+    for entry in os.listdir(src_dir):
+        src_path = os.path.join(src_dir, entry)
+        dst_path = os.path.join(dst_dir, entry)
+        if os.path.isdir(src_path) and not os.path.islink(src_path) and os.path.isdir(dst_path):
+            move_log_dir(src_path, dst_path)
+        else:
+            if os.path.isdir(dst_path) and not os.path.islink(dst_path):
+                shutil.rmtree(dst_path)
+            elif os.path.lexists(dst_path):
+                os.unlink(dst_path)
+            shutil.move(src_path, dst_path)
+    os.rmdir(src_dir)
+
+
+class TaskProfiler(object):
+    """
+    Profile time spent on tasks with monotonic clock.
+    The time of a task is from its start to the start of next task or the end of playbook,
+    and it is accounted to the task's stack of test case, included task files and task name.
+    """
+    def __init__(self):
+        # Task stack to [run count, total seconds]
+        self.stacks = {}
+        self._current_stack = None
+        self._current_started_at = None
+
+    def start(self, stack):
+        now = time.monotonic()
+        self.stop(now)
+        self._current_stack = stack
+        self._current_started_at = now
+
+    def stop(self, now=None):
+        if self._current_stack is None:
+            return
+
+        if now is None:
+            now = time.monotonic()
+        stack_stat = self.stacks.setdefault(self._current_stack, [0, 0.0])
+        stack_stat[0] += 1
+        stack_stat[1] += now - self._current_started_at
+        self._current_stack = None
+
+    def get_hotspots(self, level, top_n=None):
+        """
+        Return the most time consuming test cases, included task files or tasks as a list of
+        (name, run count, total seconds) sorted by total seconds. Time of an included task file
+        includes time of all tasks in it and in the task files it includes.
+        """
+        hotspots = {}
+        for stack, (count, seconds) in self.stacks.items():
+            if level == 'testcase':
+                names = [stack[0]]
+            elif level == 'include':
+                # Skip the play file and the task name
+                names = set(stack[2:-1])
+            else:
+                names = [" : ".join(stack[-2:])]
+
+            for name in names:
+                hotspot = hotspots.setdefault(name, [0, 0.0])
+                hotspot[0] += count
+                hotspot[1] += seconds
+
+        sorted_hotspots = sorted([(name, count, seconds) for name, (count, seconds) in hotspots.items()],
+                                 key=lambda hotspot: hotspot[2], reverse=True)
+        return sorted_hotspots[:top_n] if top_n else sorted_hotspots
+
+    def get_collapsed_stacks(self):
+        """
+        Return profile in collapsed stack format, one 'frame;frame;... milliseconds' per line
+        """
+        lines = []
+        for stack, (count, seconds) in sorted(self.stacks.items()):
+            frames = [frame.replace(';', ',') for frame in stack]
+            lines.append("{} {}\n".format(';'.join(frames), int(round(seconds * 1000))))
+        return ''.join(lines)
+
+
+class TaskRetryStats(object):
+    """
+    Account attempts and polling time of tasks retried with 'until' condition
+    """
+    def __init__(self):
+        # Task path to its retry stats
+        self.tasks = OrderedDict()
+
+    def add(self, task_path, task_name, attempts, seconds, succeeded):
+        task_stats = self.tasks.get(task_path)
+        if task_stats is None:
+            task_stats = {'task_file': os.path.basename(task_path).split(':')[0],
+                          'task_name': task_name,
+                          'runs': 0,
+                          'failed': 0,
+                          'attempts': 0,
+                          'max_attempts': 0,
+                          'poll_seconds': 0.0,
+                          'attempts_to_success': {}}
+            self.tasks[task_path] = task_stats
+
+        task_stats['runs'] += 1
+        task_stats['attempts'] += attempts
+        task_stats['max_attempts'] = max(task_stats['max_attempts'], attempts)
+        task_stats['poll_seconds'] += seconds
+        if succeeded:
+            task_stats['attempts_to_success'][attempts] = task_stats['attempts_to_success'].get(attempts, 0) + 1
+        else:
+            task_stats['failed'] += 1
+
+    def get_total_seconds(self):
+        return sum([task_stats['poll_seconds'] for task_stats in self.tasks.values()])
+
+    def get_task_file_stats(self):
+        """
+        Return retry stats aggregated by task file, e.g., vm_wait_guest_ip.yml, sorted by polling time
+        """
+        file_stats = {}
+        for task_stats in self.tasks.values():
+            stats = file_stats.setdefault(task_stats['task_file'], {'runs': 0,
+                                                                    'failed': 0,
+                                                                    'poll_seconds': 0.0,
+                                                                    'attempts_to_success': {}})
+            stats['runs'] += task_stats['runs']
+            stats['failed'] += task_stats['failed']
+            stats['poll_seconds'] += task_stats['poll_seconds']
+            for attempts, count in task_stats['attempts_to_success'].items():
+                stats['attempts_to_success'][attempts] = stats['attempts_to_success'].get(attempts, 0) + count
+
+        return sorted(file_stats.items(), key=lambda item: item[1]['poll_seconds'], reverse=True)
+
+
+class PowerShellStats(object):
+    """
+    Account time of powershell commands executed in Windows guest OS one by one with
+    win_shell or win_command module, and in batches with win_powershell_batch module
+    """
+    def __init__(self):
+        self.single_runs = 0
+        self.single_seconds = 0.0
+        # Task path to its batch stats
+        self.batches = OrderedDict()
+
+    def add_single(self, seconds):
+        self.single_runs += 1
+        self.single_seconds += seconds
+
+    def add_batch(self, task_path, task_name, cmd_outputs, seconds):
+        batch_stats = self.batches.get(task_path)
+        if batch_stats is None:
+            batch_stats = {'task_file': os.path.basename(task_path).split(':')[0],
+                           'task_name': task_name,
+                           'runs': 0,
+                           'cmds': 0,
+                           'failed_cmds': 0,
+                           'seconds': 0.0,
+                           'cmd_seconds': 0.0}
+            self.batches[task_path] = batch_stats
+
+        batch_stats['runs'] += 1
+        batch_stats['cmds'] += len(cmd_outputs)
+        batch_stats['failed_cmds'] += len([cmd for cmd in cmd_outputs if cmd.get('rc') != 0])
+        batch_stats['seconds'] += seconds
+        batch_stats['cmd_seconds'] += sum([float(cmd.get('duration', 0)) for cmd in cmd_outputs])
+
+    def get_single_average(self):
+        """
+        Return average seconds of a powershell command executed in its own task, which
+        includes the time of creating WinRM shell and transferring module
+        """
+        return self.single_seconds / self.single_runs if self.single_runs else None
+
+
+class FailureStats(object):
+    """
+    Account time of collecting VM failure state in test_rescue.yml for each test case
+    failure, and time of waiting for the failure state snapshot taken in background
+    """
+    def __init__(self):
+        self.failures = []
+
+    def add_rescue(self, artifacts):
+        self.failures.append({'testcase': artifacts.get('testcase', ''),
+                              'rescue_seconds': float(artifacts.get('seconds', 0)),
+                              'vm_log_seconds': float(artifacts.get('vm_log_seconds', 0)),
+                              'vm_log_size': int(artifacts.get('vm_log_size', 0)),
+                              'vm_log_gzip_size': int(artifacts.get('vm_log_gzip_size', 0)),
+                              'snapshot_wait_seconds': None})
+
+    def add_snapshot_wait(self, snapshot_result):
+        """
+        Add snapshot waiting time to the last failure of the test case without it
+        """
+        for failure in reversed(self.failures):
+            if failure['testcase'] == snapshot_result.get('testcase') and failure['snapshot_wait_seconds'] is None:
+                failure['snapshot_wait_seconds'] = float(snapshot_result.get('wait_seconds', 0))
+                failure['snapshot_failed'] = bool(snapshot_result.get('failed', False))
+                return
+
+    def get_total_seconds(self):
+        return sum([failure['rescue_seconds'] + (failure['snapshot_wait_seconds'] or 0)
+                    for failure in self.failures])
+
+
+class TestcaseHistory(object):
+    """
+    Durations and status of test cases in previous test runs of VMs, which are saved in a
+    JSON file keyed by VM names. The duration of a test case is the moving average of its
+    durations of Passed or Failed runs.
+    """
+    def __init__(self, history_file, vm_name):
+        self.history_file = history_file
+        self.vm_name = vm_name
+        self.testcases = self.load().get(vm_name, {})
+
+    def load(self):
+        try:
+            with open(self.history_file, 'r') as fd:
+                history = json.load(fd)
+        except (IOError, OSError, ValueError):
+            history = {}
+        return history if isinstance(history, dict) else {}
+
+    def get_duration(self, test_name):
+        record = self.testcases.get(test_name)
+        if record and record.get('duration') is not None:
+            return record['duration']
+        return None
+
+    def update(self, results):
+        """
+        Update test case history with test results in a list of (name, status, duration)
+        """
+        history = self.load()
+        testcases = history.setdefault(self.vm_name, {})
+        for test_name, status, duration in results:
+            if status not in ['Passed', 'Failed', 'Blocked']:
+                continue
+            record = testcases.setdefault(test_name, {'duration': None, 'runs': 0})
+            record['status'] = status
+            if status != 'Blocked' and duration:
+                if record['duration'] is None:
+                    record['duration'] = duration
+                else:
+                    record['duration'] = int((record['duration'] + duration) / 2)
+                record['runs'] += 1
+
+        history_dir = os.path.dirname(self.history_file)
+        if history_dir and not os.path.exists(history_dir):
+            os.makedirs(history_dir)
+        tmp_file = "{}.{}".format(self.history_file, os.getpid())
+        with open(tmp_file, 'w') as fd:
+            json.dump(history, fd, indent=2, sort_keys=True)
+        os.rename(tmp_file, self.history_file)
+        self.testcases = testcases
+
+
+class AsyncLogWriter(object):
+    """
+    Write log messages to log files in a background thread.
+    Log files are opened once and kept open until the writer is closed, messages are
+    buffered in a bounded queue and flushed to disk periodically. Data files which are
+    written only once are created and closed immediately.
+
+    Log files in compressed_files are written as '<log file>.gz' in independent gzip
+    members, i.e., frames, which can be read and decompressed separately. A new frame is
+    started by start_frame() or when the current frame exceeds frame_size bytes.
+    """
+    _STOP = object()
+
+    def __init__(self, log_dir, queue_size=10000, flush_interval=1.0, frame_size=4194304):
+        self.log_dir = log_dir
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.frame_size = frame_size
+        self.compressed_files = set()
+        # Log file to its list of frames, each frame is a list of
+        # [offset, length, uncompressed offset, uncompressed length]
+        self.frames = {}
+        self.error = None
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._not_full = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._files = {}
+        self._offsets = {}
+        self._compressors = {}
+
+    def get_file_name(self, log_file):
+        if log_file in self.compressed_files:
+            return log_file + ".gz"
+        return log_file
+
+    def _get_file(self, log_file):
+        fd = self._files.get(log_file)
+        if fd is None:
+            fd = open(os.path.join(self.log_dir, self.get_file_name(log_file)), 'ab')
+            self._files[log_file] = fd
+        return fd
+
+    def _write_compressed(self, log_file, data):
+        fd = self._get_file(log_file)
+        frames = self.frames.setdefault(log_file, [])
+        compressor = self._compressors.get(log_file)
+        if compressor is None:
+            # Start a new gzip member after the previous one
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            self._compressors[log_file] = compressor
+            if frames:
+                frames.append([frames[-1][0] + frames[-1][1], 0, frames[-1][2] + frames[-1][3], 0])
+            else:
+                frames.append([0, 0, 0, 0])
+
+        compressed_data = compressor.compress(data)
+        fd.write(compressed_data)
+        frames[-1][1] += len(compressed_data)
+        frames[-1][3] += len(data)
+        if frames[-1][3] >= self.frame_size:
+            self._end_frame(log_file)
+
+    def _end_frame(self, log_file):
+        compressor = self._compressors.pop(log_file, None)
+        if compressor is not None:
+            compressed_data = compressor.flush()
+            self._get_file(log_file).write(compressed_data)
+            self.frames[log_file][-1][1] += len(compressed_data)
+
+    def _flush_files(self):
+        for log_file, compressor in self._compressors.items():
+            # Make compressed data written so far readable
+            compressed_data = compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._files[log_file].write(compressed_data)
+            self.frames[log_file][-1][1] += len(compressed_data)
+        for fd in self._files.values():
+            fd.flush()
+
+    def _close_files(self):
+        for log_file in list(self._compressors.keys()):
+            self._end_frame(log_file)
+        for fd in self._files.values():
+            fd.close()
+        self._files.clear()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+            stop = False
+            while self._pending:
+                mode, log_file, data = self._pending.popleft()
+                try:
+                    if mode == 'append' and log_file in self.compressed_files:
+                        self._write_compressed(log_file, data)
+                    elif mode == 'append':
+                        self._get_file(log_file).write(data)
+                    elif mode == 'write':
+                        with open(os.path.join(self.log_dir, log_file), 'wb') as fd:
+                            fd.write(data)
+                    elif mode == 'frame':
+                        self._end_frame(log_file)
+                    elif mode == 'flush':
+                        # Flush requested, data is the event the caller waits on
+                        self._flush_files()
+                        data.set()
+                    elif mode == 'stop':
+                        stop = True
+                except (IOError, OSError, zlib.error) as e:
+                    self.error = e
+
+            try:
+                self._flush_files()
+            except (IOError, OSError, zlib.error) as e:
+                self.error = e
+
+            with self._not_full:
+                self._not_full.notify_all()
+
+            if stop:
+                self._close_files()
+                return
+
+    def _queue(self, mode, log_file, data):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="gosv-log-writer")
+            self._thread.daemon = True
+            self._thread.start()
+
+        # Block until background writer catches up when buffer is full
+        if self.queue_size > 0 and len(self._pending) >= self.queue_size:
+            with self._not_full:
+                self._wakeup.set()
+                while len(self._pending) >= self.queue_size and self._thread.is_alive():
+                    self._not_full.wait(self.flush_interval)
+
+        self._pending.append((mode, log_file, data))
+
+    def write(self, log_file, msg, append=True):
+        """
+        Queue message to be appended to log file, or to be written as the whole content
+        of a data file when append is False
+        """
+        data = to_bytes(msg, errors='surrogate_or_strict')
+        if append:
+            self._offsets[log_file] = self._offsets.get(log_file, 0) + len(data)
+        if self._closed:
+            # Writer has been drained, write to log file directly
+            if append and log_file in self.compressed_files:
+                self._write_compressed(log_file, data)
+                self._end_frame(log_file)
+                self._close_files()
+            else:
+                with open(os.path.join(self.log_dir, log_file), 'ab' if append else 'wb') as fd:
+                    fd.write(data)
+            return
+
+        self._queue('append' if append else 'write', log_file, data)
+
+    def start_frame(self, log_file):
+        """
+        Start a new frame of compressed log file for the following messages
+        """
+        if log_file in self.compressed_files and not self._closed:
+            self._queue('frame', log_file, None)
+
+    def tell(self, log_file):
+        """
+        Return the uncompressed size of log file after all queued messages are written
+        """
+        return self._offsets.get(log_file, 0)
+
+    def flush(self):
+        """
+        Block until all queued messages are written to log files
+        """
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._pending.append(('flush', None, done))
+        self._wakeup.set()
+        while not done.wait(self.flush_interval):
+            if not self._thread.is_alive():
+                return
+
+    def close(self):
+        """
+        Drain queued messages, close log files and stop the writer thread
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._pending.append(('stop', None, None))
+            self._wakeup.set()
+            self._thread.join()
+        self._close_files()
+
+
+class LogRouteHandler(logging.Handler):
+    """
+    Logging handler which routes formatted records to log file sinks through AsyncLogWriter.
+    A record is written to all enabled sinks, and to the sinks tagged in its 'log_sinks'
+    attribute, e.g., logger.info(msg, extra={'log_sinks': ['failed']}).
+    """
+    terminator = '\n'
+
+    def __init__(self, writer, routes):
+        super(LogRouteHandler, self).__init__()
+        self.writer = writer
+        # Routing table of sink name to log file name
+        self.routes = routes
+        self.enabled_sinks = set()
+
+    def emit(self, record):
+        try:
+            data = to_bytes(self.format(record) + self.terminator, errors='surrogate_or_strict')
+            for sink in self.enabled_sinks:
+                self.writer.write(self.routes[sink], data)
+            for sink in getattr(record, 'log_sinks', ()):
+                if sink not in self.enabled_sinks:
+                    self.writer.write(self.routes[sink], data)
+        except Exception:
+            self.handleError(record)
+
+
 class CallbackModule(CallbackBase):
     CALLBACK_NAME = 'ansible_vsphere_gosv_log'
     CALLBACK_TYPE = 'notification'
@@ -239,7 +913,28 @@ class CallbackModule(CallbackBase):
         self.known_issues_log = "known_issues.log"
         self.test_results_log = "results.log"
         self.test_results_yml = "test_results.yml"
+        self.events_log = "events.jsonl"
+        self.task_profile_file = "task_profile.folded"
+        self.log_compression = "none"
         self.os_release_info_file = None
+        self.testcase_history_file = None
+        self.testcase_history = None
+        # Test cases run by this playbook are recorded in test case history, except in
+        # worker processes of parallel testing, whose test cases are recorded by main process
+        self.record_testcase_history = True
+        # Renamed test cases, e.g., deploy_vm, to their names in test case list file
+        self._testcase_origin_names = {}
+        # Test cases with results of the resumed test run, which are not recorded in history again
+        self._resumed_testcases = set()
+        self._fact_harvest_table = compile_fact_harvest_rules(FACT_HARVEST_RULES)
+
+        # Large fields of task results are saved in files under this folder of log dir
+        self.large_results_dir = "large_results"
+        self.result_max_size = 65536
+        self._saved_result_files = {}
+        # Recently saved non-text fields and their references, which are looked up by
+        # comparing values instead of serializing identical values again
+        self._saved_result_values = deque(maxlen=32)
 
         # Plays and Tasks
         self._play_name = None
@@ -250,10 +945,35 @@ class CallbackModule(CallbackBase):
         self._last_task_uuid = None
         self._last_task_name = None
         self._task_type_cache = {}
-
-        if not os.path.exists(self.log_dir):
+        self._task_started_at = {}
+        self._task_info_cache = {}
+
+        # Task profile
+        self.profile_top_n = 20
+        self.task_profiler = TaskProfiler()
+        self.task_retry_stats = TaskRetryStats()
+        self.powershell_stats = PowerShellStats()
+        self.failure_stats = FailureStats()
+        self._task_last_result_at = {}
+        # Time of the first retry of tasks with 'until' condition, or of the current loop item
+        self._task_first_retry_at = {}
+
+        # Sections of full_debug.log by plays, and failed tasks offsets in full_debug.log
+        self._log_sections = []
+        self._log_failed_tasks = []
+
+        # Test runs started in the same second, e.g., worker processes of parallel testing,
+        # have log directories with process ID suffix
+        try:
+            os.makedirs(self.log_dir)
+        except OSError:
+            self.log_dir = "{}-{}".format(self.log_dir, os.getpid())
             os.makedirs(self.log_dir)
 
+        # All log files are written by one background writer
+        self.log_writer = AsyncLogWriter(self.log_dir)
+        atexit.register(self.log_writer.close)
+
         if os.path.exists(self.current_log_dir):
             try:
                 if os.path.islink(self.current_log_dir):
@@ -263,61 +983,161 @@ class CallbackModule(CallbackBase):
             except OSError as e:
                 self._display.display("Error: {} : {}".format(self.current_log_dir, e.strerror), color=C.COLOR_ERROR)
 
-        os.symlink(self.log_dir, self.current_log_dir, target_is_directory=True)
+        try:
+            os.symlink(self.log_dir, self.current_log_dir, target_is_directory=True)
+        except OSError as e:
+            self._display.display("Error: {} : {}".format(self.current_log_dir, e.strerror), color=C.COLOR_ERROR)
 
         # Set logger
         self.logger_name = "ansible-vsphere-gos-validation"
         self.logger = logging.getLogger(self.logger_name)
         self.logger.setLevel(logging.DEBUG)
 
+        # Route log messages to log files by sink name
+        self.log_routes = {'full': self.full_debug_log,
+                           'failed': self.failed_tasks_log,
+                           'known_issue': self.known_issues_log,
+                           'results': self.test_results_log}
+        self.log_handler = LogRouteHandler(self.log_writer, self.log_routes)
+        self.log_handler.setLevel(logging.DEBUG)
+        self.log_handler.setFormatter(logging.Formatter("%(message)s"))
+
         msg = self._banner("PLUGIN [{}]".format(os.path.realpath(__file__)))
         msg += "Plugin directory: {}\nProject directory: {}\nCurrent log directory: {}".format(
             self.plugin_dir, self.cwd, self.current_log_dir)
         self._display.display(msg, color=C.COLOR_VERBOSE)
 
-    def add_logger_file_handler(self, log_file=None):
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+
+        self.log_writer.queue_size = int(self.get_option('log_queue_size'))
+        self.log_writer.flush_interval = float(self.get_option('log_flush_interval'))
+        self.result_max_size = int(self.get_option('result_max_size'))
+        self.profile_top_n = int(self.get_option('profile_top_n'))
+        self.log_compression = self.get_option('log_compression')
+        self.testcase_history_file = (self.get_option('testcase_history_file') or
+                                      os.path.join(os.path.expanduser('~'), ".ansible", "tmp",
+                                                   "gosv_testcase_history.json"))
+        if self.log_compression == 'gzip':
+            self.log_writer.compressed_files.add(self.full_debug_log)
+
+    def enable_log_sink(self, sink):
         """
-        Add a file handler to logger with debug level
+        Write all log messages to the log file of sink until it is disabled
         """
-        if not log_file:
-            return
-
-        log_file_path = os.path.join(self.log_dir, log_file)
-
-        for lh in self.logger.handlers:
-            if isinstance(lh, logging.FileHandler) and \
-                os.path.realpath(log_file_path) == lh.baseFilename:
-                return
+        if self.log_handler not in self.logger.handlers:
+            self.logger.addHandler(self.log_handler)
+        self.log_handler.enabled_sinks.add(sink)
 
-        log_handler = logging.FileHandler(log_file_path)
-        log_handler.setLevel(logging.DEBUG)
-
-        # Set formatter and add it to file and console handlers
-        log_format = "%(message)s"
-        formatter = logging.Formatter(log_format)
-        log_handler.setFormatter(formatter)
-
-        # Add handlers to the logger
-        self.logger.addHandler(log_handler)
-
-    def remove_logger_file_handler(self, log_file=None):
+    def disable_log_sink(self, sink):
         """
-        Remove a file handler from logger
+        Stop writing log messages to the log file of sink unless they are tagged with it
         """
-        if not log_file:
-            return
+        self.log_handler.enabled_sinks.discard(sink)
 
-        log_file_path = os.path.join(self.log_dir, log_file)
+    def _save_result_field(self, value):
+        """
+        Save a large task result field in a file named by its SHA1 digest, and return the
+        reference to this file. Lines of text are saved as text, other values as JSON.
+        """
+        is_text = True
+        if isinstance(value, str):
+            content = value
+        elif isinstance(value, (list, tuple)) and all([isinstance(line, str) for line in value]):
+            content = '\n'.join(value)
+        else:
+            is_text = False
+            for saved_value, saved_ref in self._saved_result_values:
+                if type(saved_value) is type(value) and saved_value == value:
+                    return saved_ref
+            content = json.dumps(value, indent=4, sort_keys=True, ensure_ascii=False, default=to_text)
+
+        data = to_bytes(content, errors='surrogate_or_strict')
+        digest = hashlib.sha1(data).hexdigest()
+        saved_file = self._saved_result_files.get(digest)
+        if saved_file is None:
+            saved_file = os.path.join(self.large_results_dir, digest + ".txt")
+            if not self._saved_result_files:
+                large_results_path = os.path.join(self.log_dir, self.large_results_dir)
+                if not os.path.exists(large_results_path):
+                    os.makedirs(large_results_path)
+            self.log_writer.write(saved_file, data, append=False)
+            self._saved_result_files[digest] = saved_file
+
+        saved_ref = "[{} bytes saved in {}, sha1: {}]".format(len(data), saved_file, digest)
+        if not is_text:
+            self._saved_result_values.append((value, saved_ref))
+        return saved_ref
+
+    def _dump_task_result(self, task_result, indent=4):
+        """
+        Serialize task result for logging. When it is larger than result_max_size, its
+        largest fields are saved in files and replaced with references to those files.
+        """
+        if self.result_max_size > 0:
+            # Fields dropped by _dump_results are not counted or saved in files
+            dropped_keys = ['exception']
+            if self._display.verbosity < 3:
+                dropped_keys += ['invocation', 'diff']
+            field_sizes = dict([(key, estimate_result_size(value)) for key, value in task_result.items()
+                                if key not in dropped_keys and not key.startswith('_ansible_')])
+            total_size = sum(field_sizes.values())
+            if total_size > self.result_max_size:
+                task_result = strip_internal_keys(module_response_deepcopy(task_result))
+                for key in dropped_keys:
+                    task_result.pop(key, None)
+                for key in sorted(field_sizes, key=field_sizes.get, reverse=True):
+                    if total_size <= self.result_max_size:
+                        break
+                    task_result[key] = self._save_result_field(task_result[key])
+                    total_size += len(task_result[key]) - field_sizes[key]
+
+        return self._dump_results(task_result, indent=indent)
+
+    def write_event(self, event, **fields):
+        """
+        Write an event as one JSON object per line into events log file
+        """
+        event_info = OrderedDict([('event', event), ('time', time.time()), ('monotonic', time.monotonic())])
+        event_info.update(fields)
+        self.log_writer.write(self.events_log, json.dumps(event_info, default=to_text) + "\n")
 
-        for lh in self.logger.handlers:
-            if isinstance(lh, logging.FileHandler) and \
-                os.path.realpath(log_file_path) == lh.baseFilename:
-                lh.flush()
-                lh.close()
-                self.logger.removeHandler(lh)
-                return
+    def _get_task_info(self, task):
+        """
+        Get task path, task file and whether task is tagged with known_issue,
+        which are cached by task uuid at task start
+        """
+        task_info = self._task_info_cache.get(task._uuid)
+        if task_info is None:
+            task_path = task.get_path()
+            task_info = {'path': task_path,
+                         'file': os.path.basename(task_path).split(':')[0].strip(),
+                         'known_issue': 'known_issue' in str(task.tags)}
+            self._task_info_cache[task._uuid] = task_info
+        return task_info
+
+    def _get_task_stack(self, task):
+        """
+        Get the stack of task as (play name, included task files, task file, task name)
+        """
+        frames = [task.get_name().strip()]
+        task_include = task
+        while task_include:
+            task_path = task_include.get_path()
+            if task_path:
+                task_file = os.path.basename(task_path).split(':')[0]
+                if task_file != frames[0]:
+                    frames.insert(0, task_file)
+            task_include = task_include.get_first_parent_include()
+
+        frames.insert(0, self._play_name or self._play_path or 'PLAY')
+        return tuple(frames)
 
     def _task_start(self, task, prefix=None):
+        self._get_task_info(task)
+        self._task_started_at[task._uuid] = time.monotonic()
+        self.task_profiler.start(self._get_task_stack(task))
+
         # Cache output prefix for task if provided
         # This is needed to properly display 'RUNNING HANDLER' and similar
         # when hiding skipped/ok task results
@@ -347,7 +1167,7 @@ class CallbackModule(CallbackBase):
                            loop_item=None,
                            ignore_errors=False):
         task = result._task
-        task_tags = task.tags
+        task_info = self._get_task_info(task)
         prefix = self._task_type_cache.get(task._uuid, 'TASK')
 
         # Use cached task name
@@ -364,13 +1184,14 @@ class CallbackModule(CallbackBase):
 
         # Set task banner
         task_banner = self._banner("{} [{}][{}]".format(prefix, current_play, task_name))
-        task_path = task.get_path()
+        task_path = task_info['path']
         if task_path:
             task_banner += "task path: {}\n".format(task_path)
 
         task_details = ""
         # Print task banner if the task is changed
-        if self._last_task_uuid != task._uuid:
+        task_banner_printed = self._last_task_uuid != task._uuid
+        if task_banner_printed:
             task_details += task_banner
 
             # Update last task uuid
@@ -413,56 +1234,220 @@ class CallbackModule(CallbackBase):
             if result._task.ignore_errors:
                 ignore_errors = True
 
-        task_details += " => {}".format(self._dump_results(result._result, indent=4))
+        # Serialize task result only once for logging
+        task_details += " => {}".format(self._dump_task_result(result._result))
 
         if ignore_errors:
             task_details += "\n...ignoring"
             log_failed_tasks = False
 
-        if 'known_issue' in str(task_tags) and 'msg' in result._result:
+        # Log sinks besides the enabled ones which task details will be written to
+        log_sinks = []
+        if task_info['known_issue'] and 'msg' in result._result:
             self._display.display("TAGS: known_issue", color=C.COLOR_VERBOSE)
             log_header = ""
             if 'known_issue' not in self._play_tasks_cache:
-                self._play_tasks_cache['known_issue'] = []
+                self._play_tasks_cache['known_issue'] = set()
                 log_header = self._banner("Known Issue in Play [{}]".format(current_play))
                 self.write_to_logfile(self.known_issues_log, log_header)
 
             if task_path and task_path not in self._play_tasks_cache['known_issue']:
-                self._play_tasks_cache['known_issue'].append(task_path)
-                self.add_logger_file_handler(self.known_issues_log)
+                self._play_tasks_cache['known_issue'].add(task_path)
+                log_sinks.append('known_issue')
 
-        # Add logger handler for failed tasks
+        # Log failed tasks to failed tasks log file
         if log_failed_tasks:
             log_header = ""
             if 'failed' not in self._play_tasks_cache:
-                self._play_tasks_cache['failed'] = []
+                self._play_tasks_cache['failed'] = set()
                 log_header = self._banner("Failed at Play [{}]".format(current_play))
 
             # If it is a failed item and not the first item, log its task name and path
             # in self.failed_tasks_log as well
             if task_path and task_path not in self._play_tasks_cache['failed']:
-                self._play_tasks_cache['failed'].append(task_path)
-                if task_path not in task_details:
+                self._play_tasks_cache['failed'].add(task_path)
+                if not task_banner_printed:
                     log_header += task_banner
 
             if log_header:
                 self.write_to_logfile(self.failed_tasks_log, log_header)
 
-            # Extract error messages from task result and print it after task details
-            result_in_json = json.loads(self._dump_results(result._result, indent=4))
-            error_msg = extract_error_msg(result_in_json)
+            # Extract error messages from task result and print it after task details.
+            # Task result has been cleaned, and its output is hidden when no_log is true.
+            error_msg = ''
+            if not result._result.get('_ansible_no_log', False):
+                error_msg = extract_error_msg(result._result)
             task_details += "\nerror message:\n" + error_msg
 
-            self.add_logger_file_handler(self.failed_tasks_log)
+            log_sinks.append('failed')
+
+        result_offset = self.log_writer.tell(self.full_debug_log)
+        if 'failed' in log_sinks:
+            self._log_failed_tasks.append({'test_case': self._last_test_name,
+                                           'task': task_name,
+                                           'task_path': task_path,
+                                           'uncompressed_offset': result_offset})
+        self.logger.info(task_details, extra={'log_sinks': log_sinks})
+
+        task_ended_at = time.monotonic()
+        task_started_at = self._task_started_at.get(task._uuid, task_ended_at)
+
+        # Account tasks with 'until' condition, whose polling starts at the first retry,
+        # so the first attempt is not counted in polling time. Modules retrying by
+        # themselves, e.g., vsphere_datastore_file_tail, return attempts and polling time,
+        # and only attempts are kept in result with no_log, so polling time is task time.
+        poll_started_at = self._task_first_retry_at.pop(task._uuid, None)
+        if 'attempts' in result._result and task_status != 'skipped':
+            attempts = int(result._result['attempts'])
+            if poll_started_at is not None:
+                poll_seconds = task_ended_at - poll_started_at
+            elif 'poll_seconds' in result._result:
+                poll_seconds = float(result._result['poll_seconds'])
+            elif attempts > 1:
+                poll_seconds = task_ended_at - task_started_at
+            else:
+                poll_seconds = 0.0
+            self.task_retry_stats.add(task_path or task_name,
+                                      task_name,
+                                      attempts,
+                                      poll_seconds,
+                                      task_status in ['ok', 'changed'])
+
+        # Account powershell commands executed one by one or in batches in Windows guest OS
+        task_action = task.action.split('.')[-1]
+        if task_action in ['win_shell', 'win_command', 'win_powershell_batch'] and task_status in ['ok', 'changed', 'failed']:
+            run_seconds = task_ended_at - self._task_last_result_at.get(task._uuid, task_started_at)
+            if task_action == 'win_powershell_batch':
+                self.powershell_stats.add_batch(task_path or task_name,
+                                                task_name,
+                                                result._result.get('cmd_outputs', []),
+                                                run_seconds)
+            else:
+                self.powershell_stats.add_single(run_seconds)
+        self._task_last_result_at[task._uuid] = task_ended_at
+
+        self.write_event('task_result',
+                         task_uuid=task._uuid,
+                         play=self._play_name,
+                         test_case=self._last_test_name,
+                         task=task_name,
+                         task_path=task_path,
+                         action=task.action,
+                         status=task_status,
+                         host=result._host.get_name(),
+                         item=loop_item,
+                         ignore_errors=ignore_errors,
+                         start=task_started_at,
+                         end=task_ended_at,
+                         duration=round(task_ended_at - task_started_at, 6),
+                         result={'file': self.full_debug_log,
+                                 'offset': result_offset,
+                                 'length': self.log_writer.tell(self.full_debug_log) - result_offset})
+
+    def _write_log_index(self):
+        """
+        Write index of compressed full_debug.log, which maps plays, test cases and failed
+        tasks to the frames containing their log messages
+        """
+        frames = self.log_writer.frames.get(self.full_debug_log, [])
+        log_size = self.log_writer.tell(self.full_debug_log)
+
+        def get_frames(start, end):
+            return [i for i, frame in enumerate(frames)
+                    if frame[2] < end and frame[2] + frame[3] > start]
+
+        sections = []
+        for i, section in enumerate(self._log_sections):
+            section = dict(section)
+            if i + 1 < len(self._log_sections):
+                end = self._log_sections[i + 1]['uncompressed_offset']
+            else:
+                end = log_size
+            section['uncompressed_length'] = end - section['uncompressed_offset']
+            section['frames'] = get_frames(section['uncompressed_offset'], end)
+            sections.append(section)
+
+        failed_tasks = []
+        for failed_task in self._log_failed_tasks:
+            failed_task = dict(failed_task)
+            task_frames = get_frames(failed_task['uncompressed_offset'], failed_task['uncompressed_offset'] + 1)
+            failed_task['frame'] = task_frames[0] if task_frames else None
+            failed_tasks.append(failed_task)
+
+        log_index = {'file': self.log_writer.get_file_name(self.full_debug_log),
+                     'compression': self.log_compression,
+                     'uncompressed_size': log_size,
+                     'frames': [dict(zip(['offset', 'length', 'uncompressed_offset', 'uncompressed_length'], frame))
+                                for frame in frames],
+                     'sections': sections,
+                     'failed_tasks': failed_tasks}
+        self.log_writer.write(self.full_debug_log + ".index.json", json.dumps(log_index, indent=2) + "\n", append=False)
+
+    def _harvest_fact(self, var_rules, var_value):
+        """
+        Update testbed or VM information fields with variable value by harvest rules
+        """
+        text_value = to_text(var_value)
+        for target, field, policy in var_rules:
+            if target == 'handler':
+                getattr(self, field)(var_value)
+                continue
+            if policy in ('if_value', 'if_empty_value') and not text_value:
+                continue
+
+            check_empty = policy in ('if_empty', 'if_empty_value')
+            if target == 'vm_info':
+                if not self.vm_info:
+                    continue
+                if not check_empty or not getattr(self.vm_info, field):
+                    setattr(self.vm_info, field, text_value)
+            elif target == 'callback':
+                if not check_empty or not getattr(self, field):
+                    setattr(self, field, text_value)
+            else:
+                target_info = getattr(self, target)
+                if not check_empty or not target_info[field]:
+                    target_info[field] = text_value
 
-        self.logger.info(task_details)
+    def _update_rescue_stats(self, artifacts):
+        """
+        Add the time of collecting failure state in test_rescue.yml to failure stats
+        """
+        if isinstance(artifacts, dict):
+            self.failure_stats.add_rescue(artifacts)
 
-        # Remove logger handler for known issues and failed tasks
-        if 'known_issue' in str(task_tags) and 'msg' in result._result:
-            self.remove_logger_file_handler(self.known_issues_log)
+    def _update_snapshot_wait_stats(self, snapshot_result):
+        """
+        Add the time of waiting for failure state snapshot taken in background to failure stats
+        """
+        if isinstance(snapshot_result, dict):
+            self.failure_stats.add_snapshot_wait(snapshot_result)
 
-        if log_failed_tasks:
-            self.remove_logger_file_handler(self.failed_tasks_log)
+    def _update_testcase_results(self, results):
+        """
+        Update test case results with the results of test cases run by worker processes
+        of parallel testing, which are keyed by test case names in test case list file
+        """
+        if not isinstance(results, dict):
+            return
+
+        for test_name in list(self.testcases.keys()):
+            result = results.get(test_name)
+            if not result:
+                continue
+            # deploy_vm test case could be renamed in worker process
+            if result['name'] != test_name:
+                self.testcases = OrderedDict([(result['name'] if name == test_name else name, testcase)
+                                              for name, testcase in self.testcases.items()])
+                self._testcase_origin_names[result['name']] = test_name
+                test_name = result['name']
+            self.testcases[test_name].update(status=result['status'],
+                                             started_at=result['started_at'],
+                                             finished_at=result['finished_at'],
+                                             duration=result['duration'])
+            if result.get('resumed'):
+                self._resumed_testcases.add(test_name)
+            self._log_testcase_result(test_name)
 
     def _get_testing_vars(self):
         if not self.testing_vars_file or not os.path.exists(self.testing_vars_file):
@@ -494,11 +1479,66 @@ class CallbackModule(CallbackBase):
         return path
 
     def write_to_logfile(self, log_file, msg):
-        log_file_path = os.path.join(self.log_dir, log_file)
-        msg = msg.encode('utf-8')
-        with open(log_file_path, 'ab') as fd:
-            fd.write(msg)
-            fd.close()
+        self.log_writer.write(log_file, msg)
+
+    def _log_testcase_result(self, test_name):
+        """
+        Write test case status into test results file and events log file
+        """
+        testcase = self.testcases[test_name]
+        self.write_to_logfile(self.test_results_yml, "{}: {}\n".format(test_name, testcase['status']))
+        self.write_event('testcase_result',
+                         test_case=test_name,
+                         status=testcase['status'],
+                         started_at=testcase['started_at'],
+                         finished_at=testcase['finished_at'],
+                         duration=testcase['duration'])
+
+    def _print_testcase_eta(self):
+        """
+        Print estimated remaining time of test run by test case history when a test case starts.
+        Test cases without history are estimated with the median duration of other test cases.
+        """
+        if not self.testcase_history or not self.testcase_history.testcases:
+            return
+
+        now = time.time()
+        durations = {}
+        for test_name in self.testcases:
+            duration = self.testcase_history.get_duration(self._testcase_origin_names.get(test_name, test_name))
+            if duration is not None:
+                durations[test_name] = duration
+        if not durations:
+            return
+        known = sorted(durations.values())
+        median = known[len(known) // 2]
+
+        remaining = 0
+        remaining_count = 0
+        no_history = 0
+        for test_name, testcase in self.testcases.items():
+            if testcase['status'] not in ['No Run', 'Running']:
+                continue
+            if test_name not in durations:
+                no_history += 1
+            duration = durations.get(test_name, median)
+            if testcase['status'] == 'Running' and testcase['started_at']:
+                duration = max(duration - (now - testcase['started_at']), 0)
+            remaining += duration
+            remaining_count += 1
+
+        msg = "ETA: {} for {} test cases, expected to finish at {}".format(
+            time.strftime('%H:%M:%S', time.gmtime(remaining)), remaining_count,
+            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now + remaining)))
+        if no_history:
+            msg += " ({} test cases without history)".format(no_history)
+        self.logger.info(msg)
+        self._display.display(msg, color=C.COLOR_VERBOSE)
+        self.write_event('testcase_eta',
+                         test_case=self._last_test_name,
+                         remaining_seconds=int(remaining),
+                         remaining_test_cases=remaining_count,
+                         no_history_test_cases=no_history)
 
     def _print_testbed_info(self):
         """
@@ -656,6 +1696,8 @@ class CallbackModule(CallbackBase):
                     status_stats['Skipped'] += 1
 
         msg += row_border
+        if self._resumed_testcases:
+            msg += "Results of {} test cases are from the resumed test run\n".format(len(self._resumed_testcases))
 
         # Test summary
         test_summary = "Test Results (Total: " + str(total_count)
@@ -669,6 +1711,205 @@ class CallbackModule(CallbackBase):
         self.logger.info(msg)
         self._display.display(msg, color=C.COLOR_VERBOSE)
 
+    def _print_failure_stats(self):
+        """
+        Print time of collecting VM failure state for failed test cases in a table as below,
+        which is the time of test_rescue.yml and waiting for the failure state snapshot taken
+        in background at next snapshot revert
+
+        Failure State Collection: 2 failures took 41.3s, 20.6s per failure
+        +------------------------------------------------------------------------------------+
+        | Name           | Rescue (s) | vmware.log (s) | vmware.log (KB) | Snapshot Wait (s) |
+        +------------------------------------------------------------------------------------+
+        | gosc_perl_dhcp |        6.2 |            1.9 |     2048 -> 231 |              13.5 |
+        | device_list    |        5.8 |            1.7 |     1980 -> 220 |              15.8 |
+        +------------------------------------------------------------------------------------+
+        """
+        failures = self.failure_stats.failures
+        if not failures:
+            return
+
+        total_seconds = self.failure_stats.get_total_seconds()
+        msg = "Failure State Collection: {} failures took {:.1f}s, {:.1f}s per failure\n".format(
+            len(failures), total_seconds, total_seconds / len(failures))
+
+        rows = []
+        for failure in failures:
+            snapshot_wait = failure['snapshot_wait_seconds']
+            rows.append((failure['testcase'],
+                         "{:.1f}".format(failure['rescue_seconds']),
+                         "{:.1f}".format(failure['vm_log_seconds']),
+                         "{} -> {}".format(failure['vm_log_size'] // 1024, failure['vm_log_gzip_size'] // 1024),
+                         "{:.1f}".format(snapshot_wait) if snapshot_wait is not None else "N/A"))
+
+        headers = ("Name", "Rescue (s)", "vmware.log (s)", "vmware.log (KB)", "Snapshot Wait (s)")
+        col_widths = [max([len(headers[i])] + [len(row[i]) for row in rows]) for i in range(len(headers))]
+        row_border = "+{}+\n".format("".ljust(sum(col_widths) + 3 * len(col_widths) - 1, "-"))
+        row_format = "| " + " | ".join(["{:<" + str(col_widths[0]) + "}"] +
+                                       ["{:>" + str(width) + "}" for width in col_widths[1:]]) + " |\n"
+        msg += row_border
+        msg += row_format.format(*headers)
+        msg += row_border
+        for row in rows:
+            msg += row_format.format(*row)
+        msg += row_border
+
+        self.logger.info(msg)
+        self._display.display(msg, color=C.COLOR_VERBOSE)
+        self.write_event('failure_stats', seconds=total_seconds, failures=failures)
+
+    def _print_task_profile(self):
+        """
+        Print the most time consuming test cases, included task files and tasks in tables as below,
+        and write the whole task profile into a file in collapsed stack format
+
+        Top 2 time consuming included task files:
+        +-----------------------------------------------+
+        | Included Task File   | Count | Total Time (s) |
+        +-----------------------------------------------+
+        | test_setup.yml       |   420 |         1380.2 |
+        | vm_wait_guest_ip.yml |    30 |          512.4 |
+        +-----------------------------------------------+
+        """
+        self.task_profiler.stop()
+        if not self.task_profiler.stacks:
+            return
+
+        msg = self._banner("TASK PROFILE")
+        for level, title in [('testcase', 'Test Case'),
+                             ('include', 'Included Task File'),
+                             ('task', 'Task')]:
+            hotspots = self.task_profiler.get_hotspots(level, self.profile_top_n)
+            if not hotspots:
+                continue
+
+            name_col_width = max([len(title)] + [len(name) for name, _, _ in hotspots])
+            row_border = "+{}+\n".format("".ljust(name_col_width + 27, "-"))
+            row_format = "| {:<} | {:>5} | {:>14} |\n"
+
+            msg += "Top {} time consuming {}s:\n".format(len(hotspots), title.lower())
+            msg += row_border
+            msg += row_format.format(title.ljust(name_col_width), "Count", "Total Time (s)")
+            msg += row_border
+            for name, count, seconds in hotspots:
+                msg += row_format.format(name.ljust(name_col_width), count, "{:.1f}".format(seconds))
+            msg += row_border
+            msg += "\n"
+
+        msg += "Task profile in collapsed stack format: {}\n".format(os.path.join(self.log_dir, self.task_profile_file))
+        self.logger.info(msg)
+        self.log_writer.write(self.task_profile_file, self.task_profiler.get_collapsed_stacks(), append=False)
+
+    def _print_powershell_batches(self):
+        """
+        Print time of powershell commands executed in batches, and compare it with the estimated
+        time of executing them one by one, which is the average time of powershell commands
+        executed with win_shell or win_command module in this test run
+
+        PowerShell Batches: 26 commands in 6 runs of 1 tasks took 21.6s, one by one they would take about 104.0s
+        Single powershell command took 4.0s on average in 85 runs of win_shell or win_command
+        +------------------------------------------------------------------------------------+
+        | Task File                 | Runs | Commands | Batch Time (s) | One by One Time (s) |
+        +------------------------------------------------------------------------------------+
+        | win_execute_cmd_batch.yml |    6 |       26 |           21.6 |               104.0 |
+        +------------------------------------------------------------------------------------+
+        """
+        if not self.powershell_stats.batches:
+            return
+
+        single_average = self.powershell_stats.get_single_average()
+        batches = self.powershell_stats.batches.values()
+        total_cmds = sum([batch_stats['cmds'] for batch_stats in batches])
+        total_seconds = sum([batch_stats['seconds'] for batch_stats in batches])
+
+        def format_one_by_one(cmds):
+            return "{:.1f}".format(cmds * single_average) if single_average is not None else "N/A"
+
+        msg = self._banner("POWERSHELL BATCHES")
+        msg += "PowerShell Batches: {} commands in {} runs of {} tasks took {:.1f}s".format(
+            total_cmds, sum([batch_stats['runs'] for batch_stats in batches]), len(batches), total_seconds)
+        if single_average is not None:
+            msg += ", one by one they would take about {}s\n".format(format_one_by_one(total_cmds))
+            msg += "Single powershell command took {:.1f}s on average in {} runs of win_shell or win_command\n".format(
+                single_average, self.powershell_stats.single_runs)
+        else:
+            msg += "\n"
+
+        rows = [(batch_stats['task_file'], batch_stats['runs'], batch_stats['cmds'],
+                 "{:.1f}".format(batch_stats['seconds']), format_one_by_one(batch_stats['cmds']))
+                for batch_stats in batches]
+        name_col_width = max([len("Task File")] + [len(row[0]) for row in rows])
+        row_border = "+{}+\n".format("".ljust(name_col_width + 59, "-"))
+        row_format = "| {:<} | {:>4} | {:>8} | {:>14} | {:>19} |\n"
+        msg += row_border
+        msg += row_format.format("Task File".ljust(name_col_width), "Runs", "Commands", "Batch Time (s)",
+                                 "One by One Time (s)")
+        msg += row_border
+        for row in rows:
+            msg += row_format.format(row[0].ljust(name_col_width), *row[1:])
+        msg += row_border
+
+        self.logger.info(msg)
+        self.write_event('powershell_batches',
+                         seconds=total_seconds,
+                         cmds=total_cmds,
+                         single_average_seconds=single_average,
+                         single_runs=self.powershell_stats.single_runs,
+                         tasks=self.powershell_stats.batches)
+
+    def _print_task_retries(self):
+        """
+        Print polling time and attempts of retried tasks in tables as below
+
+        Polling Time: 612.5s in 38 runs of 4 tasks with 'until' condition
+        +----------------------------------------------------------------------------------------------+
+        | Task File              | Runs | Failed | Poll Time (s) | Attempts to Success (attempts:runs) |
+        +----------------------------------------------------------------------------------------------+
+        | vm_wait_guest_ip.yml   |   30 |      0 |         512.4 | 1:12, 2:10, 5:8                     |
+        +----------------------------------------------------------------------------------------------+
+        """
+        if not self.task_retry_stats.tasks:
+            return
+
+        total_runs = sum([task_stats['runs'] for task_stats in self.task_retry_stats.tasks.values()])
+        msg = self._banner("TASK RETRIES")
+        msg += "Polling Time: {:.1f}s in {} runs of {} tasks with 'until' condition\n".format(
+            self.task_retry_stats.get_total_seconds(), total_runs, len(self.task_retry_stats.tasks))
+
+        # Retry stats of task files
+        file_rows = []
+        for task_file, stats in self.task_retry_stats.get_task_file_stats():
+            histogram = ", ".join(["{}:{}".format(attempts, count)
+                                   for attempts, count in sorted(stats['attempts_to_success'].items())])
+            file_rows.append((task_file, stats['runs'], stats['failed'],
+                              "{:.1f}".format(stats['poll_seconds']), histogram))
+
+        histogram_title = "Attempts to Success (attempts:runs)"
+        name_col_width = max([len("Task File")] + [len(row[0]) for row in file_rows])
+        histogram_col_width = max([len(histogram_title)] + [len(row[4]) for row in file_rows])
+        row_border = "+{}+\n".format("".ljust(name_col_width + histogram_col_width + 37, "-"))
+        row_format = "| {:<} | {:>4} | {:>6} | {:>13} | {:<} |\n"
+        msg += row_border
+        msg += row_format.format("Task File".ljust(name_col_width), "Runs", "Failed", "Poll Time (s)",
+                                 histogram_title.ljust(histogram_col_width))
+        msg += row_border
+        for task_file, runs, failed, seconds, histogram in file_rows:
+            msg += row_format.format(task_file.ljust(name_col_width), runs, failed, seconds,
+                                     histogram.ljust(histogram_col_width))
+        msg += row_border
+
+        # Retry stats of tasks
+        msg += "\n"
+        for task_path, task_stats in self.task_retry_stats.tasks.items():
+            msg += "{}: runs={}, failed={}, attempts={}, max_attempts={}, poll_time={:.1f}s\n".format(
+                task_path, task_stats['runs'], task_stats['failed'], task_stats['attempts'],
+                task_stats['max_attempts'], task_stats['poll_seconds'])
+
+        self.logger.info(msg)
+        self.write_event('task_retries',
+                         poll_seconds=self.task_retry_stats.get_total_seconds(),
+                         tasks=self.task_retry_stats.tasks)
+
     def _print_os_release_info(self):
         """
         Print OS release information into a JSON file, which includes open-vm-tools version,
@@ -717,8 +1958,7 @@ class CallbackModule(CallbackBase):
             self.testcases[self._last_test_name]['finished_at'] = time.time()
             self.testcases[self._last_test_name]['duration'] = int(self.testcases[self._last_test_name]['finished_at'] -
                                                                    self.testcases[self._last_test_name]['started_at'])
-            self.write_to_logfile(self.test_results_yml,
-                                  "{}: {}\n".format(self._last_test_name, self.testcases[self._last_test_name]['status']))
+            self._log_testcase_result(self._last_test_name)
 
         if result._task.loop and 'results' in result._result:
             self._process_items(result)
@@ -734,7 +1974,7 @@ class CallbackModule(CallbackBase):
 
         task_result = result._result
         task_args = task.args
-        task_file = os.path.basename(task.get_path()).split(':')[0].strip()
+        task_file = self._get_task_info(task)['file']
         delegated_vars = task_result.get('_ansible_delegated_vars', None)
 
         if result._task.loop and 'results' in result._result:
@@ -747,7 +1987,8 @@ class CallbackModule(CallbackBase):
         else:
             self._print_task_details(result, "ok", delegated_vars)
 
-        if str(task.action) == "ansible.builtin.set_fact":
+        task_action = str(task.action)
+        if task_action == SET_FACT_ACTION:
             set_fact_result = task_result.get('ansible_facts', None)
             if set_fact_result:
                 # Update deploy_vm test case name if deploy_casename is set
@@ -756,33 +1997,23 @@ class CallbackModule(CallbackBase):
                     if self._last_test_name in self.testcases and deploy_casename:
                         old_test_name = self._last_test_name
                         self._last_test_name = deploy_casename
+                        self._testcase_origin_names[deploy_casename] = self._testcase_origin_names.get(old_test_name, old_test_name)
                         self.testcases[self._last_test_name] = self.testcases[old_test_name]
                         del self.testcases[old_test_name]
                         self.testcases.move_to_end(self._last_test_name, last=False)
-                if "get_windows_system_info.yml" == task_file or "get_linux_system_info.yml" == task_file:
-                    vm_guest_os_distribution = set_fact_result.get("vm_guest_os_distribution", None)
-                    if vm_guest_os_distribution and self.vm_info:
-                        self.vm_info.Guest_OS_Distribution = vm_guest_os_distribution
-                if "vm_get_vm_info.yml" == task_file:
-                   if self.vm_info:
-                       self.vm_info.Config_Guest_Id = set_fact_result.get("vm_guest_id", '')
-                       self.vm_info.Hardware_Version = set_fact_result.get("vm_hardware_version", '')
-                if "vm_upgrade_hardware_version.yml" == task_file:
-                   if self.vm_info:
-                       self.vm_info.Hardware_Version = set_fact_result.get("vm_hardware_version", '')
-                if "vm_get_guest_info.yml" == task_file:
-                   if self.vm_info:
-                       self.vm_info.GuestInfo_Guest_Id = set_fact_result.get("guestinfo_guest_id", '')
-                       self.vm_info.GuestInfo_Guest_Full_Name = set_fact_result.get("guestinfo_guest_full_name", '')
-                       self.vm_info.GuestInfo_Guest_Family = set_fact_result.get("guestinfo_guest_family", '')
-                       self.vm_info.GuestInfo_Detailed_Data = set_fact_result.get("guestinfo_detailed_data", '')
-                       self.vm_info.VMTools_Version = set_fact_result.get("guestinfo_vmtools_info", '')
-                if "check_guest_os_gui.yml" == task_file:
-                   guest_os_with_gui = str(set_fact_result.get("guest_os_with_gui", ''))
-                   if self.vm_info and guest_os_with_gui != '':
-                       self.vm_info.GUI_Installed = guest_os_with_gui
-
-        elif str(task.action) == "ansible.builtin.debug":
+                        for section in self._log_sections:
+                            if section['test_case'] == old_test_name:
+                                section['test_case'] = deploy_casename
+                        for failed_task in self._log_failed_tasks:
+                            if failed_task['test_case'] == old_test_name:
+                                failed_task['test_case'] = deploy_casename
+
+                harvest_rules = self._fact_harvest_table.get((task_action, task_file))
+                if harvest_rules:
+                    for var_name, var_rules in harvest_rules.items():
+                        self._harvest_fact(var_rules, set_fact_result.get(var_name, ''))
+
+        elif task_action == DEBUG_ACTION:
             if "skip_test_case.yml" == task_file and "Skip testcase:" in task.name:
                 [test_name, test_result] = task.name.split(',')
                 test_name = test_name.split(':')[-1].strip()
@@ -792,57 +2023,13 @@ class CallbackModule(CallbackBase):
                     self.testcases[test_name]['finished_at'] = time.time()
                     self.testcases[test_name]['duration'] = int(self.testcases[test_name]['finished_at'] -
                                                                 self.testcases[test_name]['started_at'])
-                    self.write_to_logfile(self.test_results_yml,
-                                          "{}: {}\n".format(self._last_test_name, self.testcases[self._last_test_name]['status']))
+                    self._log_testcase_result(self._last_test_name)
             elif 'var' in task_args:
                 debug_var_name = str(task_args['var'])
-                debug_var_value = str(task_result[debug_var_name])
-                if not self.testrun_log_dir and debug_var_name == 'testrun_log_path':
-                    self.testrun_log_dir = debug_var_value
-                if "check_inbox_driver.yml" == task_file:
-                    if debug_var_name == "os_release_info_file_path":
-                        self.os_release_info_file = debug_var_value
-                if "deploy_vm.yml" == task_file:
-                    if debug_var_name == "vm_guest_ip" and self.vm_info and not self.vm_info.IP:
-                        self.vm_info.IP = debug_var_value
-                if "test_setup.yml" == task_file:
-                    if debug_var_name == "vm_guest_ip" and self.vm_info and not self.vm_info.IP:
-                        self.vm_info.IP = debug_var_value
-                if ("get_guest_ovt_version_build.yml" == task_file or
-                   "win_get_vmtools_version_build.yml" == task_file):
-                    if debug_var_name ==  "vmtools_info_from_vmtoolsd" and debug_var_value:
-                        if "get_guest_ovt_version_build.yml" == task_file and not self.os_ovt_version:
-                            self.os_ovt_version = debug_var_value
-                        if (self.vm_info and
-                            (not self.vm_info.VMTools_Version or
-                             self.vm_info.VMTools_Version != debug_var_value)):
-                            self.vm_info.VMTools_Version = debug_var_value
-                if "esxi_get_version_build.yml" == task_file:
-                    if not self.esxi_info['hostname'] and debug_var_name == "esxi_hostname":
-                        self.esxi_info['hostname'] = debug_var_value
-                    if not self.esxi_info['version'] and debug_var_name == "esxi_version":
-                        self.esxi_info['version'] = debug_var_value
-                    if not self.esxi_info['build'] and debug_var_name == "esxi_build":
-                        self.esxi_info['build'] = debug_var_value
-                    if not self.esxi_info['update_version'] and debug_var_name == "esxi_update_version":
-                        self.esxi_info['update_version'] = debug_var_value
-                if "esxi_get_model.yml" == task_file:
-                    if not self.esxi_info['model'] and debug_var_name == "esxi_model_info":
-                        self.esxi_info['model'] = debug_var_value
-                    if not self.esxi_info['cpu_model'] and debug_var_name == "esxi_cpu_model_info":
-                        self.esxi_info['cpu_model'] = debug_var_value
-                if "vcenter_get_version_build.yml" == task_file:
-                    if not self.vcenter_info['hostname'] and debug_var_name == "vcenter_hostname":
-                        self.vcenter_info['hostname'] = debug_var_value
-                    if not self.vcenter_info['version'] and debug_var_name == "vcenter_version":
-                        self.vcenter_info['version'] = debug_var_value
-                    if not self.vcenter_info['build'] and debug_var_name == "vcenter_build":
-                        self.vcenter_info['build'] = debug_var_value
-                if "get_cloudinit_version.yml" == task_file and debug_var_name == "cloudinit_version":
-                    if self.vm_info and not self.vm_info.CloudInit_Version:
-                        self.vm_info.CloudInit_Version = debug_var_value
-                    if not self.os_cloudinit_version:
-                        self.os_cloudinit_version = debug_var_value
+                for table_key in [(task_action, task_file), (task_action, None)]:
+                    harvest_rules = self._fact_harvest_table.get(table_key)
+                    if harvest_rules and debug_var_name in harvest_rules:
+                        self._harvest_fact(harvest_rules[debug_var_name], task_result[debug_var_name])
 
     def v2_runner_on_skipped(self, result):
         self._clean_results(result._result, result._task.action)
@@ -861,14 +2048,21 @@ class CallbackModule(CallbackBase):
             self.testcases[self._last_test_name]['finished_at'] = time.time()
             self.testcases[self._last_test_name]['duration'] = int(self.testcases[self._last_test_name]['finished_at'] -
                                                                    self.testcases[self._last_test_name]['started_at'])
-            self.write_to_logfile(self.test_results_yml,
-                                  "{}: {}\n".format(self._last_test_name, self.testcases[self._last_test_name]['status']))
+            self._log_testcase_result(self._last_test_name)
 
     def v2_runner_retry(self, result):
+        self._task_first_retry_at.setdefault(result._task._uuid, time.monotonic())
         task_name = result.task_name or result._task
         msg = "FAILED - RETRYING: {} ({} retries left).".format(task_name, result._result['retries'] - result._result['attempts'])
-        msg += "Result was: %s" % self._dump_results(result._result, indent=4)
+        msg += "Result was: %s" % self._dump_task_result(result._result)
         self.logger.debug(msg)
+        self.write_event('task_retry',
+                         task_uuid=result._task._uuid,
+                         task=task_name,
+                         task_path=result._task.get_path(),
+                         host=result._host.get_name(),
+                         attempts=result._result['attempts'],
+                         retries=result._result['retries'])
 
     def v2_runner_item_on_ok(self, result):
         delegated_vars = result._result.get('_ansible_delegated_vars', None)
@@ -929,7 +2123,16 @@ class CallbackModule(CallbackBase):
             self.testing_vars['vm_name']):
             self.vm_info = VmInfo(self.testing_vars['vm_name'])
 
-        self.add_logger_file_handler(self.full_debug_log)
+        # Worker processes of parallel testing estimate test cases by the history of base VM
+        history_vm_name = extra_vars.get('parallel_testing_base_vm')
+        if history_vm_name:
+            self.record_testcase_history = False
+        else:
+            history_vm_name = extra_vars.get('vm_name') or (self.testing_vars or {}).get('vm_name')
+        if history_vm_name and self.testcases:
+            self.testcase_history = TestcaseHistory(self.testcase_history_file, history_vm_name)
+
+        self.enable_log_sink('full')
         msg = self._banner("PLAYBOOK: {}".format(playbook_path))
         msg += "Positional arguments: {}\n".format(' '.join(context.CLIARGS['args']))
         msg += "Tesing vars file: {}\n".format(self.testing_vars_file)
@@ -938,6 +2141,11 @@ class CallbackModule(CallbackBase):
         msg += "Plugin dir: {}\n".format(self.plugin_dir)
         msg += "Log dir: {}".format(self.log_dir)
         self.logger.info(msg)
+        self.write_event('playbook_start',
+                         playbook=playbook_path,
+                         testing_vars_file=self.testing_vars_file,
+                         testing_testcase_file=self.testing_testcase_file,
+                         test_cases=list(self.testcases.keys()))
         self._display.display(msg, color=C.COLOR_VERBOSE)
 
     def v2_playbook_on_play_start(self, play):
@@ -952,8 +2160,13 @@ class CallbackModule(CallbackBase):
             self.testcases[self._last_test_name]['finished_at'] = time.time()
             self.testcases[self._last_test_name]['duration'] = int(self.testcases[self._last_test_name]['finished_at'] -
                                                                    self.testcases[self._last_test_name]['started_at'])
-            self.write_to_logfile(self.test_results_yml,
-                                  "{}: {}\n".format(self._last_test_name, self.testcases[self._last_test_name]['status']))
+            self._log_testcase_result(self._last_test_name)
+
+        # Start a new section of full_debug.log in a new compressed frame
+        self.log_writer.start_frame(self.full_debug_log)
+        self._log_sections.append({'play': self._play_name,
+                                   'test_case': self._play_name if self._play_name in self.testcases else None,
+                                   'uncompressed_offset': self.log_writer.tell(self.full_debug_log)})
 
         if self._play_name:
             msg = self._banner("PLAY [{}]".format(self._play_name))
@@ -964,17 +2177,23 @@ class CallbackModule(CallbackBase):
             msg += "play path: {}".format(self._play_path)
 
         self.logger.info(msg)
+        self.write_event('play_start', play=self._play_name, play_path=self._play_path)
 
         self.play = play
 
-        # Clear play tasks cache
+        # Clear play tasks cache and tasks info cache
         self._play_tasks_cache.clear()
+        self._task_info_cache.clear()
+        self._task_started_at.clear()
+        self._task_last_result_at.clear()
+        self._task_first_retry_at.clear()
 
         # Update testcase status to Running and set its start time
         if self._play_name and self._play_name in self.testcases:
             self.testcases[self._play_name]["status"] = "Running"
             self.testcases[self._play_name]["started_at"] = time.time()
             self._last_test_name = self._play_name
+            self._print_testcase_eta()
 
     def v2_playbook_on_stats(self, stats):
         self.finished_at = time.time()
@@ -988,8 +2207,17 @@ class CallbackModule(CallbackBase):
             self.testcases[self._last_test_name]['finished_at'] = time.time()
             self.testcases[self._last_test_name]['duration'] = int(self.testcases[self._last_test_name]['finished_at'] -
                                                                    self.testcases[self._last_test_name]['started_at'])
-            self.write_to_logfile(self.test_results_yml,
-                                  "{}: {}\n".format(self._last_test_name, self.testcases[self._last_test_name]['status']))
+            self._log_testcase_result(self._last_test_name)
+
+        if self.testcase_history and self.record_testcase_history:
+            try:
+                self.testcase_history.update([(self._testcase_origin_names.get(test_name, test_name),
+                                               testcase['status'], testcase['duration'])
+                                              for test_name, testcase in self.testcases.items()
+                                              if test_name not in self._resumed_testcases])
+            except (IOError, OSError) as e:
+                self._display.warning("Failed to update test case history {}: {}".format(
+                    self.testcase_history_file, e))
 
         # Log play stats
         msg = self._banner("PLAY RECAP")
@@ -1006,6 +2234,12 @@ class CallbackModule(CallbackBase):
             msg += "  ignored={}".format(t['ignored'])
 
         self.logger.info(msg)
+        self.write_event('playbook_stats', hosts=dict([(h, stats.summarize(h)) for h in hosts]))
+
+        # Log task profile, powershell batches and polling time
+        self._print_task_profile()
+        self._print_powershell_batches()
+        self._print_task_retries()
 
         # Log testcases results
         self._print_os_release_info()
@@ -1014,7 +2248,7 @@ class CallbackModule(CallbackBase):
         if len(self.testcases) > 0:
             self._display.banner("TEST SUMMARY")
             self.logger.info(self._banner("TEST SUMMARY"))
-            self.add_logger_file_handler(self.test_results_log)
+            self.enable_log_sink('results')
             self._print_testbed_info()
 
             # Print VM information
@@ -1027,13 +2261,25 @@ class CallbackModule(CallbackBase):
             self._display.display(vm_info_str, color=C.COLOR_VERBOSE)
 
             self._print_test_results()
-            self.remove_logger_file_handler(self.test_results_log)
+            self._print_failure_stats()
+            self.disable_log_sink('results')
+
+        # Make sure all log messages are written before moving log files
+        self.log_writer.close()
+        if self.log_writer.error:
+            self._display.warning("Failed to write log files in {}: {}".format(self.log_dir, self.log_writer.error))
+
+        if self.full_debug_log in self.log_writer.compressed_files:
+            self._write_log_index()
 
         if self.testrun_log_dir and self.log_dir != self.testrun_log_dir:
-            os.system("cp -rf {}/* {}".format(self.log_dir, self.testrun_log_dir))
-            os.unlink(self.current_log_dir)
-            os.system("rm -rf {}".format(self.log_dir))
-            os.symlink(self.testrun_log_dir, self.current_log_dir, target_is_directory=True)
+            try:
+                move_log_dir(self.log_dir, self.testrun_log_dir)
+                os.unlink(self.current_log_dir)
+                os.symlink(self.testrun_log_dir, self.current_log_dir, target_is_directory=True)
+            except OSError as e:
+                self._display.warning("Failed to move log files from {} to {}: {}".format(
+                    self.log_dir, self.testrun_log_dir, e))
 
     def v2_playbook_on_task_start(self, task, is_conditional):
         self._task_start(task, prefix='TASK')
@@ -1044,6 +2290,12 @@ class CallbackModule(CallbackBase):
         if label:
             msg += " => (item={})".format(label)
         self.logger.info(msg)
+        self.write_event('include',
+                         play=self._play_name,
+                         test_case=self._last_test_name,
+                         file=included_file._filename,
+                         hosts=[h.name for h in included_file._hosts],
+                         item=label)
 
     def v2_playbook_on_import_for_host(self, result, imported_file):
         msg = self._banner('Imported: {} for {}'.format(imported_file._filename, ", ".join([h.name for h in imported_file._hosts])))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+Replay set_fact and debug task results through v2_runner_on_ok of the log plugin
+with extra fact harvest rules, and report the cost per event for each rule count.
+
+Usage: callback_fact_harvest.py <plugin file> [events] [extra rule counts]
+
+Extra rule counts are separated by commas, e.g., 0,1000,100000. Extra rules are
+for task files not in the replayed events. Task result printing is skipped, so
+the cost is of the fact harvesting in v2_runner_on_ok. The plugin file is copied
+into a temporary directory, so its log files are written there instead of the
+project directory.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from ansible.plugins.loader import callback_loader
+
+from callback_failed_result import FakeHost
+
+DEBUG_ACTION = 'ansible.builtin.debug'
+SET_FACT_ACTION = 'ansible.builtin.set_fact'
+
+
+class FakeTask(object):
+    tags = []
+    loop = None
+    ignore_errors = False
+
+    def __init__(self, uuid, task_file, action, args):
+        self._uuid = uuid
+        self.path = '/bench/common/{}:10'.format(task_file)
+        self.action = action
+        self.args = args
+        self.name = 'Bench task {}'.format(uuid)
+
+    def get_name(self):
+        return self.name
+
+    def get_path(self):
+        return self.path
+
+    def get_first_parent_include(self):
+        return None
+
+
+class FakeResult(object):
+    def __init__(self, task, result):
+        self._task = task
+        self._host = FakeHost()
+        self._result = result
+
+
+def get_events():
+    """
+    Return results of debug and set_fact tasks, which have harvest rules or not
+    """
+    tasks = [('esxi_get_version_build.yml', DEBUG_ACTION, 'esxi_build', '20036589'),
+             ('get_cloudinit_version.yml', DEBUG_ACTION, 'cloudinit_version', '22.4'),
+             ('vm_get_vm_info.yml', SET_FACT_ACTION, 'vm_guest_id', 'vmwarePhoton64Guest'),
+             ('vm_get_power_state.yml', DEBUG_ACTION, 'vm_power_state_get', 'poweredOn'),
+             ('get_os_release.yml', SET_FACT_ACTION, 'guest_os_ansible_distribution', 'Ubuntu')]
+    events = []
+    for index, (task_file, action, var_name, var_value) in enumerate(tasks):
+        if action == DEBUG_ACTION:
+            task = FakeTask('bench-task-{}'.format(index), task_file, action, {'var': var_name})
+            events.append((task, {var_name: var_value, 'changed': False}))
+        else:
+            task = FakeTask('bench-task-{}'.format(index), task_file, action, {var_name: var_value})
+            events.append((task, {'ansible_facts': {var_name: var_value}, 'changed': False}))
+    return events
+
+
+def run(events, rule_count):
+    callback_class = callback_loader.get('gosv_log_bench', class_only=True)
+    plugin_module = sys.modules[callback_class.__module__]
+    # The plugin before the fact harvest rule table has no rules to add
+    base_rules = list(getattr(plugin_module, 'FACT_HARVEST_RULES', []))
+    if not hasattr(plugin_module, 'FACT_HARVEST_RULES') and rule_count:
+        return None
+    if base_rules:
+        plugin_module.FACT_HARVEST_RULES = base_rules + [
+            ('bench_{}.yml'.format(i % 1000), DEBUG_ACTION, 'bench_var_{}'.format(i), 'callback', 'bench_field', 'always')
+            for i in range(rule_count)]
+    try:
+        callback = callback_class()
+    finally:
+        if base_rules:
+            plugin_module.FACT_HARVEST_RULES = base_rules
+    callback._print_task_details = lambda *args, **kwargs: None
+
+    replayed = get_events()
+    for task, _ in replayed:
+        callback._task_start(task, prefix='TASK')
+    results = [FakeResult(task, result) for task, result in replayed]
+
+    started_at = time.perf_counter()
+    for i in range(events):
+        result = results[i % len(results)]
+        # v2_runner_on_ok cleans the result in place
+        result._result = dict(replayed[i % len(replayed)][1])
+        callback.v2_runner_on_ok(result)
+    finished_at = time.perf_counter()
+    if hasattr(callback, 'log_writer'):
+        callback.log_writer.close()
+    return (finished_at - started_at) / events * 1e6
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    rule_counts = [int(count) for count in (sys.argv[3] if len(sys.argv) > 3 else '0,1000,100000').split(',')]
+
+    work_dir = tempfile.mkdtemp(prefix='gosv-bench-')
+    try:
+        plugin_dir = os.path.join(work_dir, 'plugin')
+        os.makedirs(plugin_dir)
+        shutil.copy(os.path.abspath(sys.argv[1]), os.path.join(plugin_dir, 'gosv_log_bench.py'))
+        callback_loader.add_directory(plugin_dir)
+        for rule_count in rule_counts:
+            event_cost = run(events, rule_count)
+            if event_cost is None:
+                print("{} extra rules: not supported by the plugin".format(rule_count))
+            else:
+                print("{} extra rules: {:.1f} us per event".format(rule_count, event_cost))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+Replay failed loop items of tasks tagged with known_issue through the log plugin
+and report failed events per second.
+
+Usage: callback_failed_items.py <plugin file> [failed items] [items per task]
+
+Each failed item has a 20 KB rendered result, and result rendering is skipped,
+so the cost is of classifying and logging failed tasks. The plugin file is
+copied into a temporary directory, so its log files are written there instead
+of the project directory.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from callback_log_events import load_plugin
+from callback_failed_result import FakeHost
+
+RENDERED_RESULT = '{"msg": "non-zero return code", "failed": true, "stdout": "%s"}' % ('x' * 20000)
+
+
+class FakeLoopTask(object):
+    loop = [1]
+    ignore_errors = False
+    action = 'ansible.builtin.command'
+    name = 'Run command in guest OS'
+    tags = ['known_issue']
+
+    def __init__(self, index):
+        self._uuid = 'bench-task-{}'.format(index)
+        self.path = '/bench/common/vm_wait_{}.yml:3'.format(index)
+
+    def get_name(self):
+        return self.name
+
+    def get_path(self):
+        return self.path
+
+    def get_first_parent_include(self):
+        return None
+
+
+class FakeItemResult(object):
+    def __init__(self, task):
+        self._task = task
+        self._host = FakeHost()
+        self._result = {'msg': 'non-zero return code', 'failed': True}
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    items_per_task = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    work_dir = tempfile.mkdtemp(prefix='gosv-bench-')
+    try:
+        callback = load_plugin(os.path.abspath(sys.argv[1]), work_dir)
+        callback._dump_results = lambda result, indent=None: RENDERED_RESULT
+        callback._display.display = lambda *args, **kwargs: None
+        if hasattr(callback, 'enable_log_sink'):
+            callback.enable_log_sink('full')
+        else:
+            callback.add_logger_file_handler(callback.full_debug_log)
+
+        tasks = [FakeLoopTask(i) for i in range((count + items_per_task - 1) // items_per_task)]
+        started_at = time.perf_counter()
+        for i in range(count):
+            task = tasks[i // items_per_task]
+            if i % items_per_task == 0:
+                callback._task_start(task, prefix='TASK')
+            callback._print_task_details(FakeItemResult(task), 'failed', loop_item=i)
+        finished_at = time.perf_counter()
+        if hasattr(callback, 'log_writer'):
+            callback.log_writer.close()
+
+        print("{} failed items of {} tasks: {:.0f} events/sec".format(
+            count, len(tasks), count / (finished_at - started_at)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
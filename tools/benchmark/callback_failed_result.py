@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+Log large failed command results through the log plugin and report the time
+per failed result.
+
+Usage: callback_failed_result.py <plugin file> [results] [output lines]
+
+The plugin file is copied into a temporary directory, so its log files are
+written there instead of the project directory.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from callback_log_events import load_plugin
+
+
+class FakeTask(object):
+    _uuid = 'bench-task'
+    tags = []
+    loop = None
+    ignore_errors = False
+    action = 'ansible.builtin.command'
+    name = 'Run command in guest OS'
+
+    def get_name(self):
+        return self.name
+
+    def get_path(self):
+        return '/bench/linux/utils/bench.yml:3'
+
+
+class FakeHost(object):
+    def get_name(self):
+        return 'localhost'
+
+
+class FakeResult(object):
+    def __init__(self, lines):
+        self._task = FakeTask()
+        self._host = FakeHost()
+        self._result = {'msg': 'non-zero return code',
+                        'failed': True,
+                        'rc': 1,
+                        'stdout': '\n'.join(lines),
+                        'stdout_lines': list(lines),
+                        'stderr': '',
+                        'stderr_lines': []}
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    line_count = int(sys.argv[3]) if len(sys.argv) > 3 else 60000
+    lines = ['dmesg line %06d: some kernel message text here' % i for i in range(line_count)]
+    work_dir = tempfile.mkdtemp(prefix='gosv-bench-')
+    try:
+        callback = load_plugin(os.path.abspath(sys.argv[1]), work_dir)
+        if hasattr(callback, 'enable_log_sink'):
+            callback.enable_log_sink('full')
+        else:
+            callback.add_logger_file_handler(callback.full_debug_log)
+
+        results = [FakeResult(lines) for _ in range(count)]
+        started_at = time.perf_counter()
+        for result in results:
+            callback._print_task_details(result, 'failed')
+        finished_at = time.perf_counter()
+        if hasattr(callback, 'log_writer'):
+            callback.log_writer.close()
+
+        # stdout and stdout_lines
+        result_size = len(results[0]._result['stdout']) * 2 / 1e6
+        print("{:.1f} MB failed result: {:.2f}s per result".format(
+            result_size, (finished_at - started_at) / count))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
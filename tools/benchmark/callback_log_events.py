@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+Replay log events through the log plugin and report main thread throughput.
+
+Usage: callback_log_events.py <plugin file> [events]
+
+The plugin file is copied into a temporary directory, so its log files are
+written there instead of the project directory.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from ansible.plugins.loader import callback_loader
+
+EVENT_MSG = 'ok: [localhost] => ' + 'x' * 1500
+
+
+def load_plugin(plugin_file, work_dir):
+    plugin_dir = os.path.join(work_dir, 'plugin')
+    os.makedirs(plugin_dir)
+    shutil.copy(plugin_file, os.path.join(plugin_dir, 'gosv_log_bench.py'))
+    callback_loader.add_directory(plugin_dir)
+    return callback_loader.get('gosv_log_bench', class_only=True)()
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    work_dir = tempfile.mkdtemp(prefix='gosv-bench-')
+    try:
+        callback = load_plugin(os.path.abspath(sys.argv[1]), work_dir)
+        # The plugin before the asynchronous log writer has no log sinks
+        if hasattr(callback, 'enable_log_sink'):
+            callback.enable_log_sink('full')
+        else:
+            callback.add_logger_file_handler(callback.full_debug_log)
+
+        started_at = time.perf_counter()
+        for i in range(events):
+            callback.logger.info(EVENT_MSG)
+            if i % 10 == 0:
+                callback.write_to_logfile(callback.test_results_yml, 'testcase: Passed\n')
+        finished_at = time.perf_counter()
+        if hasattr(callback, 'log_writer'):
+            callback.log_writer.close()
+
+        print("{} events: {:.0f} events/sec on main thread, {:.2f}s including draining".format(
+            events, events / (finished_at - started_at), time.perf_counter() - started_at))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
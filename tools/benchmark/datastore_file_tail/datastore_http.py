@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+HTTP stand-in of vSphere datastore file access for benchmarks of
+vsphere_datastore_file_tail module, which serves files in a local directory at
+'/folder/<path>' with Basic authentication of 'root:benchmark', and counts
+requests and bytes sent. Range requests of 'bytes=<start>-' get 206 or 416
+responses like ESXi, unless Range support is disabled.
+
+Usage: datastore_http.py <port> <datastore directory>
+
+Control URLs:
+  GET /stats            return counters in JSON
+  GET /reset            reset counters
+  GET /range?enabled=0  disable or enable Range support
+"""
+import os
+import re
+import sys
+import json
+import base64
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+AUTHORIZATION = 'Basic ' + base64.b64encode(b'root:benchmark').decode()
+
+
+class DatastoreState(object):
+    def __init__(self, datastore_dir):
+        self.datastore_dir = datastore_dir
+        self.range_enabled = True
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.range_requests = 0
+        self.bytes_sent = 0
+
+    def stats(self):
+        return dict(requests=self.requests,
+                    range_requests=self.range_requests,
+                    bytes_sent=self.bytes_sent,
+                    range_enabled=self.range_enabled)
+
+
+class DatastoreHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, code, body=b'', headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/stats':
+            return self.reply(200, json.dumps(self.state.stats()).encode(),
+                              {'Content-Type': 'application/json'})
+        if path == '/reset':
+            self.state.reset()
+            return self.reply(200)
+        if path == '/range':
+            self.state.range_enabled = query != 'enabled=0'
+            return self.reply(200)
+
+        if self.headers.get('Authorization') != AUTHORIZATION:
+            return self.reply(401, headers={'WWW-Authenticate': 'Basic realm="datastore"'})
+        self.state.requests += 1
+        if not path.startswith('/folder/'):
+            return self.reply(404)
+        file_path = os.path.join(self.state.datastore_dir, path[len('/folder/'):])
+        if not os.path.isfile(file_path):
+            return self.reply(404)
+        with open(file_path, 'rb') as f:
+            data = f.read()
+
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match and self.state.range_enabled:
+            self.state.range_requests += 1
+            start = int(match.group(1))
+            if start >= len(data):
+                return self.reply(416, headers={'Content-Range': 'bytes */%d' % len(data)})
+            self.state.bytes_sent += len(data) - start
+            return self.reply(206, data[start:],
+                              {'Content-Range': 'bytes %d-%d/%d' % (start, len(data) - 1, len(data))})
+        self.state.bytes_sent += len(data)
+        self.reply(200, data)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    DatastoreHandler.state = DatastoreState(sys.argv[2])
+    ThreadingHTTPServer(('127.0.0.1', int(sys.argv[1])), DatastoreHandler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+Write a VM log file for benchmarks of vsphere_datastore_file_tail module. It
+writes an initial log of given size, then appends a line every 0.5 second, and
+writes the hard reset message at given seconds. The message line is written in
+two parts with a gap of given seconds, so it can be split across two reads. The
+log file can be truncated at given seconds, like a new log after VM power on.
+
+Usage: log_writer.py <log file> <initial MB> <message seconds,...> [split gap] [truncate seconds]
+"""
+import sys
+import time
+
+LINE = '2023-01-01T00:00:00.000Z In(05) vmx - Benchmark filler line %s\n'
+MESSAGE_HEAD = '2023-01-01T00:00:01.000Z In(05) vcpu-0 - Chipset: The guest has requested'
+MESSAGE_TAIL = ' that the virtual machine be hard reset\n'
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    log_file = sys.argv[1]
+    initial_size = float(sys.argv[2]) * 1024 * 1024
+    message_at = sorted(float(x) for x in sys.argv[3].split(',') if x)
+    split_gap = float(sys.argv[4]) if len(sys.argv) > 4 else 0.3
+    truncate_at = float(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    with open(log_file, 'w') as f:
+        count = 0
+        while f.tell() < initial_size:
+            f.write(LINE % count)
+            count += 1
+
+    started_at = time.time()
+    count = 0
+    while True:
+        time.sleep(0.5)
+        elapsed = time.time() - started_at
+        if truncate_at is not None and elapsed >= truncate_at:
+            with open(log_file, 'w') as f:
+                f.write(LINE % 'after truncation')
+            truncate_at = None
+        with open(log_file, 'a') as f:
+            f.write(LINE % ('appended %d' % count))
+            count += 1
+            if message_at and elapsed >= message_at[0]:
+                f.write(MESSAGE_HEAD)
+                f.flush()
+                time.sleep(split_gap)
+                f.write(MESSAGE_TAIL)
+                message_at.pop(0)
+
+
+if __name__ == '__main__':
+    main()
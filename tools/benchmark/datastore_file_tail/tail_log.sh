@@ -0,0 +1,88 @@
+#!/bin/bash
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+#
+# Test vsphere_datastore_file_tail module against datastore_http.py serving a
+# log file appended by log_writer.py, and compare requests and bytes downloaded
+# with downloading the whole file in 'until' loop. Scenarios cover appends,
+# the message line split across two reads, log truncation, and server without
+# Range support. Exits non-zero if any scenario gets unexpected result.
+#
+# Usage: tail_log.sh <project tree> [port]
+#
+set -e
+
+if [ $# -lt 1 ]; then
+    sed -n '11p' "$0"
+    exit 1
+fi
+
+bench_dir=$(cd "$(dirname "$0")" && pwd)
+tree=$(cd "$1" && pwd)
+port=${2:-18480}
+
+work_dir=$(mktemp -d)
+server_pid=""
+writer_pid=""
+cleanup() {
+    [ -n "$writer_pid" ] && kill "$writer_pid" 2>/dev/null
+    [ -n "$server_pid" ] && kill "$server_pid" 2>/dev/null
+    rm -rf "$work_dir"
+}
+trap cleanup EXIT
+
+mkdir -p "$work_dir/ds/vm1"
+python3 "$bench_dir/datastore_http.py" "$port" "$work_dir/ds" >"$work_dir/server.out" 2>&1 &
+server_pid=$!
+sleep 1
+
+failed=0
+# Scenario, mode, initial MB, message seconds, split gap, truncate seconds,
+# Range support, times, retries, expected found and matches
+while read -r name mode size message_at split_gap truncate_at range times retries expected; do
+    rm -f "$work_dir/ds/vm1/vmware.log"
+    curl -s "http://127.0.0.1:$port/reset" >/dev/null
+    curl -s "http://127.0.0.1:$port/range?enabled=$range" >/dev/null
+    python3 "$bench_dir/log_writer.py" "$work_dir/ds/vm1/vmware.log" "$size" "${message_at/-/}" \
+        "$split_gap" ${truncate_at/-/} &
+    writer_pid=$!
+    while [ ! -s "$work_dir/ds/vm1/vmware.log" ]; do
+        sleep 0.2
+    done
+    started_at=$(date +%s.%N)
+    # Run in the temporary directory, so the project ansible.cfg and log plugin are not used
+    (cd "$work_dir" && ANSIBLE_LIBRARY="$tree/library" \
+     ANSIBLE_MODULE_UTILS="$tree/module_utils" \
+     ANSIBLE_LOG_PATH="$work_dir/ansible.log" \
+     ansible-playbook -i localhost, -c local "$bench_dir/tail_log.yml" \
+     -e "ansible_python_interpreter=$(command -v python3)" \
+     -e "bench_mode=$mode" -e "bench_port=$port" -e "bench_times=$times" \
+     -e "bench_delay=1" -e "bench_retries=$retries" \
+     </dev/null >"$work_dir/playbook.out" 2>&1) || {
+        tail -n 30 "$work_dir/playbook.out"
+        exit 1
+    }
+    kill "$writer_pid" 2>/dev/null
+    wait "$writer_pid" 2>/dev/null || true
+    writer_pid=""
+    result=$(grep -o 'RESULT [^"]*' "$work_dir/playbook.out" | sed 's/^RESULT //')
+    seconds=$(python3 -c "import time; print('%.1f' % (time.time() - $started_at))")
+    if [[ " $result " == *" found=${expected%,*} matches=${expected#*,} "* ]]; then
+        status=ok
+    else
+        status=FAILED
+        failed=1
+    fi
+    printf "%-12s %-4s %s seconds=%s %s\n" "$name" "$mode" "$result" "$seconds" "$status"
+done <<SCENARIOS
+appends      tail 8 10  0.3 - 1 1 30 True,1
+appends      uri  8 10  0.3 - 1 1 30 True,1
+times        tail 1 3,6 0.3 - 1 2 30 True,2
+split_line   tail 1 3   2.5 - 1 1 30 True,1
+truncation   tail 4 6   0.3 3 1 1 30 True,1
+no_range     tail 1 3   0.3 - 0 1 30 True,1
+no_range     tail 1 3,6 0.3 - 0 2 30 True,2
+timeout      tail 1 -   0.3 - 1 1 3  False,0
+SCENARIOS
+
+exit $failed
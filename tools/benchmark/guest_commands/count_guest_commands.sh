@@ -0,0 +1,45 @@
+#!/bin/bash
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+#
+# Count commands executed and files put on guest OS by linux/utils task files,
+# using the local machine as guest OS. The counts are EXEC and PUT lines of
+# ansible-playbook -vvv output for host 'guestvm'.
+#
+# Usage: count_guest_commands.sh <project tree> [task file ...]
+#
+set -e
+
+if [ $# -lt 1 ]; then
+    sed -n '10p' "$0"
+    exit 1
+fi
+
+bench_dir=$(cd "$(dirname "$0")" && pwd)
+tree=$(cd "$1" && pwd)
+shift
+utils=${*:-get_os_release.yml get_linux_system_info.yml memory_size_in_guest.yml \
+get_installed_package_info.yml get_module_info.yml get_service_info.yml \
+get_device_list.yml get_cpu_info.yml}
+
+log_dir=$(mktemp -d)
+trap 'rm -rf "$log_dir"' EXIT
+
+printf "%-32s %6s %6s %s\n" "Task file" "EXEC" "PUT" "Result"
+for util in $utils; do
+    if [ ! -f "$tree/linux/utils/$util" ]; then
+        printf "%-32s %6s %6s %s\n" "$util" "-" "-" "not found"
+        continue
+    fi
+    # Run in the temporary directory, so the project ansible.cfg and log plugin are not used
+    output=$(cd "$log_dir" && ANSIBLE_LIBRARY="$tree/library" \
+             ANSIBLE_MODULE_UTILS="$tree/module_utils" \
+             ANSIBLE_LOG_PATH="$log_dir/ansible.log" \
+             ANSIBLE_ALLOW_BROKEN_CONDITIONALS=true \
+             ansible-playbook -i "$bench_dir/inventory" "$bench_dir/count_guest_commands.yml" \
+             -e "tree=$tree" -e "util=$util" -e "bench_log_dir=$log_dir" \
+             -e "ansible_python_interpreter=$(command -v python3)" -vvv </dev/null 2>&1) && result=ok || result=failed
+    exec_count=$(grep -c '^<guestvm> EXEC' <<<"$output" || true)
+    put_count=$(grep -c '^<guestvm> PUT' <<<"$output" || true)
+    printf "%-32s %6s %6s %s\n" "$util" "$exec_count" "$put_count" "$result"
+done
@@ -0,0 +1,72 @@
+#!/bin/bash
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+#
+# Count SSH connections and handshakes to a local SSH server in 3 test cases,
+# which use common/update_inventory.yml of the given tree with 127.0.0.1 as
+# VM IP address. The SSH server listens on port 22, so it must be run as root
+# without other SSH server on port 22, and needs asyncssh and an SSH key of
+# current user. SSHD_PYTHON can be set to the Python interpreter with asyncssh.
+#
+# Usage: count_handshakes.sh <project tree> [idle seconds]
+#
+set -e
+
+if [ $# -lt 1 ]; then
+    sed -n '11p' "$0"
+    exit 1
+fi
+
+bench_dir=$(cd "$(dirname "$0")" && pwd)
+tree=$(cd "$1" && pwd)
+idle_seconds=${2:-65}
+
+work_dir=$(mktemp -d)
+log_file="$work_dir/handshakes.log"
+server_pid=""
+cleanup() {
+    [ -n "$server_pid" ] && kill "$server_pid" 2>/dev/null
+    rm -f /tmp/ansible-ssh-*
+    rm -rf "$work_dir"
+}
+trap cleanup EXIT
+
+# VM IP address is 127.0.0.1 instead of getting it from vCenter Server
+mkdir -p "$work_dir/tree"
+cp -r "$tree/common" "$work_dir/tree/common"
+cat > "$work_dir/tree/common/vm_get_ip.yml" <<'EOT'
+- name: "Set fact of VM IP address"
+  ansible.builtin.set_fact:
+    vm_guest_ip: 127.0.0.1
+EOT
+
+# Pinging 127.0.0.1 always succeeds
+if ! command -v ping >/dev/null; then
+    mkdir -p "$work_dir/bin"
+    printf '#!/bin/sh\nexit 0\n' > "$work_dir/bin/ping"
+    chmod +x "$work_dir/bin/ping"
+    export PATH="$work_dir/bin:$PATH"
+fi
+
+"${SSHD_PYTHON:-python3}" "$bench_dir/sshd_server.py" "$log_file" "$work_dir/host_key" >"$work_dir/server.out" 2>&1 &
+server_pid=$!
+sleep 2
+
+# Run in the temporary directory, so the project ansible.cfg and log plugin are not used
+started_at=$(date +%s)
+(cd "$work_dir" && ANSIBLE_ALLOW_BROKEN_CONDITIONALS=true \
+ ANSIBLE_LOG_PATH="$work_dir/ansible.log" \
+ ansible-playbook "$bench_dir/test_cases.yml" \
+ -e "bench_tree=$work_dir/tree" -e "bench_log_file=$log_file" \
+ -e "bench_idle_seconds=$idle_seconds" </dev/null >"$work_dir/playbook.out" 2>&1) || {
+    tail -n 30 "$work_dir/playbook.out"
+    exit 1
+}
+finished_at=$(date +%s)
+
+printf "%-10s %12s %12s\n" "Test case" "Connections" "Handshakes"
+awk '$2 ~ /-start$/ { testcase = substr($2, 1, length($2) - 6); connections = 0; handshakes = 0 }
+     $2 == "connect" { connections++ }
+     $2 == "handshake" { handshakes++ }
+     $2 ~ /-end$/ { printf "%-10s %12d %12d\n", testcase, connections, handshakes }' "$log_file"
+echo "Total seconds: $((finished_at - started_at))"
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+SSH server for count_handshakes.sh, which runs commands as current user and
+logs each TCP connection and each SSH handshake reaching user authentication.
+
+Usage: sshd_server.py <log file> <host key file> [port]
+
+Any public key is accepted, and the host key is generated when it doesn't exist.
+Requires asyncssh.
+"""
+import os
+import sys
+import time
+import asyncio
+
+import asyncssh
+
+
+class BenchServer(asyncssh.SSHServer):
+    log_file = None
+
+    def log(self, event):
+        with open(self.log_file, 'a') as fd:
+            fd.write("{:f} {}\n".format(time.time(), event))
+
+    def connection_made(self, conn):
+        self.log('connect')
+
+    def begin_auth(self, username):
+        self.log('handshake')
+        return True
+
+    def public_key_auth_supported(self):
+        return True
+
+    def validate_public_key(self, username, key):
+        return True
+
+
+async def run_command(process):
+    proc = await asyncio.create_subprocess_shell(process.command or '/bin/sh',
+                                                 stdin=asyncio.subprocess.PIPE,
+                                                 stdout=asyncio.subprocess.PIPE,
+                                                 stderr=asyncio.subprocess.PIPE)
+    await process.redirect(stdin=proc.stdin, stdout=proc.stdout, stderr=proc.stderr)
+    process.exit(await proc.wait())
+
+
+async def main(host_key, port):
+    # Banner of OpenSSH is waited for by common/vm_wait_ssh.yml
+    await asyncssh.create_server(BenchServer, '127.0.0.1', port,
+                                 server_host_keys=[host_key],
+                                 process_factory=run_command,
+                                 server_version='OpenSSH_9.2p1',
+                                 sftp_factory=True,
+                                 allow_scp=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    BenchServer.log_file = sys.argv[1]
+    if not os.path.exists(sys.argv[2]):
+        asyncssh.generate_private_key('ssh-ed25519').write_private_key(sys.argv[2])
+    asyncio.run(main(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 22))
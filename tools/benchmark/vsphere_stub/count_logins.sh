@@ -0,0 +1,60 @@
+#!/bin/bash
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+#
+# Count logins and SOAP requests to vsphere_stub.py of vsphere_session module
+# tasks, which log in at each task as modules without session cache, share the
+# cached session, or share the cached session expired in the middle of tasks.
+# Requires pyVmomi and openssl.
+#
+# Usage: count_logins.sh <project tree> [tasks] [port]
+#
+set -e
+
+if [ $# -lt 1 ]; then
+    sed -n '10p' "$0"
+    exit 1
+fi
+
+bench_dir=$(cd "$(dirname "$0")" && pwd)
+tree=$(cd "$1" && pwd)
+tasks=${2:-30}
+port=${3:-18443}
+
+work_dir=$(mktemp -d)
+server_pid=""
+cleanup() {
+    [ -n "$server_pid" ] && kill "$server_pid" 2>/dev/null
+    rm -rf "$work_dir"
+}
+trap cleanup EXIT
+
+openssl req -x509 -newkey rsa:2048 -nodes -days 1 -subj "/CN=127.0.0.1" \
+    -keyout "$work_dir/key.pem" -out "$work_dir/cert.pem" 2>/dev/null
+python3 "$bench_dir/vsphere_stub.py" "$port" "$work_dir/cert.pem" "$work_dir/key.pem" >"$work_dir/server.out" 2>&1 &
+server_pid=$!
+sleep 2
+
+stub_get() {
+    python3 -c "import ssl, sys, urllib.request; print(urllib.request.urlopen(sys.argv[1], context=ssl._create_unverified_context()).read().decode())" \
+        "https://127.0.0.1:$port/sdk/$1"
+}
+
+for mode in per_task cached expired; do
+    stub_get reset >/dev/null
+    rm -rf "$work_dir/sessions"
+    started_at=$(date +%s.%N)
+    # Run in the temporary directory, so the project ansible.cfg and log plugin are not used
+    (cd "$work_dir" && ANSIBLE_LIBRARY="$tree/library" \
+     ANSIBLE_MODULE_UTILS="$tree/module_utils" \
+     ANSIBLE_LOG_PATH="$work_dir/ansible.log" \
+     ansible-playbook -i localhost, -c local "$bench_dir/session_logins.yml" \
+     -e "ansible_python_interpreter=$(command -v python3)" \
+     -e "bench_mode=$mode" -e "bench_tasks=$tasks" -e "bench_port=$port" \
+     -e "bench_cache_dir=$work_dir/sessions" </dev/null >"$work_dir/playbook.out" 2>&1) || {
+        tail -n 30 "$work_dir/playbook.out"
+        exit 1
+    }
+    finished_at=$(date +%s.%N)
+    echo "$mode: $(stub_get stats) seconds=$(python3 -c "print(round($finished_at - $started_at, 1))")"
+done
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+"""
+HTTPS vSphere SOAP stand-in for benchmarks of project modules, which counts
+requests, logins and service version probes. It serves one VM 'vm-1' and
+answers the SOAP methods called by vsphere_session, vsphere_vm_properties and
+vsphere_vm_wait modules. Other methods get an empty response. VM power state
+can be changed on a schedule, and WaitForUpdatesEx returns when it's changed.
+
+Usage: vsphere_stub.py <port> <certificate file> <key file>
+
+Control URLs:
+  GET /sdk/stats   return counters in JSON
+  GET /sdk/reset   reset counters and remove all sessions
+  GET /sdk/expire  remove all sessions, as they are expired on server side
+  GET /sdk/set?powerState=poweredOff
+                   set VM state
+  GET /sdk/flip?powerState=poweredOff&after=7
+                   set VM state after seconds, and the time of setting it is
+                   'last_flip' in counters, and the time of sending the
+                   update to WaitForUpdatesEx is 'last_update_sent'
+
+Requires pyVmomi.
+"""
+import re
+import ssl
+import sys
+import json
+import uuid
+import time
+import datetime
+import threading
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from pyVmomi import vim, vmodl, VmomiSupport
+from pyVmomi.SoapAdapter import SerializeToStr
+from pyVmomi.VmomiSupport import Object
+
+API_VERSION = 'vim.version.v8_0_3_0'
+VM_MOID = 'vm-1'
+
+
+class StubState(object):
+    """
+    Counters, sessions and VM state of the stand-in
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.sessions = set()
+        self.vm = {'changeVersion': '1',
+                   'powerState': 'poweredOn'}
+        # VM state version, which is notified to WaitForUpdatesEx when it's changed
+        self.vm_version = 0
+        self.vm_changed = threading.Condition(self.lock)
+        # Watched property paths of property collectors
+        self.collectors = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {'requests': 0, 'version_probe': 0, 'retrieve_content': 0,
+                          'login': 0, 'logout': 0, 'current_session': 0,
+                          'find_vm': 0, 'retrieve_properties': 0}
+            self.sessions.clear()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def set_vm_state(self, key, value):
+        with self.lock:
+            self.vm[key] = value
+            self.vm_version += 1
+            self.stats['last_flip'] = time.time()
+            self.vm_changed.notify_all()
+
+    def get_vm_properties(self):
+        return {'config.changeVersion': self.vm['changeVersion'],
+                'config.guestId': 'ubuntu64Guest',
+                'config.version': 'vmx-19',
+                'config.hardware.numCPU': 2,
+                'config.hardware.memoryMB': 4096,
+                'config.files.vmPathName': '[ds1] vm1/vm1.vmx',
+                'runtime.powerState': vim.VirtualMachine.PowerState(self.vm['powerState'])}
+
+
+STATE = StubState()
+
+
+def serialize(value, value_type):
+    if value is None:
+        return ''
+    return SerializeToStr(value, Object(name='returnval', type=value_type, version=API_VERSION, flags=0),
+                          API_VERSION, {'urn:vim25': ''})
+
+
+def soap_response(method, body):
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<soapenv:Envelope xmlns:soapenc="http://schemas.xmlsoap.org/soap/encoding/" '
+            'xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+            'xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soapenv:Body>'
+            '<{0}Response xmlns="urn:vim25">{1}</{0}Response></soapenv:Body></soapenv:Envelope>').format(method, body)
+
+
+def soap_fault(fault_name, detail, message):
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soapenv:Body><soapenv:Fault>'
+            '<faultcode>ServerFaultCode</faultcode><faultstring>{2}</faultstring>'
+            '<detail><{0}Fault xmlns="urn:vim25" xsi:type="{0}">{1}</{0}Fault></detail>'
+            '</soapenv:Fault></soapenv:Body></soapenv:Envelope>').format(fault_name, detail, message)
+
+
+def not_authenticated():
+    return soap_fault('NotAuthenticated',
+                      '<object type="SessionManager">SessionManager</object><privilegeId>System.View</privilegeId>',
+                      'The session is not authenticated.')
+
+
+def user_session(session_id):
+    now = datetime.datetime.now()
+    return vim.UserSession(key=session_id, userName='root', fullName='root', loginTime=now,
+                           lastActiveTime=now, locale='en', messageLocale='en', extensionSession=False,
+                           ipAddress='127.0.0.1', userAgent='benchmark', callCount=0)
+
+
+def retrieve_service_content(request):
+    STATE.count('retrieve_content')
+    content = vim.ServiceInstanceContent(
+        rootFolder=vim.Folder('group-d1'),
+        propertyCollector=vmodl.query.PropertyCollector('propertyCollector'),
+        sessionManager=vim.SessionManager('SessionManager'),
+        searchIndex=vim.SearchIndex('SearchIndex'),
+        viewManager=vim.view.ViewManager('ViewManager'),
+        about=vim.AboutInfo(name='vSphere stub', fullName='vSphere stub', vendor='VMware, Inc.',
+                            version='8.0.3', build='1', apiType='VirtualCenter', apiVersion='8.0.3.0',
+                            instanceUuid=str(uuid.uuid4()), productLineId='vpx', osType='linux-x64'))
+    return serialize(content, vim.ServiceInstanceContent), None
+
+
+def login(request):
+    session_id = str(uuid.uuid4())
+    STATE.count('login')
+    with STATE.lock:
+        STATE.sessions.add(session_id)
+    return serialize(user_session(session_id), vim.UserSession), session_id
+
+
+def logout(request):
+    STATE.count('logout')
+    with STATE.lock:
+        STATE.sessions.discard(request.session_id)
+    return '', None
+
+
+def fetch(request):
+    # SessionManager.currentSession, which is unset when session is not authenticated
+    STATE.count('current_session')
+    if request.session_id in STATE.sessions:
+        return serialize(user_session(request.session_id), vim.UserSession), None
+    return '', None
+
+
+def find_by_inventory_path(request):
+    STATE.count('find_vm')
+    return serialize(vim.VirtualMachine(VM_MOID), vim.ManagedEntity), None
+
+
+def retrieve_properties_ex(request):
+    STATE.count('retrieve_properties')
+    properties = STATE.get_vm_properties()
+    prop_set = [vmodl.DynamicProperty(name=path, val=properties[path])
+                for path in re.findall(r'<pathSet>([^<]+)</pathSet>', request.data) if path in properties]
+    object_content = vmodl.query.PropertyCollector.ObjectContent(obj=vim.VirtualMachine(VM_MOID), propSet=prop_set)
+    result = vmodl.query.PropertyCollector.RetrieveResult(objects=[object_content])
+    return serialize(result, vmodl.query.PropertyCollector.RetrieveResult), None
+
+
+def create_property_collector(request):
+    STATE.count('create_collector')
+    with STATE.lock:
+        collector_id = 'session[{}]propertyCollector-{}'.format(request.session_id, len(STATE.collectors) + 1)
+        STATE.collectors[collector_id] = []
+    return serialize(vmodl.query.PropertyCollector(collector_id), vmodl.query.PropertyCollector), None
+
+
+def get_this(request):
+    return re.search(r'<_this[^>]*>([^<]+)</_this>', request.data).group(1)
+
+
+def create_filter(request):
+    collector_id = get_this(request)
+    with STATE.lock:
+        STATE.collectors[collector_id] = re.findall(r'<pathSet>([^<]+)</pathSet>', request.data)
+    return serialize(vmodl.query.PropertyCollector.Filter(collector_id + '-filter'),
+                     vmodl.query.PropertyCollector.Filter), None
+
+
+def wait_for_updates_ex(request):
+    """
+    Return all watched properties at the first call with empty version, or block until
+    VM state is changed after the given version or max wait seconds passed
+    """
+    STATE.count('wait_for_updates')
+    collector_id = get_this(request)
+    version = re.search(r'<version[^>]*>([^<]*)</version>', request.data)
+    version = int(version.group(1)) if version and version.group(1) else -1
+    max_wait = re.search(r'<maxWaitSeconds>(\d+)</maxWaitSeconds>', request.data)
+    max_wait = int(max_wait.group(1)) if max_wait else None
+
+    with STATE.lock:
+        if version >= 0:
+            STATE.vm_changed.wait_for(lambda: STATE.vm_version > version, timeout=max_wait)
+        current_version = STATE.vm_version
+        paths = STATE.collectors.get(collector_id, [])
+        properties = STATE.get_vm_properties()
+    if version >= 0 and current_version <= version:
+        return '', None
+
+    changes = [vmodl.query.PropertyCollector.Change(name=path, op='assign', val=properties[path])
+               for path in paths if path in properties]
+    object_update = vmodl.query.PropertyCollector.ObjectUpdate(kind='enter' if version < 0 else 'modify',
+                                                               obj=vim.VirtualMachine(VM_MOID),
+                                                               changeSet=changes)
+    filter_update = vmodl.query.PropertyCollector.FilterUpdate(
+        filter=vmodl.query.PropertyCollector.Filter(collector_id + '-filter'), objectSet=[object_update])
+    with STATE.lock:
+        STATE.stats['last_update_sent'] = time.time()
+    update_set = vmodl.query.PropertyCollector.UpdateSet(version=str(current_version),
+                                                         filterSet=[filter_update], truncated=False)
+    return serialize(update_set, vmodl.query.PropertyCollector.UpdateSet), None
+
+
+def destroy_property_collector(request):
+    STATE.count('destroy_collector')
+    with STATE.lock:
+        STATE.collectors.pop(get_this(request), None)
+    return '', None
+
+
+# SOAP method handlers, which return the response body and new session ID
+SOAP_HANDLERS = {'RetrieveServiceContent': (retrieve_service_content, False),
+                 'Login': (login, False),
+                 'Logout': (logout, False),
+                 'Fetch': (fetch, False),
+                 'FindByInventoryPath': (find_by_inventory_path, True),
+                 'RetrievePropertiesEx': (retrieve_properties_ex, True),
+                 'CreatePropertyCollector': (create_property_collector, True),
+                 'CreateFilter': (create_filter, True),
+                 'WaitForUpdatesEx': (wait_for_updates_ex, True),
+                 'DestroyPropertyCollector': (destroy_property_collector, True)}
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, code, body, content_type='text/xml', session_id=None):
+        body = body.encode()
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if session_id:
+            self.send_header('Set-Cookie', 'vmware_soap_session="{}"; Path=/; HttpOnly; Secure;'.format(session_id))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, value):
+        self.send_body(200, json.dumps(value), content_type='application/json')
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/sdk/stats':
+            with STATE.lock:
+                return self.send_json(STATE.stats)
+        if path == '/sdk/reset':
+            STATE.reset()
+            return self.send_json({})
+        if path == '/sdk/expire':
+            with STATE.lock:
+                STATE.sessions.clear()
+            return self.send_json({})
+        if path in ('/sdk/set', '/sdk/flip'):
+            query = dict(item.split('=', 1) for item in self.path.split('?', 1)[1].split('&'))
+            after = float(query.pop('after', 0))
+            for key, value in query.items():
+                if path == '/sdk/set':
+                    STATE.set_vm_state(key, value)
+                else:
+                    threading.Timer(after, STATE.set_vm_state, (key, value)).start()
+            return self.send_json({})
+        # Service version probe of pyVmomi SmartConnect
+        STATE.count('version_probe')
+        self.send_body(200, '<?xml version="1.0" encoding="UTF-8" ?><namespaces version="1.0"><namespace>'
+                            '<name>urn:vim25</name><version>{}</version><priorVersions><version>6.7</version>'
+                            '</priorVersions></namespace></namespaces>'.format(VmomiSupport.versionIdMap[API_VERSION]))
+
+    def do_POST(self):
+        self.data = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        method = re.search(r'Body>\s*<(\w+)', self.data).group(1)
+        cookie = re.search(r'vmware_soap_session="([^"]+)"', self.headers.get('Cookie') or '')
+        self.session_id = cookie.group(1) if cookie else None
+        STATE.count('requests')
+
+        handler, auth_required = SOAP_HANDLERS.get(method, (None, True))
+        if auth_required and self.session_id not in STATE.sessions:
+            return self.send_body(500, not_authenticated())
+        if handler is None:
+            return self.send_body(200, soap_response(method, ''))
+        body, session_id = handler(self)
+        self.send_body(200, soap_response(method, body), session_id=session_id)
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def main():
+    if len(sys.argv) < 4:
+        sys.exit(__doc__)
+    server = StubServer(('127.0.0.1', int(sys.argv[1])), StubRequestHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(sys.argv[2], sys.argv[3])
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/bin/bash
+# Copyright 2023 VMware, Inc.
+# SPDX-License-Identifier: BSD-2-Clause
+#
+# Measure the latency of detecting VM power state change by vsphere_stub.py and
+# the SOAP requests sent while waiting, with vsphere_vm_wait module and with
+# polling every 5 seconds. The power state is changed 4 to 9 seconds after each
+# trial starts, or after the given seconds. Requires pyVmomi and openssl.
+#
+# Usage: wait_latency.sh <project tree> [trials] [flip after seconds] [port]
+#
+set -e
+
+if [ $# -lt 1 ]; then
+    sed -n '10p' "$0"
+    exit 1
+fi
+
+bench_dir=$(cd "$(dirname "$0")" && pwd)
+tree=$(cd "$1" && pwd)
+trials=${2:-5}
+flip_after=$3
+port=${4:-18443}
+
+work_dir=$(mktemp -d)
+server_pid=""
+cleanup() {
+    [ -n "$server_pid" ] && kill "$server_pid" 2>/dev/null
+    rm -rf "$work_dir"
+}
+trap cleanup EXIT
+
+openssl req -x509 -newkey rsa:2048 -nodes -days 1 -subj "/CN=127.0.0.1" \
+    -keyout "$work_dir/key.pem" -out "$work_dir/cert.pem" 2>/dev/null
+python3 "$bench_dir/vsphere_stub.py" "$port" "$work_dir/cert.pem" "$work_dir/key.pem" >"$work_dir/server.out" 2>&1 &
+server_pid=$!
+sleep 2
+
+for mode in event poll; do
+    # Run in the temporary directory, so the project ansible.cfg and log plugin are not used
+    (cd "$work_dir" && ANSIBLE_LIBRARY="$tree/library" \
+     ANSIBLE_MODULE_UTILS="$tree/module_utils" \
+     ANSIBLE_LOG_PATH="$work_dir/ansible.log" \
+     ansible-playbook -i localhost, -c local "$bench_dir/wait_latency.yml" \
+     -e "ansible_python_interpreter=$(command -v python3)" \
+     -e "bench_mode=$mode" -e "bench_trials=$trials" -e "bench_port=$port" \
+     -e "bench_cache_dir=$work_dir" ${flip_after:+-e "bench_flip_after=$flip_after"} \
+     </dev/null >"$work_dir/playbook.out" 2>&1) || {
+        tail -n 30 "$work_dir/playbook.out"
+        exit 1
+    }
+    grep -o 'RESULT [^"]*' "$work_dir/playbook.out" | sed 's/^RESULT //'
+done